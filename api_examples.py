@@ -347,6 +347,41 @@ def example_merkle_verification():
     return block
 
 
+def example_merkle_proof_verification():
+    """Verificar uma transação com prova de inclusão (cliente leve)."""
+    from bitcoin_blockchain import Block, Transaction
+    from merkle_tree import verify_proof_hex
+    
+    print("\n" + "="*80)
+    print("EXEMPLO 9b: MERKLE PROOF (CLIENTE LEVE)".center(80))
+    print("="*80 + "\n")
+    
+    transactions = [
+        Transaction("Alice", "Bob", 10.0),
+        Transaction("Bob", "Charlie", 5.0),
+        Transaction("Charlie", "Diana", 3.0),
+        Transaction("Diana", "Alice", 2.0),
+        Transaction("Eve", "Bob", 1.0)
+    ]
+    block = Block(index=1, transactions=transactions, previous_hash="0" * 64)
+    
+    # O nó completo gera a prova; o cliente leve só conhece tx_hash + merkle_root
+    target_tx = transactions[2]
+    proof = block.merkle_proof(target_tx.tx_hash)
+    
+    print(f"Transação: {target_tx.tx_hash[:16]}...")
+    print(f"Tamanho da prova: {len(proof)} hashes (bloco com {len(transactions)} transações)")
+    for sibling, is_right in proof:
+        print(f"   {'→' if is_right else '←'} {sibling[:16]}...")
+    
+    valid = verify_proof_hex(target_tx.tx_hash, proof, block.merkle_root)
+    forged = verify_proof_hex(transactions[3].tx_hash, proof, block.merkle_root)
+    print(f"\nProva válida? {valid}")
+    print(f"Prova aceita para outra transação? {forged}")
+    
+    return proof
+
+
 # ============================================================================
 # EXEMPLO 10: Simulação de Halving
 # ============================================================================
@@ -396,6 +431,7 @@ def main():
         ("Análise de Transações", example_transaction_analysis),
         ("Import/Export Carteira", example_wallet_import_export),
         ("Merkle Tree", example_merkle_verification),
+        ("Merkle Proof", example_merkle_proof_verification),
         ("Halving Simulation", example_halving_simulation)
     ]
     
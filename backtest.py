@@ -0,0 +1,292 @@
+import inspect
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from config import INITIAL_BALANCE_USD, TRADING_FEE_PERCENT
+
+# --- VECTORIZED BACKTESTING ---
+# Replay de séries históricas de preço sem tocar a rede:
+#   - estratégia = função (preços, **params) -> posição alvo por barra (0 = fora, 1 = comprado)
+#   - a posição decidida no fechamento da barra t vale a partir de t+1 (sem olhar o futuro)
+#   - equity = cumprod((1 + posição * retorno) * (1 - taxa * |mudança de posição|)), tudo em NumPy
+#   - taxa padrão = TRADING_FEE_PERCENT do config.py, cobrada a cada compra/venda
+#   - sweep(): grade de parâmetros espalhada num pool de processos; os preços vão uma vez por worker
+
+DEFAULT_FEE = TRADING_FEE_PERCENT / 100.0
+SWEEP_MIN_PARALLEL = 64  # Abaixo disso o custo de subir o pool não compensa
+
+
+# --- Estratégias ---
+
+MeanCache = Dict[int, np.ndarray]  # Janela -> média móvel de UMA série de preços (escopo: um lote do sweep)
+
+
+def rolling_mean(prices: np.ndarray, window: int, cache: Optional[MeanCache] = None) -> np.ndarray:
+    """Média móvel simples via cumsum; NaN nas primeiras window-1 barras.
+
+    cache guarda as médias já calculadas para esta mesma série `prices`.
+    """
+    if cache is not None and window in cache:
+        return cache[window]
+    out = np.full(len(prices), np.nan)
+    if 0 < window <= len(prices):
+        csum = np.cumsum(np.concatenate(([0.0], prices)))
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    if cache is not None:
+        cache[window] = out
+    return out
+
+
+def rolling_std(prices: np.ndarray, window: int, cache: Optional[MeanCache] = None) -> np.ndarray:
+    mean = rolling_mean(prices, window, cache)
+    mean_sq = rolling_mean(prices * prices, window)
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+
+def sma_crossover(prices: np.ndarray, fast: int = 10, slow: int = 50,
+                  cache: Optional[MeanCache] = None) -> np.ndarray:
+    """Comprado enquanto a média rápida está acima da lenta."""
+    if fast >= slow:
+        return np.zeros(len(prices))
+    with np.errstate(invalid='ignore'):
+        return (rolling_mean(prices, fast, cache) > rolling_mean(prices, slow, cache)).astype(np.float64)
+
+
+def momentum(prices: np.ndarray, lookback: int = 24, threshold: float = 0.0) -> np.ndarray:
+    """Comprado quando o retorno das últimas `lookback` barras passa de `threshold`."""
+    signal = np.zeros(len(prices))
+    if 0 < lookback < len(prices):
+        signal[lookback:] = prices[lookback:] / prices[:-lookback] - 1.0 > threshold
+    return signal
+
+
+def mean_reversion(prices: np.ndarray, window: int = 20, entry: float = 2.0, exit: float = 0.0,
+                   cache: Optional[MeanCache] = None) -> np.ndarray:
+    """Compra quando o z-score cai abaixo de -entry e vende quando volta acima de -exit."""
+    mean, std = rolling_mean(prices, window, cache), rolling_std(prices, window, cache)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (prices - mean) / std
+    # Estado com histerese: +1 nas entradas, 0 nas saídas, NaN = mantém; propagado com maximum.accumulate
+    events = np.where(z < -entry, 1.0, np.where(z > -exit, 0.0, np.nan))
+    idx = np.where(np.isnan(events), 0, np.arange(len(prices)))
+    np.maximum.accumulate(idx, out=idx)
+    held = events[idx]
+    return np.nan_to_num(held)
+
+
+STRATEGIES: Dict[str, Callable[..., np.ndarray]] = {
+    'sma_crossover': sma_crossover,
+    'momentum': momentum,
+    'mean_reversion': mean_reversion,
+}
+
+Strategy = Union[str, Callable[..., np.ndarray]]
+
+
+def _resolve(strategy: Strategy) -> Callable[..., np.ndarray]:
+    if callable(strategy):
+        return strategy
+    try:
+        return STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Estratégia desconhecida: {strategy} (use {', '.join(STRATEGIES)})")
+
+
+# --- Simulação ---
+
+def _position(signal) -> np.ndarray:
+    position = np.asarray(signal, dtype=np.float64)
+    if np.isnan(position).any() or position.min(initial=0.0) < 0.0 or position.max(initial=0.0) > 1.0:
+        position = np.clip(np.nan_to_num(position), 0.0, 1.0)
+    return position
+
+
+def _equity(returns: np.ndarray, position: np.ndarray, turnover: np.ndarray, fee: float,
+            initial: float) -> np.ndarray:
+    equity = np.empty(len(position))
+    equity[0] = 1.0
+    np.multiply(position[:-1], returns, out=equity[1:])
+    equity[1:] += 1.0
+    equity *= 1.0 - fee * turnover
+    np.cumprod(equity, out=equity)
+    equity *= initial
+    return equity
+
+
+def simulate(prices: np.ndarray, signal: np.ndarray, fee: float = DEFAULT_FEE,
+             initial: float = INITIAL_BALANCE_USD) -> np.ndarray:
+    """Curva de equity (USD por barra) para uma série de posições alvo em [0, 1]."""
+    position = _position(signal)
+    turnover = np.abs(np.diff(position, prepend=0.0))
+    return _equity(prices[1:] / prices[:-1] - 1.0, position, turnover, fee, initial)
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Maior queda relativa a partir de um topo (0.25 = -25%)."""
+    if not len(equity):
+        return 0.0
+    return float(np.max(1.0 - equity / np.maximum.accumulate(equity)))
+
+
+def summarize(params: Dict, equity: np.ndarray, position: np.ndarray, initial: float,
+              turnover: Optional[np.ndarray] = None) -> Dict:
+    final = float(equity[-1]) if len(equity) else initial
+    if turnover is None:
+        turnover = np.diff(position, prepend=0.0)
+    return {
+        'params': params,
+        'final_equity': final,
+        'pnl': final - initial,
+        'pnl_pct': (final / initial - 1.0) * 100.0,
+        'max_drawdown': max_drawdown(equity),
+        'trades': int(np.count_nonzero(turnover)),
+        'exposure': float(np.count_nonzero(position)) / len(position) if len(position) else 0.0,
+    }
+
+
+class BacktestResult:
+    """Resultado de um backtest: métricas, curva de equity e log de trades."""
+
+    def __init__(self, params: Dict, prices: np.ndarray, timestamps: Optional[np.ndarray],
+                 signal: np.ndarray, equity: np.ndarray, fee: float, initial: float):
+        self.params = params
+        self.prices = prices
+        self.timestamps = timestamps
+        self.signal = _position(signal)
+        self.equity = equity
+        self.fee = fee
+        self.initial = initial
+        self.summary = summarize(params, equity, self.signal, initial)
+        # Métricas do resumo como atributos explícitos (um nome errado levanta AttributeError)
+        self.final_equity: float = self.summary['final_equity']
+        self.pnl: float = self.summary['pnl']
+        self.pnl_pct: float = self.summary['pnl_pct']
+        self.max_drawdown: float = self.summary['max_drawdown']
+        self.trades: int = self.summary['trades']
+        self.exposure: float = self.summary['exposure']
+
+    def trade_log(self) -> List[Dict]:
+        """Trades no mesmo formato de TradingEngine.trade_history (+ 'fee' e 'index')."""
+        position, prices, equity = self.signal, self.prices, self.equity
+        delta = np.diff(position, prepend=0.0)
+        trades = []
+        for i in np.flatnonzero(delta):
+            # Equity antes da taxa desta barra
+            before = equity[i] / (1.0 - self.fee * abs(delta[i]))
+            amount_usd = before * abs(delta[i])
+            cost = amount_usd * self.fee
+            trades.append({
+                'type': 'BUY' if delta[i] > 0 else 'SELL',
+                'index': int(i),
+                'amount_usd': float(amount_usd),
+                'amount_btc': float((amount_usd - cost if delta[i] > 0 else amount_usd) / prices[i]),
+                'price': float(prices[i]),
+                'fee': float(cost),
+                'timestamp': float(self.timestamps[i]) if self.timestamps is not None else None,
+            })
+        return trades
+
+
+def run_backtest(prices, strategy: Strategy = 'sma_crossover', params: Optional[Dict] = None,
+                 timestamps=None, fee: float = DEFAULT_FEE,
+                 initial: float = INITIAL_BALANCE_USD) -> BacktestResult:
+    prices = np.asarray(prices, dtype=np.float64)
+    params = dict(params or {})
+    signal = _resolve(strategy)(prices, **params)
+    equity = simulate(prices, signal, fee, initial)
+    ts = None if timestamps is None else np.asarray(timestamps)
+    return BacktestResult(params, prices, ts, signal, equity, fee, initial)
+
+
+# --- Sweep de parâmetros ---
+
+_worker_prices: Optional[np.ndarray] = None
+
+
+def _init_worker(prices: np.ndarray) -> None:
+    global _worker_prices
+    _worker_prices = prices
+
+
+def _accepts_cache(fn: Callable) -> bool:
+    try:
+        return 'cache' in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _evaluate_chunk(strategy: Strategy, grid: Sequence[Dict], fee: float, initial: float,
+                    prices: Optional[np.ndarray] = None) -> List[Dict]:
+    prices = _worker_prices if prices is None else prices
+    fn = _resolve(strategy)
+    returns = prices[1:] / prices[:-1] - 1.0  # Uma vez por lote, não por combinação
+    # Janelas se repetem ao longo da grade: cada média é calculada uma vez por lote.
+    # O cache vive só nesta chamada e vai por argumento às estratégias que aceitam `cache`.
+    extra = {'cache': {}} if _accepts_cache(fn) else {}
+    results = []
+    for params in grid:
+        position = _position(fn(prices, **params, **extra))
+        turnover = np.abs(np.diff(position, prepend=0.0))
+        equity = _equity(returns, position, turnover, fee, initial)
+        results.append(summarize(params, equity, position, initial, turnover))
+    return results
+
+
+def param_grid(**axes: Iterable) -> List[Dict]:
+    """param_grid(fast=[5, 10], slow=[50, 100]) -> produto cartesiano como lista de dicts."""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(v) for v in axes.values()))]
+
+
+def sweep(prices, strategy: Strategy, grid: Union[Sequence[Dict], Dict[str, Iterable]],
+          fee: float = DEFAULT_FEE, initial: float = INITIAL_BALANCE_USD,
+          workers: Optional[int] = None, sort_by: str = 'pnl') -> List[Dict]:
+    """Avalia cada conjunto de parâmetros e retorna os resumos, do melhor para o pior.
+
+    Estratégias customizadas precisam ser funções de módulo (picklable) para rodar em paralelo.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if isinstance(grid, dict):
+        grid = param_grid(**grid)
+    grid = list(grid)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(grid) < SWEEP_MIN_PARALLEL:
+        results = _evaluate_chunk(strategy, grid, fee, initial, prices)
+    else:
+        chunk = max(8, len(grid) // (workers * 4))
+        chunks = [grid[i:i + chunk] for i in range(0, len(grid), chunk)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(prices,)) as pool:
+            parts = pool.map(_evaluate_chunk, [strategy] * len(chunks), chunks,
+                             [fee] * len(chunks), [initial] * len(chunks))
+            results = [summary for part in parts for summary in part]
+    reverse = sort_by != 'max_drawdown'
+    return sorted(results, key=lambda summary: summary[sort_by], reverse=reverse)
+
+
+if __name__ == "__main__":
+    print("--- [BACKTEST BENCHMARK] ---")
+    rng = np.random.default_rng(42)
+    bars = 24 * 365 * 5  # Cinco anos de candles de 1h
+    prices = 30000.0 * np.exp(np.cumsum(rng.normal(0.00002, 0.006, bars)))
+
+    t0 = time.perf_counter()
+    result = run_backtest(prices, 'sma_crossover', {'fast': 24, 'slow': 120})
+    print(f"[*] 1 backtest ({bars:,} barras): {(time.perf_counter() - t0) * 1000:.2f} ms | "
+          f"P&L ${result.pnl:,.2f} ({result.pnl_pct:.1f}%) | drawdown {result.max_drawdown:.1%} | "
+          f"{result.trades} trades")
+
+    grid = param_grid(fast=range(2, 100, 2), slow=range(20, 420, 10))
+    for workers in (1, None):
+        t0 = time.perf_counter()
+        ranked = sweep(prices, 'sma_crossover', grid, workers=workers)
+        elapsed = time.perf_counter() - t0
+        label = 'serial' if workers == 1 else f'{os.cpu_count()} processos'
+        print(f"[*] Sweep {len(grid):,} combinações ({label}): {elapsed:.2f}s "
+              f"({len(grid) / elapsed:,.0f}/s) | melhor {ranked[0]['params']} "
+              f"P&L {ranked[0]['pnl_pct']:.1f}%")
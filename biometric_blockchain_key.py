@@ -1,6 +1,7 @@
 import hashlib
 import numpy as np
-from bitcoin_crypto import BitcoinWallet, BitcoinCrypto
+from typing import List, Sequence
+from bitcoin_crypto import BitcoinWallet, BitcoinCrypto, HAS_ECDSA, derive_public_keys
 
 class BiometricCryptBridge:
     """
@@ -34,6 +35,22 @@ class BiometricCryptBridge:
         
         return self.wallet.export_wallet()
 
+    def open_galaxy_wallets(self, top_sigs: Sequence[np.ndarray]) -> List[dict]:
+        """
+        Provisionamento em lote: todas as chaves públicas saem de uma única
+        derivação (tabela do gerador + uma inversão modular para o lote).
+        """
+        seeds = [self.derivative_seed_from_signature(sig) for sig in top_sigs]
+        if HAS_ECDSA:
+            public_keys = derive_public_keys(seeds)
+        else:
+            public_keys = [self.crypto.private_key_to_public_key(seed) for seed in seeds]
+        return [
+            {'address': self.crypto.public_key_to_address(public_key),
+             'public_key': public_key, 'private_key': seed}
+            for seed, public_key in zip(seeds, public_keys)
+        ]
+
 if __name__ == "__main__":
     print("[*] CRYPT: Biometric Crypto Bridge Initialized.")
     bridge = BiometricCryptBridge()
@@ -41,3 +58,5 @@ if __name__ == "__main__":
     dummy_sig = np.random.rand(64)
     wallet_info = bridge.open_galaxy_wallet(dummy_sig)
     print(f"[CRYPT] Carteira Biometrizada: {wallet_info['address']}")
+    batch = bridge.open_galaxy_wallets([np.random.rand(64) for _ in range(100)])
+    print(f"[CRYPT] Lote: {len(batch)} carteiras biometrizadas")
@@ -3,265 +3,409 @@
 Bitcoin Real-Time API Integration
 Integração com APIs reais de Bitcoin para preços, blockchain e trading
 """
+import asyncio
 import requests
+import requests.adapters
 import json
 import time
-from typing import Dict, Optional, List
-import websocket
-import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from typing import Any, Callable, Dict, NamedTuple, Optional, List
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except Exception:
+    aiohttp = None
+    HAS_AIOHTTP = False
+
+from price_feed import PriceFeed, PriceTick, Subscription
+from response_cache import ResponseCache, cached_async_method, cached_method
+from trade_ledger import InsufficientFunds, TradeLedger
+
+# TTL e janela stale-while-revalidate por endpoint (segundos)
+ENDPOINT_TTLS = {
+    'get_current_price': (5.0, 30.0),
+    'get_market_data': (60.0, 300.0),
+    'get_blockchain_stats': (120.0, 600.0),
+    'get_latest_blocks': (30.0, 120.0),
+    'get_historical_data': (3600.0, 6 * 3600.0),
+    'search_transaction': (300.0, 3600.0),
+}
+
+HTTP_POOL_SIZE = 16  # Conexões keep-alive por host (sessão síncrona e aiohttp)
+
+
+class ProviderRequest(NamedTuple):
+    """Uma chamada REST a um provedor + o parser que extrai o resultado do JSON."""
+    provider: str  # chave de base_urls
+    path: str
+    params: Optional[Dict[str, str]]
+    timeout: float
+    parse: Callable[[Any], Any]
+
+
+# --- Parsers (compartilhados pelas variantes síncrona e assíncrona) ---
+
+def _parse_market_data(data: Dict) -> Dict:
+    market = data['market_data']
+    return {
+        'price_usd': market['current_price']['usd'],
+        'price_brl': market['current_price']['brl'],
+        'market_cap': market['market_cap']['usd'],
+        'volume_24h': market['total_volume']['usd'],
+        'change_24h': market['price_change_percentage_24h'],
+        'change_7d': market['price_change_percentage_7d'],
+        'change_30d': market['price_change_percentage_30d'],
+        'high_24h': market['high_24h']['usd'],
+        'low_24h': market['low_24h']['usd'],
+        'ath': market['ath']['usd'],
+        'ath_date': market['ath_date']['usd'],
+        'circulating_supply': market['circulating_supply'],
+        'total_supply': market['total_supply'],
+        'max_supply': market['max_supply']
+    }
+
+
+def _parse_blockchain_stats(data: Dict) -> Dict:
+    return {
+        'hash_rate': data.get('hash_rate', 0),
+        'difficulty': data.get('difficulty', 0),
+        'total_btc': data.get('totalbc', 0) / 1e8,
+        'n_btc_mined': data.get('n_btc_mined', 0) / 1e8,
+        'miners_revenue': data.get('miners_revenue_usd', 0),
+        'market_price': data.get('market_price_usd', 0),
+        'total_transactions': data.get('n_tx', 0),
+        'blocks_size': data.get('blocks_size', 0),
+        'avg_block_size': data.get('avgblocksize', 0),
+        'next_retarget': data.get('nextretarget', 0)
+    }
+
+
+def _parse_latest_blocks(data: Dict, limit: int) -> List[Dict]:
+    blocks = []
+    for block in data['blocks'][:limit]:
+        blocks.append({
+            'hash': block['hash'],
+            'height': block['height'],
+            'time': block['time'],
+            'tx_count': block['n_tx'],
+            'size': block['size'],
+            'miner': block.get('relayed_by', 'Unknown')
+        })
+    return blocks
+
+
+def _parse_historical_data(data: Dict) -> Dict:
+    return {
+        'prices': data['prices'],
+        'market_caps': data['market_caps'],
+        'volumes': data['total_volumes']
+    }
+
+
+def _parse_transaction(data: Dict) -> Dict:
+    return {
+        'hash': data['hash'],
+        'size': data['size'],
+        'time': data['time'],
+        'block_height': data.get('block_height', 0),
+        'inputs': len(data['inputs']),
+        'outputs': len(data['out']),
+        'value': sum(out['value'] for out in data['out']) / 1e8
+    }
+
 
 class BitcoinAPI:
-    """API para dados Bitcoin em tempo real"""
+    """API para dados Bitcoin em tempo real
+    
+    Conexões keep-alive compartilhadas (requests.Session / aiohttp), provedores de preço
+    consultados em paralelo (vence a primeira resposta válida) e cache por endpoint.
+    Cada método get_* tem a variante assíncrona get_*_async.
+    """
     
-    def __init__(self):
+    def __init__(self, base_urls: Optional[Dict[str, str]] = None,
+                 ttls: Optional[Dict[str, tuple]] = None, cache: Optional[ResponseCache] = None,
+                 session: Optional[requests.Session] = None):
         self.base_urls = {
             'coinbase': 'https://api.coinbase.com/v2',
             'blockchain': 'https://blockchain.info',
             'coingecko': 'https://api.coingecko.com/api/v3',
             'binance': 'https://api.binance.com/api/v3'
         }
+        self.base_urls.update(base_urls or {})
+        # Cache na frente de todos os endpoints REST: dashboards consultando a cada 5s
+        # e o TradingEngine compartilham a mesma resposta em vez de abrir uma requisição cada
+        self.ttls = dict(ENDPOINT_TTLS, **(ttls or {}))
+        self.cache = cache or ResponseCache()
+        self.session = session or self._make_session()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='bitcoin-api')
+        self._aio_session = None
+        self._aio_loop = None
         self.ws_url = 'wss://stream.binance.com:9443/ws/btcusdt@ticker'
         self.current_price = None
-        self.ws = None
-        self.ws_thread = None
+        self.price_feed: Optional[PriceFeed] = None
     
-    def get_current_price(self, currency: str = 'USD') -> Optional[float]:
-        """Obtém preço atual do Bitcoin"""
+    @staticmethod
+    def _make_session() -> requests.Session:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self) -> None:
+        """Fecha a sessão HTTP síncrona e o pool de threads da corrida de provedores."""
+        self.session.close()
+        self._executor.shutdown(wait=False)
+    
+    async def aclose(self) -> None:
+        """Fecha a sessão aiohttp (chamar no mesmo event loop das variantes _async)."""
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+    
+    # --- Requisições (síncrono) ---
+    
+    def _request(self, spec: ProviderRequest):
         try:
-            # Tentar múltiplas APIs para redundância
-            
-            # 1. CoinGecko (sem necessidade de API key)
-            url = f"{self.base_urls['coingecko']}/simple/price"
-            params = {
-                'ids': 'bitcoin',
-                'vs_currencies': currency.lower()
-            }
-            response = requests.get(url, params=params, timeout=5)
+            response = self.session.get(f"{self.base_urls[spec.provider]}{spec.path}",
+                                        params=spec.params, timeout=spec.timeout)
             if response.status_code == 200:
-                data = response.json()
-                return data['bitcoin'][currency.lower()]
-            
-            # 2. Blockchain.info
-            url = f"{self.base_urls['blockchain']}/ticker"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return data[currency]['last']
-            
-            # 3. Coinbase
-            url = f"{self.base_urls['coinbase']}/prices/BTC-{currency}/spot"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return float(data['data']['amount'])
-                
-        except Exception as e:
-            print(f"[⚠️] Erro ao obter preço: {e}")
-            return None
+                return spec.parse(response.json())
+        except Exception:
+            pass
+        return None
+    
+    def _fetch(self, specs: List[ProviderRequest], label: str):
+        """Um provedor: chamada direta. Vários: todos em paralelo, vence a primeira resposta válida."""
+        if len(specs) == 1:
+            value = self._request(specs[0])
+        else:
+            value = None
+            futures = [self._executor.submit(self._request, spec) for spec in specs]
+            try:
+                for future in as_completed(futures, timeout=max(spec.timeout for spec in specs)):
+                    value = future.result()
+                    if value is not None:
+                        break
+            except FuturesTimeout:
+                pass
+            for future in futures:
+                future.cancel()
+        if value is None:
+            print(f"[⚠️] Erro ao obter {label}: nenhum provedor respondeu")
+        return value
+    
+    # --- Requisições (assíncrono) ---
+    
+    def _get_aio_session(self):
+        if not HAS_AIOHTTP:
+            raise RuntimeError("Biblioteca 'aiohttp' nao disponivel.")
+        loop = asyncio.get_running_loop()
+        session = self._aio_session
+        # A sessão aiohttp pertence ao loop que a criou
+        if session is None or session.closed or self._aio_loop is not loop:
+            connector = aiohttp.TCPConnector(limit_per_host=HTTP_POOL_SIZE, keepalive_timeout=30)
+            session = self._aio_session = aiohttp.ClientSession(connector=connector)
+            self._aio_loop = loop
+        return session
+    
+    async def _request_async(self, session, spec: ProviderRequest):
+        try:
+            async with session.get(f"{self.base_urls[spec.provider]}{spec.path}", params=spec.params,
+                                   timeout=aiohttp.ClientTimeout(total=spec.timeout)) as response:
+                if response.status == 200:
+                    return spec.parse(await response.json(content_type=None))
+        except Exception:
+            pass
+        return None
+    
+    async def _fetch_async(self, specs: List[ProviderRequest], label: str):
+        session = self._get_aio_session()
+        value = None
+        tasks = [asyncio.ensure_future(self._request_async(session, spec)) for spec in specs]
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=max(spec.timeout for spec in specs)):
+                value = await next_done
+                if value is not None:
+                    break
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()  # Perdedores da corrida não seguram conexões
+        if value is None:
+            print(f"[⚠️] Erro ao obter {label}: nenhum provedor respondeu")
+        return value
+    
+    # --- Endpoints ---
+    
+    def _price_requests(self, currency: str) -> List[ProviderRequest]:
+        code = currency.lower()
+        return [
+            # CoinGecko (sem necessidade de API key), Blockchain.info e Coinbase: todos ao mesmo tempo
+            ProviderRequest('coingecko', '/simple/price', {'ids': 'bitcoin', 'vs_currencies': code}, 5,
+                            lambda data: data['bitcoin'][code]),
+            ProviderRequest('blockchain', '/ticker', None, 5,
+                            lambda data: data[currency]['last']),
+            ProviderRequest('coinbase', f'/prices/BTC-{currency}/spot', None, 5,
+                            lambda data: float(data['data']['amount'])),
+        ]
+    
+    def _market_data_requests(self) -> List[ProviderRequest]:
+        params = {
+            'localization': 'false',
+            'tickers': 'false',
+            'community_data': 'false',
+            'developer_data': 'false'
+        }
+        return [ProviderRequest('coingecko', '/coins/bitcoin', params, 10, _parse_market_data)]
+    
+    def _blockchain_stats_requests(self) -> List[ProviderRequest]:
+        return [ProviderRequest('blockchain', '/stats', None, 10, _parse_blockchain_stats)]
+    
+    def _latest_blocks_requests(self, limit: int) -> List[ProviderRequest]:
+        return [ProviderRequest('blockchain', '/blocks', {'format': 'json'}, 10,
+                                lambda data: _parse_latest_blocks(data, limit))]
+    
+    def _historical_data_requests(self, days: int) -> List[ProviderRequest]:
+        params = {'vs_currency': 'usd', 'days': str(days), 'interval': 'daily'}
+        return [ProviderRequest('coingecko', '/coins/bitcoin/market_chart', params, 10,
+                                _parse_historical_data)]
     
+    def _transaction_requests(self, tx_hash: str) -> List[ProviderRequest]:
+        return [ProviderRequest('blockchain', f'/rawtx/{tx_hash}', None, 10, _parse_transaction)]
+    
+    @cached_method
+    def get_current_price(self, currency: str = 'USD') -> Optional[float]:
+        """Obtém preço atual do Bitcoin"""
+        return self._fetch(self._price_requests(currency), "preço")
+    
+    @cached_async_method('get_current_price')
+    async def get_current_price_async(self, currency: str = 'USD') -> Optional[float]:
+        return await self._fetch_async(self._price_requests(currency), "preço")
+    
+    @cached_method
     def get_market_data(self) -> Optional[Dict]:
         """Obtém dados completos do mercado"""
-        try:
-            url = f"{self.base_urls['coingecko']}/coins/bitcoin"
-            params = {
-                'localization': 'false',
-                'tickers': 'false',
-                'community_data': 'false',
-                'developer_data': 'false'
-            }
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                market = data['market_data']
-                
-                return {
-                    'price_usd': market['current_price']['usd'],
-                    'price_brl': market['current_price']['brl'],
-                    'market_cap': market['market_cap']['usd'],
-                    'volume_24h': market['total_volume']['usd'],
-                    'change_24h': market['price_change_percentage_24h'],
-                    'change_7d': market['price_change_percentage_7d'],
-                    'change_30d': market['price_change_percentage_30d'],
-                    'high_24h': market['high_24h']['usd'],
-                    'low_24h': market['low_24h']['usd'],
-                    'ath': market['ath']['usd'],
-                    'ath_date': market['ath_date']['usd'],
-                    'circulating_supply': market['circulating_supply'],
-                    'total_supply': market['total_supply'],
-                    'max_supply': market['max_supply']
-                }
-        except Exception as e:
-            print(f"[⚠️] Erro ao obter dados de mercado: {e}")
-            return None
+        return self._fetch(self._market_data_requests(), "dados de mercado")
     
+    @cached_async_method('get_market_data')
+    async def get_market_data_async(self) -> Optional[Dict]:
+        return await self._fetch_async(self._market_data_requests(), "dados de mercado")
+    
+    @cached_method
     def get_blockchain_stats(self) -> Optional[Dict]:
         """Obtém estatísticas da blockchain Bitcoin"""
-        try:
-            url = f"{self.base_urls['blockchain']}/stats"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'hash_rate': data.get('hash_rate', 0),
-                    'difficulty': data.get('difficulty', 0),
-                    'total_btc': data.get('totalbc', 0) / 1e8,
-                    'n_btc_mined': data.get('n_btc_mined', 0) / 1e8,
-                    'miners_revenue': data.get('miners_revenue_usd', 0),
-                    'market_price': data.get('market_price_usd', 0),
-                    'total_transactions': data.get('n_tx', 0),
-                    'blocks_size': data.get('blocks_size', 0),
-                    'avg_block_size': data.get('avgblocksize', 0),
-                    'next_retarget': data.get('nextretarget', 0)
-                }
-        except Exception as e:
-            print(f"[⚠️] Erro ao obter stats blockchain: {e}")
-            return None
+        return self._fetch(self._blockchain_stats_requests(), "stats blockchain")
     
+    @cached_async_method('get_blockchain_stats')
+    async def get_blockchain_stats_async(self) -> Optional[Dict]:
+        return await self._fetch_async(self._blockchain_stats_requests(), "stats blockchain")
+    
+    @cached_method
     def get_latest_blocks(self, limit: int = 10) -> Optional[List[Dict]]:
         """Obtém últimos blocos minerados"""
-        try:
-            url = f"{self.base_urls['blockchain']}/blocks"
-            params = {'format': 'json'}
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                blocks = []
-                for block in data['blocks'][:limit]:
-                    blocks.append({
-                        'hash': block['hash'],
-                        'height': block['height'],
-                        'time': block['time'],
-                        'tx_count': block['n_tx'],
-                        'size': block['size'],
-                        'miner': block.get('relayed_by', 'Unknown')
-                    })
-                return blocks
-        except Exception as e:
-            print(f"[⚠️] Erro ao obter blocos: {e}")
-            return None
+        return self._fetch(self._latest_blocks_requests(limit), "blocos")
     
-    def start_websocket(self, callback):
-        """Inicia WebSocket para preços em tempo real"""
-        def on_message(ws, message):
-            try:
-                data = json.loads(message)
-                price = float(data.get('c', 0))  # Current price
-                if price > 0:
-                    self.current_price = price
-                    callback(price, data)
-            except Exception as e:
-                print(f"[⚠️] Erro WebSocket message: {e}")
-        
-        def on_error(ws, error):
-            print(f"[⚠️] WebSocket error: {error}")
-        
-        def on_close(ws, close_status_code, close_msg):
-            print("[ℹ️] WebSocket fechado. Reconectando em 5s...")
-            time.sleep(5)
-            self.start_websocket(callback)
-        
-        def on_open(ws):
-            print("[✅] WebSocket Bitcoin conectado!")
-        
-        def run_ws():
-            self.ws = websocket.WebSocketApp(
-                self.ws_url,
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close,
-                on_open=on_open
-            )
-            self.ws.run_forever()
-        
-        self.ws_thread = threading.Thread(target=run_ws, daemon=True)
-        self.ws_thread.start()
+    @cached_async_method('get_latest_blocks')
+    async def get_latest_blocks_async(self, limit: int = 10) -> Optional[List[Dict]]:
+        return await self._fetch_async(self._latest_blocks_requests(limit), "blocos")
+    
+    def start_websocket(self, callback, buffer_size: int = 1024) -> Subscription:
+        """Inicia o feed de preços em tempo real; callback(preço, dados) recebe sempre o preço mais recente.
+
+        Um único PriceFeed (thread leitora + reconexão com backoff) por instância; chamadas
+        repetidas só acrescentam assinantes. Callbacks lentos perdem ticks intermediários
+        em vez de atrasar a leitura do socket.
+        """
+        if self.price_feed is None:
+            self.price_feed = PriceFeed(self.ws_url, buffer_size=buffer_size)
+            self.price_feed.subscribe(self._track_price)
+        subscription = self.price_feed.subscribe(lambda tick: callback(tick.price, tick.data))
+        self.price_feed.start()
+        return subscription
+    
+    def _track_price(self, tick: PriceTick) -> None:
+        self.current_price = tick.price
     
     def stop_websocket(self):
-        """Para o WebSocket"""
-        if self.ws:
-            self.ws.close()
+        """Para o feed de preços e os assinantes"""
+        if self.price_feed is not None:
+            self.price_feed.stop()
+            self.price_feed = None
+    
+    def price_feed_stats(self) -> Optional[Dict]:
+        """Vazão, latência e reconexões do feed em tempo real (None se não iniciado)"""
+        return self.price_feed.stats() if self.price_feed is not None else None
     
+    @cached_method
     def get_historical_data(self, days: int = 30) -> Optional[Dict]:
         """Obtém dados históricos de preço"""
-        try:
-            url = f"{self.base_urls['coingecko']}/coins/bitcoin/market_chart"
-            params = {
-                'vs_currency': 'usd',
-                'days': days,
-                'interval': 'daily'
-            }
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'prices': data['prices'],
-                    'market_caps': data['market_caps'],
-                    'volumes': data['total_volumes']
-                }
-        except Exception as e:
-            print(f"[⚠️] Erro ao obter dados históricos: {e}")
-            return None
+        return self._fetch(self._historical_data_requests(days), "dados históricos")
     
+    @cached_async_method('get_historical_data')
+    async def get_historical_data_async(self, days: int = 30) -> Optional[Dict]:
+        return await self._fetch_async(self._historical_data_requests(days), "dados históricos")
+    
+    @cached_method
     def search_transaction(self, tx_hash: str) -> Optional[Dict]:
         """Busca uma transação na blockchain real"""
-        try:
-            url = f"{self.base_urls['blockchain']}/rawtx/{tx_hash}"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'hash': data['hash'],
-                    'size': data['size'],
-                    'time': data['time'],
-                    'block_height': data.get('block_height', 0),
-                    'inputs': len(data['inputs']),
-                    'outputs': len(data['out']),
-                    'value': sum(out['value'] for out in data['out']) / 1e8
-                }
-        except Exception as e:
-            print(f"[⚠️] Erro ao buscar transação: {e}")
-            return None
+        return self._fetch(self._transaction_requests(tx_hash), "transação")
+    
+    @cached_async_method('search_transaction')
+    async def search_transaction_async(self, tx_hash: str) -> Optional[Dict]:
+        return await self._fetch_async(self._transaction_requests(tx_hash), "transação")
 
 
 class TradingEngine:
     """Motor de trading automatizado"""
     
-    def __init__(self, api: BitcoinAPI):
+    def __init__(self, api: BitcoinAPI, tick_store=None, ledger: Optional[TradeLedger] = None,
+                 price_max_age: float = 10.0):
         self.api = api
+        self.tick_store = tick_store  # TickStore opcional: histórico local para estratégias
         self.positions = []
-        self.balance_usd = 10000.0  # Saldo inicial simulado
-        self.balance_btc = 0.0
-        self.trade_history = []
+        # Saldos e histórico vêm do livro de trades (log append-only + snapshots, thread-safe)
+        self.ledger = ledger or TradeLedger()
+        self.price_max_age = price_max_age  # Preço marcado pelo feed vale por esse tempo
+        self._price_subscription = None
+    
+    @property
+    def balance_usd(self) -> float:
+        return self.ledger.balance_usd
+    
+    @property
+    def balance_btc(self) -> float:
+        return self.ledger.balance_btc
+    
+    @property
+    def trade_history(self) -> List[Dict]:
+        return self.ledger.history()
+    
+    def attach_price_feed(self, feed) -> None:
+        """Marca o portfólio a cada tick do PriceFeed: valuation e ordens sem ida à rede"""
+        self._price_subscription = feed.subscribe(lambda tick: self.ledger.mark(tick.price))
+    
+    def _current_price(self) -> Optional[float]:
+        marked_at = self.ledger.marked_at
+        if marked_at is not None and time.time() - marked_at <= self.price_max_age:
+            return self.ledger.mark_price
+        price = self.api.get_current_price()
+        if price:
+            self.ledger.mark(price)
+        return price
     
     def buy_bitcoin(self, amount_usd: float) -> bool:
         """Compra Bitcoin"""
         try:
-            price = self.api.get_current_price()
+            price = self._current_price()
             if not price:
                 return False
-            
-            btc_amount = amount_usd / price
-            
-            if self.balance_usd >= amount_usd:
-                self.balance_usd -= amount_usd
-                self.balance_btc += btc_amount
-                
-                trade = {
-                    'type': 'BUY',
-                    'amount_usd': amount_usd,
-                    'amount_btc': btc_amount,
-                    'price': price,
-                    'timestamp': time.time()
-                }
-                self.trade_history.append(trade)
-                print(f"[✅] COMPRA: ${amount_usd:.2f} = {btc_amount:.8f} BTC @ ${price:.2f}")
-                return True
-            
+            trade = self.ledger.buy(amount_usd, price)
+            print(f"[✅] COMPRA: ${amount_usd:.2f} = {trade['amount_btc']:.8f} BTC @ ${price:.2f}")
+            return True
+        except InsufficientFunds:
             return False
         except Exception as e:
             print(f"[❌] Erro na compra: {e}")
@@ -270,40 +414,53 @@ class TradingEngine:
     def sell_bitcoin(self, btc_amount: float) -> bool:
         """Vende Bitcoin"""
         try:
-            price = self.api.get_current_price()
+            price = self._current_price()
             if not price:
                 return False
-            
-            usd_amount = btc_amount * price
-            
-            if self.balance_btc >= btc_amount:
-                self.balance_btc -= btc_amount
-                self.balance_usd += usd_amount
-                
-                trade = {
-                    'type': 'SELL',
-                    'amount_btc': btc_amount,
-                    'amount_usd': usd_amount,
-                    'price': price,
-                    'timestamp': time.time()
-                }
-                self.trade_history.append(trade)
-                print(f"[✅] VENDA: {btc_amount:.8f} BTC = ${usd_amount:.2f} @ ${price:.2f}")
-                return True
-            
+            trade = self.ledger.sell(btc_amount, price)
+            print(f"[✅] VENDA: {btc_amount:.8f} BTC = ${trade['amount_usd']:.2f} @ ${price:.2f}")
+            return True
+        except InsufficientFunds:
             return False
         except Exception as e:
             print(f"[❌] Erro na venda: {e}")
             return False
     
     def get_portfolio_value(self) -> float:
-        """Retorna valor total do portfólio"""
-        price = self.api.get_current_price() or 0
-        return self.balance_usd + (self.balance_btc * price)
+        """Retorna valor total do portfólio (O(1) com preço marcado pelo feed)"""
+        value = self.ledger.portfolio_value()
+        if value is not None and time.time() - self.ledger.marked_at <= self.price_max_age:
+            return value
+        self.ledger.mark(self.api.get_current_price() or 0)
+        value = self.ledger.portfolio_value()
+        return value if value is not None else self.balance_usd
+    
+    def get_candles(self, interval: str = '1h', count: int = 100):
+        """Últimos candles OHLCV do histórico local (None sem tick_store)"""
+        if self.tick_store is None:
+            return None
+        return self.tick_store.last_candles(interval, count)
+    
+    def backtest(self, strategy='sma_crossover', params: Optional[Dict] = None, interval: str = '1h',
+                 days: int = 365):
+        """Roda uma estratégia offline sobre o histórico local (tick_store) ou, sem ele, o do CoinGecko"""
+        from backtest import run_backtest
+        if self.tick_store is not None:
+            candles = self.tick_store.get_candles(interval)
+            prices, timestamps = candles.close, candles.ts / 1000.0
+        else:
+            data = self.api.get_historical_data(days)
+            if not data:
+                return None
+            timestamps = [ts / 1000.0 for ts, _ in data['prices']]
+            prices = [price for _, price in data['prices']]
+        if len(prices) < 2:
+            return None
+        return run_backtest(prices, strategy, params, timestamps)
     
     def get_profit_loss(self) -> float:
         """Retorna lucro/prejuízo"""
-        initial = 10000.0
+        initial = self.ledger.initial_usd
         current = self.get_portfolio_value()
         return current - initial
 
@@ -1,8 +1,17 @@
 import hashlib
 import json
+import os
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
+from block_store import open_chain
+from chain_validator import FAIL_MESSAGES, ChainValidator
+from config import LEDGER_CHECKPOINT_BLOCKS
+from ledger_index import BalanceIndex
+from mempool import DEFAULT_MAX_BLOCK_BYTES, Mempool, estimate_tx_size
+from merkle_tree import MerkleTree, proof_to_hex
+from mining_engine import HeaderHasher, MiningEngine, get_default_engine
 
 # --- BITCOIN BLOCKCHAIN CORE ---
 # Implementação de blockchain inspirada no Bitcoin
@@ -17,6 +26,8 @@ class Transaction:
         self.amount = amount
         self.timestamp = timestamp or time.time()
         self.signature = None
+        self.public_key = None
+        self.fee = 0.0  # Definida pelo Mempool.add; paga pelo remetente ao minerador (fora do tx_hash)
         self.tx_hash = self.calculate_hash()
     
     def calculate_hash(self) -> str:
@@ -31,8 +42,29 @@ class Transaction:
             'amount': self.amount,
             'timestamp': self.timestamp,
             'tx_hash': self.tx_hash,
-            'signature': self.signature
+            'signature': self.signature,
+            'public_key': self.public_key,
+            'fee': self.fee
         }
+    
+    def sign(self, wallet) -> None:
+        """Assina o tx_hash com a carteira (BitcoinWallet) e anexa a chave pública."""
+        self.signature = wallet.sign_transaction(self.tx_hash)
+        self.public_key = wallet.public_key
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Transaction':
+        """Reconstrói a transação sem recalcular o hash armazenado."""
+        tx = cls.__new__(cls)
+        tx.sender = data['sender']
+        tx.recipient = data['recipient']
+        tx.amount = data['amount']
+        tx.timestamp = data['timestamp']
+        tx.signature = data.get('signature')
+        tx.public_key = data.get('public_key')
+        tx.fee = data.get('fee', 0.0)
+        tx.tx_hash = data['tx_hash']
+        return tx
 
 
 class Block:
@@ -48,44 +80,69 @@ class Block:
         self.merkle_root = self.calculate_merkle_root()
         self.hash = None
     
+    def merkle_tree(self) -> MerkleTree:
+        """Árvore de Merkle das transações, em cache enquanto os tx_hash não mudam."""
+        tx_hashes = tuple(tx.tx_hash for tx in self.transactions)
+        cached = getattr(self, '_merkle_cache', None)
+        if cached is not None:
+            cached_hashes, tree = cached
+            if cached_hashes == tx_hashes:
+                return tree
+            if tx_hashes[:len(cached_hashes)] == cached_hashes:
+                # Só houve append: atualiza o caminho de cada nova folha
+                for tx_hash in tx_hashes[len(cached_hashes):]:
+                    tree.append(bytes.fromhex(tx_hash))
+                self._merkle_cache = (tx_hashes, tree)
+                return tree
+        tree = MerkleTree.from_hex(tx_hashes)
+        self._merkle_cache = (tx_hashes, tree)
+        return tree
+    
     def calculate_merkle_root(self) -> str:
         """Calcula Merkle Root das transações (como no Bitcoin)."""
-        if not self.transactions:
-            return hashlib.sha256(b'').hexdigest()
-        
-        tx_hashes = [tx.tx_hash for tx in self.transactions]
-        
-        while len(tx_hashes) > 1:
-            if len(tx_hashes) % 2 != 0:
-                tx_hashes.append(tx_hashes[-1])
-            
-            new_hashes = []
-            for i in range(0, len(tx_hashes), 2):
-                combined = tx_hashes[i] + tx_hashes[i + 1]
-                new_hash = hashlib.sha256(combined.encode()).hexdigest()
-                new_hashes.append(new_hash)
-            
-            tx_hashes = new_hashes
-        
-        return tx_hashes[0]
+        return self.merkle_tree().root_hex
+    
+    def merkle_proof(self, tx_hash: str) -> Optional[List[Tuple[str, bool]]]:
+        """Prova de inclusão de uma transação (None se ela não está no bloco)."""
+        tree = self.merkle_tree()
+        index = tree.index_of(bytes.fromhex(tx_hash))
+        if index is None:
+            return None
+        return proof_to_hex(tree.proof(index))
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # A árvore em cache não viaja no pickle (pools de validação/mineração)
+        state = self.__dict__.copy()
+        state.pop('_merkle_cache', None)
+        return state
+    
+    def header_parts(self) -> Tuple[str, str]:
+        """Divide o cabeçalho em (prefixo, sufixo) em volta do nonce."""
+        return f"{self.index}{self.previous_hash}{self.timestamp}{self.merkle_root}", ""
     
     def calculate_hash(self) -> str:
         """Calcula hash do bloco."""
-        block_data = f"{self.index}{self.previous_hash}{self.timestamp}{self.merkle_root}{self.nonce}"
-        return hashlib.sha256(block_data.encode()).hexdigest()
+        prefix, suffix = self.header_parts()
+        return HeaderHasher(prefix, suffix).hexdigest(self.nonce)
     
-    def mine_block(self, difficulty: int) -> None:
-        """Minera o bloco com Proof of Work (como no Bitcoin)."""
-        target = '0' * difficulty
+    def mine_block(self, difficulty: int, engine: Optional[MiningEngine] = None,
+                   cancel_event=None, on_progress=None) -> None:
+        """Minera o bloco com Proof of Work (como no Bitcoin).
+        
+        cancel_event interrompe a busca com MiningCancelled; on_progress(nonce, hash) recebe o progresso.
+        """
+        engine = engine or get_default_engine()
         print(f"[*] Minerando bloco #{self.index} (dificuldade: {difficulty})...")
         
+        def report(nonce: int, digest: str) -> None:
+            print(f"  Nonce: {nonce:,} | Hash: {digest[:20]}...")
+            if on_progress:
+                on_progress(nonce, digest)
+        
         start_time = time.time()
-        while not self.hash or not self.hash.startswith(target):
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-            
-            if self.nonce % 100000 == 0:
-                print(f"  Nonce: {self.nonce:,} | Hash: {self.hash[:20]}...")
+        prefix, suffix = self.header_parts()
+        self.nonce, self.hash = engine.mine(prefix, suffix, difficulty, start_nonce=self.nonce,
+                                            on_progress=report, cancel_event=cancel_event)
         
         elapsed = time.time() - start_time
         print(f"[*] Bloco minerado! Nonce: {self.nonce:,} | Tempo: {elapsed:.2f}s")
@@ -101,20 +158,60 @@ class Block:
             'merkle_root': self.merkle_root,
             'hash': self.hash
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Block':
+        """Reconstrói o bloco sem recalcular Merkle Root nem hash."""
+        block = cls.__new__(cls)
+        block.index = data['index']
+        block.transactions = [Transaction.from_dict(tx) for tx in data['transactions']]
+        block.previous_hash = data['previous_hash']
+        block.timestamp = data['timestamp']
+        block.nonce = data['nonce']
+        block.merkle_root = data['merkle_root']
+        block.hash = data['hash']
+        return block
 
 
 class BitcoinBlockchain:
     """Blockchain completa com consenso Proof of Work."""
     
-    def __init__(self, difficulty: int = 4):
-        self.chain: List[Block] = []
+    block_class = Block          # Subclasses (ex.: SingularityCoin) trocam o tipo de bloco
+    reward_sender = "SYSTEM"     # Origem da recompensa de mineração
+    
+    def __init__(self, difficulty: int = 4, data_dir: Optional[str] = None,
+                 checkpoint_every: int = LEDGER_CHECKPOINT_BLOCKS):
+        # Com data_dir a cadeia é persistida em disco (append-only + mmap)
+        self.data_dir = data_dir
+        self.checkpoint_every = checkpoint_every  # Snapshot do índice de saldos a cada N blocos
+        self.chain = open_chain(data_dir) if data_dir else []
         self.difficulty = difficulty
-        self.pending_transactions: List[Transaction] = []
+        self.pending_transactions = Mempool()  # Prioridade por taxa + teto de memória
+        self.max_block_bytes = DEFAULT_MAX_BLOCK_BYTES
         self.mining_reward = 50.0
         self.halving_interval = 210000  # Como no Bitcoin
+        self.ledger = BalanceIndex()  # Índice incremental de saldos
+        self.validator = ChainValidator()  # Validação paralela + checkpoint incremental
+        self.lock = threading.RLock()  # Escritor único da cadeia
+        self.tip_listeners = []  # callback(bloco) chamado a cada novo topo
         
-        # Genesis Block
-        self.create_genesis_block()
+        if self.chain:
+            print(f"[*] Blockchain carregada do disco: {len(self.chain)} blocos")
+            self.ledger.load(self._ledger_snapshot_path(), self.chain)
+        else:
+            # Genesis Block (append_block já o aplica no índice)
+            self.create_genesis_block()
+    
+    def _ledger_snapshot_path(self) -> str:
+        return os.path.join(self.data_dir, 'ledger.json')
+    
+    def close(self) -> None:
+        """Fecha a loja em disco salvando o snapshot do índice de saldos."""
+        if self.data_dir:
+            self.ledger.sync(self.chain)
+            self.ledger.save(self._ledger_snapshot_path())
+            self.chain.close()
+        self.validator.close()
     
     def create_genesis_block(self) -> None:
         """Cria o bloco gênesis (primeiro bloco)."""
@@ -127,101 +224,107 @@ class BitcoinBlockchain:
         )
         genesis_block = Block(0, [genesis_tx], "0" * 64, timestamp=1231006505)
         genesis_block.mine_block(self.difficulty)
-        self.chain.append(genesis_block)
+        self.append_block(genesis_block)
         print("[*] Genesis Block criado!")
     
+    def append_block(self, block: Block) -> None:
+        """Anexa um bloco minerado à cadeia e atualiza o índice de saldos."""
+        with self.lock:
+            self.chain.append(block)
+            self.ledger.sync(self.chain)
+            if self.data_dir:
+                # Sem depender de close(): um crash perde no máximo checkpoint_every blocos de reindexação
+                self.ledger.checkpoint(self._ledger_snapshot_path(), self.checkpoint_every)
+            for listener in list(self.tip_listeners):
+                listener(block)
+    
     def get_latest_block(self) -> Block:
         """Retorna o último bloco da cadeia."""
         return self.chain[-1]
     
-    def add_transaction(self, transaction: Transaction) -> bool:
-        """Adiciona transação ao pool de transações pendentes."""
+    def add_transaction(self, transaction: Transaction, fee: float = 0.0) -> bool:
+        """Adiciona transação ao mempool (fee define a prioridade e é paga pelo remetente ao minerador)."""
         if not transaction.sender or not transaction.recipient:
             print("[❌] Transação inválida: falta sender ou recipient")
             return False
         
-        self.pending_transactions.append(transaction)
+        if not self.pending_transactions.add(transaction, fee):
+            print(f"[❌] Transação recusada pelo mempool (duplicada, taxa inválida ou baixa demais): {transaction.tx_hash[:16]}...")
+            return False
         print(f"[*] Transacao adicionada: {transaction.sender[:8]}... -> {transaction.recipient[:8]}... ({transaction.amount})")
         return True
     
+    def prepare_block(self, miner_address: str) -> Tuple[Block, List[Transaction]]:
+        """Monta o template do próximo bloco: transações por prioridade + recompensa (subsídio + taxas) no fim."""
+        with self.lock:
+            reward_size = estimate_tx_size(Transaction(self.reward_sender, miner_address, 0))
+            transactions = self.pending_transactions.block_template(self.max_block_bytes - reward_size)
+            included = list(transactions)
+            # As taxas debitadas dos remetentes (BalanceIndex) voltam ao minerador na recompensa
+            fees = sum(tx.fee for tx in included)
+            transactions.append(Transaction(self.reward_sender, miner_address, self.get_mining_reward() + fees))
+            block = self.block_class(
+                index=len(self.chain),
+                transactions=transactions,
+                previous_hash=self.get_latest_block().hash
+            )
+            return block, included
+    
+    def commit_block(self, block: Block, included: List[Transaction]) -> bool:
+        """Anexa um bloco minerado a partir de prepare_block. False se o topo mudou nesse meio-tempo."""
+        with self.lock:
+            if block.previous_hash != self.get_latest_block().hash:
+                return False
+            self.append_block(block)
+            # Remove do mempool só o que entrou no bloco; o restante espera o próximo
+            self.pending_transactions.remove_many(included)
+            return True
+    
     def mine_pending_transactions(self, miner_address: str) -> None:
         """Minera as transações pendentes (cria novo bloco)."""
         if not self.pending_transactions:
             print("[⚠️] Nenhuma transação pendente para minerar - criando bloco apenas com recompensa")
             # Continue: still award mining reward even if there are no pending transactions
         
-        # Adiciona recompensa de mineração
-        reward = self.get_mining_reward()
-        reward_tx = Transaction("SYSTEM", miner_address, reward)
-        self.pending_transactions.append(reward_tx)
-        
-        # Cria novo bloco
-        block = Block(
-            index=len(self.chain),
-            transactions=self.pending_transactions,
-            previous_hash=self.get_latest_block().hash
-        )
-        
-        # Minera o bloco
-        block.mine_block(self.difficulty)
-        
-        # Adiciona à cadeia
-        self.chain.append(block)
+        while True:
+            block, included = self.prepare_block(miner_address)
+            # A busca de PoW roda fora do lock; commit_block recusa o bloco se outro chegou antes
+            block.mine_block(self.difficulty)
+            if self.commit_block(block, included):
+                break
+            print("[⚠️] Outro bloco chegou primeiro - refazendo o template")
         
         print(f"[*] Bloco #{block.index} adicionado a blockchain!")
-        print(f"[*] Recompensa mineracao: {reward} BTC -> {miner_address[:16]}...")
-        
-        # Limpa transações pendentes
-        self.pending_transactions = []
+        print(f"[*] Recompensa mineracao: {block.transactions[-1].amount} BTC -> {miner_address[:16]}...")
+    
+    def block_reward(self, block: Block) -> float:
+        """Recompensa paga pelo bloco (subsídio após halving + taxas): a última transação."""
+        return block.transactions[-1].amount
     
     def get_mining_reward(self) -> float:
         """Calcula recompensa de mineração com halving."""
         halvings = len(self.chain) // self.halving_interval
         return self.mining_reward / (2 ** halvings)
     
-    def is_chain_valid(self) -> bool:
-        """Valida a integridade da blockchain."""
+    def is_chain_valid(self, incremental: bool = False) -> bool:
+        """Valida a integridade da blockchain inteira (em paralelo para cadeias longas).
+        
+        incremental=True só verifica os blocos posteriores ao último checkpoint validado.
+        """
         print("\n[🔍] VALIDANDO BLOCKCHAIN...")
         
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-            
-            # Verifica hash do bloco
-            if current_block.hash != current_block.calculate_hash():
-                print(f"[❌] Bloco #{i}: Hash inválido")
-                return False
-            
-            # Verifica ligação com bloco anterior
-            if current_block.previous_hash != previous_block.hash:
-                print(f"[❌] Bloco #{i}: Ligação quebrada com bloco anterior")
-                return False
-            
-            # Verifica Proof of Work
-            if not current_block.hash.startswith('0' * self.difficulty):
-                print(f"[❌] Bloco #{i}: Proof of Work inválido")
-                return False
-            
-            # Verifica Merkle Root
-            if current_block.merkle_root != current_block.calculate_merkle_root():
-                print(f"[❌] Bloco #{i}: Merkle Root inválido")
-                return False
+        failure = self.validator.validate(self.chain, self.difficulty, full=not incremental)
+        if failure:
+            height, code = failure
+            print(f"[❌] Bloco #{height}: {FAIL_MESSAGES[code]}")
+            return False
         
         print("[✅] Blockchain válida! Integridade: 100%")
         return True
     
     def get_balance(self, address: str) -> float:
-        """Calcula saldo de um endereço."""
-        balance = 0.0
-        
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender == address:
-                    balance -= tx.amount
-                if tx.recipient == address:
-                    balance += tx.amount
-        
-        return balance
+        """Calcula saldo de um endereço (O(1) via índice de saldos)."""
+        return self.ledger.balance(address, self.chain)
     
     def print_chain(self) -> None:
         """Imprime a blockchain completa."""
@@ -0,0 +1,390 @@
+import io
+import json
+import struct
+import time
+from typing import BinaryIO, Iterator, Tuple
+
+from bitcoin_blockchain import Block, Transaction
+
+# --- COMPACT BINARY CODEC ---
+# Formato binário versionado para Transaction, Block e SingularityBlock.
+#   frame  = versão (u8) | tipo (u8) | corpo
+#   hashes = 32 bytes crus (em vez de 64 caracteres hex)
+#   inteiros sem sinal = varint LEB128, valores = float64 little-endian (largura fixa)
+# Timestamps/valores inteiros (ex.: genesis 1231006505) são marcados em flags para que
+# f"{timestamp}" — e portanto o hash do bloco — continue idêntico após o round-trip.
+# v2: chave pública opcional da transação (flag TX_HAS_PUBLIC_KEY).
+# v3: taxa opcional da transação (flag TX_HAS_FEE, float64). Frames v1/v2 continuam legíveis.
+
+CODEC_VERSION = 3
+SUPPORTED_VERSIONS = (1, 2, 3)
+
+KIND_TRANSACTION = 0x01
+KIND_BLOCK = 0x02
+KIND_SINGULARITY_BLOCK = 0x03
+
+# Flags de Transaction
+TX_AMOUNT_INT = 0x01
+TX_TIMESTAMP_INT = 0x02
+TX_HAS_SIGNATURE = 0x04
+TX_SIGNATURE_TEXT = 0x08
+TX_HAS_PUBLIC_KEY = 0x10
+TX_HAS_FEE = 0x20
+
+# Flags de Block
+BLOCK_TIMESTAMP_INT = 0x01
+BLOCK_HAS_HASH = 0x02
+
+# Tags de campos de texto opcionais (manifold_proof / lattice_witness)
+FIELD_NONE = 0
+FIELD_HASH = 1
+FIELD_TEXT = 2
+
+_F64 = struct.Struct('<d')
+_HEADER = struct.Struct('<BB')
+_MAX_EXACT_INT = 2 ** 53
+
+
+class CodecError(ValueError):
+    """Dados que não podem ser codificados/decodificados no formato binário."""
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise CodecError(f"varint negativo: {value}")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_number(out: bytearray, value) -> bool:
+    """Grava float64; retorna True se o valor original era int (para a flag)."""
+    is_int = isinstance(value, int) and not isinstance(value, bool)
+    if is_int and abs(value) >= _MAX_EXACT_INT:
+        raise CodecError(f"inteiro {value} não cabe exatamente em float64")
+    out += _F64.pack(value)
+    return is_int
+
+
+def _write_hash(out: bytearray, hex_hash: str) -> None:
+    raw = bytes.fromhex(hex_hash)
+    if len(raw) != 32 or raw.hex() != hex_hash:
+        raise CodecError(f"hash inválido para o codec binário: {hex_hash!r}")
+    out += raw
+
+
+def _write_text(out: bytearray, text: str) -> None:
+    raw = text.encode()
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_text(buf: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = _read_varint(buf, pos)
+    return buf[pos:pos + length].decode(), pos + length
+
+
+def _is_hex(text: str) -> bool:
+    try:
+        return bytes.fromhex(text).hex() == text
+    except ValueError:
+        return False
+
+
+def _write_optional_field(out: bytearray, value) -> None:
+    if value is None:
+        out.append(FIELD_NONE)
+    elif isinstance(value, str) and len(value) == 64 and _is_hex(value):
+        out.append(FIELD_HASH)
+        out += bytes.fromhex(value)
+    else:
+        out.append(FIELD_TEXT)
+        _write_text(out, str(value))
+
+
+def _read_optional_field(buf: bytes, pos: int):
+    tag = buf[pos]
+    pos += 1
+    if tag == FIELD_NONE:
+        return None, pos
+    if tag == FIELD_HASH:
+        return buf[pos:pos + 32].hex(), pos + 32
+    return _read_text(buf, pos)
+
+
+# --- Transaction ---
+
+def _encode_tx_body(out: bytearray, tx: Transaction) -> None:
+    flag_pos = len(out)
+    out.append(0)
+    _write_text(out, tx.sender)
+    _write_text(out, tx.recipient)
+    flags = 0
+    if _write_number(out, tx.amount):
+        flags |= TX_AMOUNT_INT
+    if _write_number(out, tx.timestamp):
+        flags |= TX_TIMESTAMP_INT
+    _write_hash(out, tx.tx_hash)
+    if tx.signature is not None:
+        flags |= TX_HAS_SIGNATURE
+        if _is_hex(tx.signature):
+            raw = bytes.fromhex(tx.signature)
+        else:
+            flags |= TX_SIGNATURE_TEXT
+            raw = tx.signature.encode()
+        _write_varint(out, len(raw))
+        out += raw
+    public_key = getattr(tx, 'public_key', None)
+    if public_key is not None:
+        if not _is_hex(public_key):
+            raise CodecError(f"chave pública inválida para o codec binário: {public_key!r}")
+        flags |= TX_HAS_PUBLIC_KEY
+        raw = bytes.fromhex(public_key)
+        _write_varint(out, len(raw))
+        out += raw
+    fee = getattr(tx, 'fee', 0.0)
+    if fee:
+        flags |= TX_HAS_FEE
+        out += _F64.pack(fee)
+    out[flag_pos] = flags
+
+
+_TX_FIXED = struct.Struct('<dd32s')
+
+
+def _decode_tx_body(buf: bytes, pos: int) -> Tuple[Transaction, int]:
+    flags = buf[pos]
+    tx = Transaction.__new__(Transaction)
+    # Caminho rápido: endereços com menos de 128 bytes têm varint de 1 byte
+    length = buf[pos + 1]
+    if length < 0x80:
+        pos += 2
+    else:
+        length, pos = _read_varint(buf, pos + 1)
+    tx.sender = buf[pos:pos + length].decode()
+    pos += length
+    length = buf[pos]
+    if length < 0x80:
+        pos += 1
+    else:
+        length, pos = _read_varint(buf, pos)
+    tx.recipient = buf[pos:pos + length].decode()
+    pos += length
+    amount, timestamp, tx_hash = _TX_FIXED.unpack_from(buf, pos)
+    pos += _TX_FIXED.size
+    tx.amount = int(amount) if flags & TX_AMOUNT_INT else amount
+    tx.timestamp = int(timestamp) if flags & TX_TIMESTAMP_INT else timestamp
+    tx.tx_hash = tx_hash.hex()
+    tx.signature = None
+    if flags & TX_HAS_SIGNATURE:
+        length, pos = _read_varint(buf, pos)
+        raw = buf[pos:pos + length]
+        pos += length
+        tx.signature = raw.decode() if flags & TX_SIGNATURE_TEXT else raw.hex()
+    tx.public_key = None
+    if flags & TX_HAS_PUBLIC_KEY:
+        length, pos = _read_varint(buf, pos)
+        tx.public_key = buf[pos:pos + length].hex()
+        pos += length
+    tx.fee = 0.0
+    if flags & TX_HAS_FEE:
+        tx.fee, = _F64.unpack_from(buf, pos)
+        pos += 8
+    return tx, pos
+
+
+# --- Block / SingularityBlock ---
+
+def _encode_block_body(out: bytearray, block: Block) -> None:
+    flag_pos = len(out)
+    out.append(0)
+    flags = 0
+    _write_varint(out, block.index)
+    if _write_number(out, block.timestamp):
+        flags |= BLOCK_TIMESTAMP_INT
+    _write_hash(out, block.previous_hash)
+    _write_hash(out, block.merkle_root)
+    _write_varint(out, block.nonce)
+    if block.hash is not None:
+        flags |= BLOCK_HAS_HASH
+        _write_hash(out, block.hash)
+    _write_varint(out, len(block.transactions))
+    for tx in block.transactions:
+        _encode_tx_body(out, tx)
+    if hasattr(block, 'lattice_witness'):
+        _write_optional_field(out, block.manifold_proof)
+        _write_optional_field(out, block.lattice_witness)
+        out += _F64.pack(float(block.nexus_resonance))
+    out[flag_pos] = flags
+
+
+def _decode_block_body(buf: bytes, pos: int, cls, singularity: bool = False) -> Tuple[Block, int]:
+    flags = buf[pos]
+    pos += 1
+    block = cls.__new__(cls)
+    block.index, pos = _read_varint(buf, pos)
+    timestamp, = _F64.unpack_from(buf, pos)
+    pos += 8
+    block.timestamp = int(timestamp) if flags & BLOCK_TIMESTAMP_INT else timestamp
+    block.previous_hash = buf[pos:pos + 32].hex()
+    block.merkle_root = buf[pos + 32:pos + 64].hex()
+    pos += 64
+    block.nonce, pos = _read_varint(buf, pos)
+    block.hash = None
+    if flags & BLOCK_HAS_HASH:
+        block.hash = buf[pos:pos + 32].hex()
+        pos += 32
+    count, pos = _read_varint(buf, pos)
+    transactions = []
+    for _ in range(count):
+        tx, pos = _decode_tx_body(buf, pos)
+        transactions.append(tx)
+    block.transactions = transactions
+    if singularity:
+        block.manifold_proof, pos = _read_optional_field(buf, pos)
+        block.lattice_witness, pos = _read_optional_field(buf, pos)
+        block.nexus_resonance, = _F64.unpack_from(buf, pos)
+        pos += 8
+    return block, pos
+
+
+def _singularity_block_class():
+    # Import tardio: singularity_coin puxa visão computacional e reticulados
+    from singularity_coin import SingularityBlock
+    return SingularityBlock
+
+
+# --- API pública ---
+
+def encode_transaction(tx: Transaction) -> bytes:
+    out = bytearray(_HEADER.pack(CODEC_VERSION, KIND_TRANSACTION))
+    _encode_tx_body(out, tx)
+    return bytes(out)
+
+
+def encode_block(block: Block) -> bytes:
+    kind = KIND_SINGULARITY_BLOCK if hasattr(block, 'lattice_witness') else KIND_BLOCK
+    out = bytearray(_HEADER.pack(CODEC_VERSION, kind))
+    _encode_block_body(out, block)
+    return bytes(out)
+
+
+def decode(data) -> object:
+    """Decodifica um frame (Transaction, Block ou SingularityBlock); CodecError se for inválido."""
+    buf = bytes(data)
+    if len(buf) < _HEADER.size:
+        raise CodecError(f"frame de {len(buf)} bytes não tem cabeçalho")
+    version, kind = _HEADER.unpack_from(buf, 0)
+    if version not in SUPPORTED_VERSIONS:
+        raise CodecError(f"versão de codec não suportada: {version}")
+    # Os leitores internos não checam limites (caminho quente): um frame truncado estoura em
+    # struct/índice/UTF-8, ou as fatias curtas deixam pos além do fim, pego logo abaixo
+    try:
+        if kind == KIND_TRANSACTION:
+            obj, pos = _decode_tx_body(buf, _HEADER.size)
+        elif kind == KIND_BLOCK:
+            obj, pos = _decode_block_body(buf, _HEADER.size, Block)
+        elif kind == KIND_SINGULARITY_BLOCK:
+            obj, pos = _decode_block_body(buf, _HEADER.size, _singularity_block_class(), singularity=True)
+        else:
+            raise CodecError(f"tipo de frame desconhecido: {kind}")
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise CodecError(f"frame truncado ou corrompido: {e}") from e
+    if pos > len(buf):
+        raise CodecError(f"frame truncado: faltam {pos - len(buf)} bytes")
+    if pos != len(buf):
+        raise CodecError(f"{len(buf) - pos} bytes sobrando no frame")
+    return obj
+
+
+# --- Streaming (frames prefixados por tamanho varint) ---
+
+def write_frame(stream: BinaryIO, obj) -> int:
+    """Grava Transaction/Block no stream; retorna bytes escritos."""
+    payload = encode_transaction(obj) if isinstance(obj, Transaction) else encode_block(obj)
+    prefix = bytearray()
+    _write_varint(prefix, len(payload))
+    stream.write(prefix)
+    stream.write(payload)
+    return len(prefix) + len(payload)
+
+
+def read_frames(stream: BinaryIO) -> Iterator[object]:
+    """Itera sobre os objetos gravados com write_frame até o fim do stream."""
+    while True:
+        length = shift = 0
+        while True:
+            byte = stream.read(1)
+            if not byte:
+                if shift:
+                    raise CodecError("stream truncado no prefixo de tamanho")
+                return
+            length |= (byte[0] & 0x7F) << shift
+            shift += 7
+            if not byte[0] & 0x80:
+                break
+        payload = stream.read(length)
+        if len(payload) != length:
+            raise CodecError("stream truncado no meio de um frame")
+        yield decode(payload)
+
+
+def benchmark_codec(n_blocks: int = 200, txs_per_block: int = 50) -> dict:
+    """Compara tamanho e velocidade com json.dumps(block.to_dict())."""
+    blocks = []
+    for i in range(n_blocks):
+        txs = [Transaction(f"addr_{i}_{j}", f"addr_{j}_{i}", 0.5 * j) for j in range(txs_per_block)]
+        block = Block(i, txs, '0' * 64)
+        block.nonce = 123456 + i
+        block.hash = block.calculate_hash()
+        blocks.append(block)
+
+    t0 = time.perf_counter()
+    json_frames = [json.dumps(b.to_dict()).encode() for b in blocks]
+    t_json_enc = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for frame in json_frames:
+        Block.from_dict(json.loads(frame))
+    t_json_dec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bin_frames = [encode_block(b) for b in blocks]
+    t_bin_enc = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for frame in bin_frames:
+        decode(frame)
+    t_bin_dec = time.perf_counter() - t0
+
+    return {
+        'json_bytes': sum(map(len, json_frames)),
+        'binary_bytes': sum(map(len, bin_frames)),
+        'json_encode_s': t_json_enc,
+        'json_decode_s': t_json_dec,
+        'binary_encode_s': t_bin_enc,
+        'binary_decode_s': t_bin_dec,
+    }
+
+
+if __name__ == "__main__":
+    print("--- [BLOCK CODEC BENCHMARK] ---")
+    r = benchmark_codec()
+    print(f"[*] Tamanho: JSON {r['json_bytes']:,} B | binário {r['binary_bytes']:,} B "
+          f"({r['binary_bytes'] / r['json_bytes']:.0%})")
+    print(f"[*] Encode:  JSON {r['json_encode_s'] * 1000:.1f} ms | binário {r['binary_encode_s'] * 1000:.1f} ms")
+    print(f"[*] Decode:  JSON {r['json_decode_s'] * 1000:.1f} ms | binário {r['binary_decode_s'] * 1000:.1f} ms")
+    buf = io.BytesIO()
+    write_frame(buf, Transaction("Alice", "Bob", 1.0))
+    buf.seek(0)
+    print(f"[*] Streaming: {[tx.to_dict()['recipient'] for tx in read_frames(buf)]}")
@@ -0,0 +1,255 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Iterator, Union
+
+# --- PERSISTENT BLOCK STORE ---
+# Armazenamento append-only em disco:
+#   blk00000.dat, blk00001.dat ...  segmentos com os blocos (codec binário), um após o outro
+#   index.dat                       altura -> (segmento, offset, tamanho, crc32), registro fixo
+# Leituras usam mmap: abrir a loja custa O(1) e acessar chain[-10:] só toca a cauda.
+
+INDEX_RECORD = struct.Struct('<IQII')  # segmento, offset, tamanho, crc32
+SEGMENT_MAX_BYTES = 128 * 1024 * 1024
+
+
+def encode_block(block) -> bytes:
+    # Import tardio: block_codec depende de bitcoin_blockchain, que depende desta loja
+    import block_codec
+    return block_codec.encode_block(block)
+
+
+def decode_block(payload: bytes):
+    if payload[:1] == b'{':
+        # Registros antigos gravados como JSON (to_dict)
+        data = json.loads(payload)
+        if data.get('kind') == 'singularity':
+            from singularity_coin import SingularityBlock
+            return SingularityBlock.from_dict(data)
+        from bitcoin_blockchain import Block
+        return Block.from_dict(data)
+    import block_codec
+    return block_codec.decode(payload)
+
+
+class _MappedFile:
+    """mmap somente-leitura que é remapeado quando o arquivo cresce."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.size = 0
+
+    def view(self, end: int) -> mmap.mmap:
+        if self._map is None or end > self.size:
+            self.close()
+            self._file = open(self.path, 'rb')
+            self.size = os.fstat(self._file.fileno()).st_size
+            if end > self.size:
+                raise IndexError(f"Leitura além do fim de {self.path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.size = 0
+
+
+class BlockStore:
+    """Segmentos append-only + índice altura->offset com leitura via mmap."""
+
+    def __init__(self, path: str, fsync: bool = False,
+                 segment_max_bytes: int = SEGMENT_MAX_BYTES, readonly: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.segment_max_bytes = segment_max_bytes
+        self.readonly = readonly
+        self.index_path = os.path.join(path, 'index.dat')
+        self._index_map = _MappedFile(self.index_path)
+        self._segments = {}
+        self._index_file = None
+        self._segment_file = None
+        if readonly:
+            # Leitor de outro processo (ex.: worker de validação): não repara nem grava nada
+            self.refresh()
+            return
+        os.makedirs(path, exist_ok=True)
+        if not os.path.exists(self.index_path):
+            open(self.index_path, 'wb').close()
+        self._recover()
+        self._index_file = open(self.index_path, 'ab')
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f'blk{segment:05d}.dat')
+
+    def _recover(self) -> None:
+        """Descarta escritas parciais de um crash (registro de índice ou bytes de segmento órfãos)."""
+        index_size = os.path.getsize(self.index_path)
+        if index_size % INDEX_RECORD.size:
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(index_size - index_size % INDEX_RECORD.size)
+        self.height = os.path.getsize(self.index_path) // INDEX_RECORD.size
+        # Sem fsync o SO pode perder o fim do segmento e manter o índice: registros finais
+        # cujos dados sumiram ou não batem com o crc32 são descartados
+        dropped = 0
+        while self.height and not self._tail_intact():
+            self.height -= 1
+            dropped += 1
+        if dropped:
+            self._index_map.close()
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(self.height * INDEX_RECORD.size)
+            print(f"[⚠️] BlockStore: {dropped} registro(s) incompletos descartados no fim de {self.path}")
+        if self.height:
+            segment, offset, length, _ = self._record(self.height - 1)
+            self.segment, self.segment_end = segment, offset + length
+            seg_path = self._segment_path(segment)
+            if os.path.getsize(seg_path) > self.segment_end:
+                with open(seg_path, 'r+b') as f:
+                    f.truncate(self.segment_end)
+        else:
+            self.segment, self.segment_end = 0, 0
+        # Segmentos posteriores ao último registro válido só têm dados órfãos
+        later = self.segment + 1
+        while os.path.exists(self._segment_path(later)):
+            os.remove(self._segment_path(later))
+            later += 1
+        if not self.height and os.path.exists(self._segment_path(0)):
+            open(self._segment_path(0), 'wb').close()
+
+    def refresh(self) -> None:
+        """Somente-leitura: passa a enxergar os registros que o escritor anexou desde a abertura."""
+        self.height = os.path.getsize(self.index_path) // INDEX_RECORD.size
+
+    def _tail_intact(self) -> bool:
+        segment, offset, length, crc = self._record(self.height - 1)
+        seg_path = self._segment_path(segment)
+        if not os.path.exists(seg_path) or os.path.getsize(seg_path) < offset + length:
+            return False
+        with open(seg_path, 'rb') as f:
+            f.seek(offset)
+            return zlib.crc32(f.read(length)) == crc
+
+    def _record(self, height: int):
+        start = height * INDEX_RECORD.size
+        view = self._index_map.view(start + INDEX_RECORD.size)
+        return INDEX_RECORD.unpack_from(view, start)
+
+    def __len__(self) -> int:
+        return self.height
+
+    def append(self, payload: bytes) -> int:
+        """Grava um registro e retorna sua altura."""
+        if self.readonly:
+            raise IOError(f"BlockStore {self.path} aberta somente para leitura")
+        if self.segment_end and self.segment_end + len(payload) > self.segment_max_bytes:
+            self.segment += 1
+            self.segment_end = 0
+            if self._segment_file:
+                self._segment_file.close()
+                self._segment_file = None
+        if self._segment_file is None:
+            self._segment_file = open(self._segment_path(self.segment), 'ab')
+        offset = self.segment_end
+        # Dados primeiro, índice depois: um crash nunca deixa índice apontando para o vazio
+        self._segment_file.write(payload)
+        self._segment_file.flush()
+        if self.fsync:
+            os.fsync(self._segment_file.fileno())
+        self._index_file.write(INDEX_RECORD.pack(self.segment, offset, len(payload), zlib.crc32(payload)))
+        self._index_file.flush()
+        if self.fsync:
+            os.fsync(self._index_file.fileno())
+        self.segment_end = offset + len(payload)
+        self.height += 1
+        return self.height - 1
+
+    def read(self, height: int) -> bytes:
+        if not 0 <= height < self.height:
+            raise IndexError(height)
+        segment, offset, length, crc = self._record(height)
+        mapped = self._segments.get(segment)
+        if mapped is None:
+            mapped = self._segments[segment] = _MappedFile(self._segment_path(segment))
+        payload = mapped.view(offset + length)[offset:offset + length]
+        if zlib.crc32(payload) != crc:
+            raise IOError(f"Bloco #{height} corrompido no disco (crc32)")
+        return payload
+
+    def close(self) -> None:
+        if self._index_file:
+            self._index_file.close()
+        if self._segment_file:
+            self._segment_file.close()
+            self._segment_file = None
+        self._index_map.close()
+        for mapped in self._segments.values():
+            mapped.close()
+        self._segments.clear()
+
+
+class PersistentChain:
+    """Sequência de blocos com a mesma interface de lista usada por BitcoinBlockchain.chain.
+
+    Blocos são decodificados sob demanda e mantidos num LRU pequeno.
+    """
+
+    def __init__(self, store: BlockStore, cache_size: int = 1024):
+        self.store = store
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def _load(self, height: int):
+        block = self._cache.get(height)
+        if block is not None:
+            self._cache.move_to_end(height)
+            return block
+        block = decode_block(self.store.read(height))
+        self._remember(height, block)
+        return block
+
+    def _remember(self, height: int, block) -> None:
+        self._cache[height] = block
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return [self._load(i) for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("índice de bloco fora da cadeia")
+        return self._load(key)
+
+    def __iter__(self) -> Iterator:
+        for height in range(len(self)):
+            yield self._load(height)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def append(self, block) -> None:
+        height = self.store.append(encode_block(block))
+        self._remember(height, block)
+
+    def close(self) -> None:
+        self._cache.clear()
+        self.store.close()
+
+
+def open_chain(path: str, fsync: bool = False) -> PersistentChain:
+    """Abre (ou cria) uma cadeia persistente em `path`."""
+    return PersistentChain(BlockStore(path, fsync=fsync))
@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from bitcoin_crypto import key_matches_address, verify_signatures
+from mining_engine import difficulty_target, meets_target
+
+# --- CHAIN VALIDATION ENGINE ---
+# Duas estratégias:
+#   1. Completa (padrão de is_chain_valid): checagens por bloco (hash, PoW, Merkle, assinaturas) e de
+#      ligação (previous_hash), em trechos espalhados num pool de processos para cadeias longas.
+#      Cadeias em disco (PersistentChain) mandam só (caminho, início, fim): cada worker lê e
+#      decodifica o próprio trecho da BlockStore, sem pickle dos blocos.
+#   2. Incremental (opt-in): guarda um checkpoint "validado até a altura N" e só verifica blocos novos.
+
+# Prioridade das falhas dentro de um mesmo bloco (mesma ordem da validação serial original)
+FAIL_HASH, FAIL_LINK, FAIL_POW, FAIL_MERKLE, FAIL_SIGNATURE = range(5)
+FAIL_MESSAGES = {
+    FAIL_HASH: "Hash inválido",
+    FAIL_LINK: "Ligação quebrada com bloco anterior",
+    FAIL_POW: "Proof of Work inválido",
+    FAIL_MERKLE: "Merkle Root inválido",
+    FAIL_SIGNATURE: "Assinatura de transação inválida",
+}
+
+Failure = Tuple[int, int]  # (altura, código da falha)
+
+
+def block_signatures_valid(block, workers: int = 1) -> bool:
+    """Verifica as transações assinadas do bloco numa única chamada em lote.
+
+    A chave pública de cada assinatura precisa derivar o endereço do remetente.
+    Transações sem assinatura (recompensas, Genesis) não são verificadas.
+    """
+    signed = [tx for tx in block.transactions if tx.signature is not None]
+    if not all(key_matches_address(tx.public_key, tx.sender) for tx in signed):
+        return False
+    items = [(tx.tx_hash, tx.signature, tx.public_key) for tx in signed]
+    return not items or all(verify_signatures(items, workers))
+
+
+def check_blocks(blocks: Sequence, first_height: int, difficulty: int,
+                 signature_workers: int = 1) -> Optional[Failure]:
+    """Checagens independentes por bloco. Retorna a primeira falha do trecho."""
+    target = difficulty_target(difficulty)
+    for offset, block in enumerate(blocks):
+        height = first_height + offset
+        if block.hash is None or block.hash != block.calculate_hash():
+            return height, FAIL_HASH
+        if not meets_target(bytes.fromhex(block.hash), target):
+            return height, FAIL_POW
+        if block.merkle_root != block.calculate_merkle_root():
+            return height, FAIL_MERKLE
+        if not block_signatures_valid(block, signature_workers):
+            return height, FAIL_SIGNATURE
+    return None
+
+
+def check_links(chain: Sequence, start: int, end: int) -> Optional[Failure]:
+    """Passada serial de ligação: bloco i deve apontar para o hash do bloco i-1."""
+    previous_hash = chain[start - 1].hash
+    for height in range(start, end):
+        block = chain[height]
+        if block.previous_hash != previous_hash:
+            return height, FAIL_LINK
+        previous_hash = block.hash
+    return None
+
+
+def _check_span(blocks: Sequence, first_height: int, difficulty: int) -> Optional[Failure]:
+    """Checa um trecho no worker; blocks[0] é o bloco first_height - 1 (só para a ligação)."""
+    # Já dentro de um worker: assinaturas verificadas em série (sem pool aninhado)
+    failures = []
+    failure = check_blocks(blocks[1:], first_height, difficulty)
+    if failure:
+        failures.append(failure)
+    failure = check_links(blocks, 1, len(blocks))
+    if failure:
+        failures.append((failure[0] + first_height - 1, failure[1]))
+    return min(failures) if failures else None
+
+
+def _check_chunk(args) -> Optional[Failure]:
+    blocks, first_height, difficulty = args
+    return _check_span(blocks, first_height, difficulty)
+
+
+_stores = {}  # Caminho -> BlockStore somente-leitura aberta por este worker
+
+
+def _check_store_chunk(args) -> Optional[Failure]:
+    path, start, end, difficulty = args
+    from block_store import BlockStore, decode_block  # Import tardio: block_store puxa o codec
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = BlockStore(path, readonly=True)
+    store.refresh()
+    blocks = [decode_block(store.read(height)) for height in range(start - 1, end)]
+    return _check_span(blocks, start, difficulty)
+
+
+class ChainValidator:
+    """Validador paralelo com checkpoint incremental."""
+
+    def __init__(self, workers: Optional[int] = None, min_parallel_blocks: int = 2000):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel_blocks = min_parallel_blocks
+        self.checkpoint_height = 0   # Blocos [0, checkpoint_height) já validados
+        self.checkpoint_hash: Optional[str] = None
+        self.checkpoint_difficulty: Optional[int] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def reset(self) -> None:
+        self.checkpoint_height = 0
+        self.checkpoint_hash = None
+        self.checkpoint_difficulty = None
+
+    def _resume_height(self, chain: Sequence, difficulty: int) -> int:
+        """Altura a partir da qual validar; volta para 1 se o checkpoint não bate mais com a cadeia."""
+        h = self.checkpoint_height
+        if (h < 2 or difficulty != self.checkpoint_difficulty or len(chain) < h
+                or chain[h - 1].hash != self.checkpoint_hash):
+            return 1
+        return h
+
+    def _run_checks(self, chain: Sequence, start: int, end: int, difficulty: int) -> List[Failure]:
+        """Falhas de bloco e de ligação em [start, end)."""
+        count = end - start
+        if self.workers <= 1 or count < self.min_parallel_blocks:
+            failures = [check_blocks(chain[start:end], start, difficulty, self.workers),
+                        check_links(chain, start, end)]
+            return [failure for failure in failures if failure]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        chunk = max(256, count // (self.workers * 4))
+        store_path = getattr(getattr(chain, 'store', None), 'path', None)
+        if store_path is not None:
+            # Cadeia em disco: só intervalos de altura viajam para os workers
+            jobs = [(store_path, i, min(i + chunk, end), difficulty) for i in range(start, end, chunk)]
+            results = self._pool.map(_check_store_chunk, jobs)
+        else:
+            # Em memória não há o que compartilhar: cada trecho leva também o bloco anterior (ligação)
+            jobs = [(chain[i - 1:min(i + chunk, end)], i, difficulty) for i in range(start, end, chunk)]
+            results = self._pool.map(_check_chunk, jobs)
+        return [failure for failure in results if failure]
+
+    def validate(self, chain: Sequence, difficulty: int, full: bool = False) -> Optional[Failure]:
+        """Valida a cadeia. Retorna None se válida, senão (altura, código) da primeira falha."""
+        start = 1 if full else self._resume_height(chain, difficulty)
+        end = len(chain)
+        if start >= end:
+            return None
+        failures = self._run_checks(chain, start, end, difficulty)
+        if failures:
+            return min(failures)
+        self.checkpoint_height = end
+        self.checkpoint_hash = chain[end - 1].hash
+        self.checkpoint_difficulty = difficulty
+        return None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -18,6 +18,7 @@ BITCOIN_WEBSOCKET_ENABLED = True
 BLOCKCHAIN_DIFFICULTY = 2
 MINING_REWARD = 50.0
 HALVING_INTERVAL = 210000
+LEDGER_CHECKPOINT_BLOCKS = 16  # Snapshot do índice de saldos a cada N blocos (1 = a cada commit)
 
 # Camera Settings
 CAMERA_ENABLED = True
@@ -25,12 +26,18 @@ CAMERA_FPS = 30
 CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 CAMERA_BACKEND = 'auto'  # auto, dshow, msmf, v4l2
+FRAME_BUS_NAME = 'criptcoins_frames'  # Memória compartilhada entre produtores locais e telemetry_server
+FRAME_BUS_SLOTS = 4
+FRAME_BUS_SLOT_BYTES = 512 * 1024  # JPEG máximo por frame
+FRAME_BUS_PRODUCER_LEASE = 2.0  # s sem publicar até o produtor anexado liberar o bus para /update_frame
 
 # Face Recognition Settings
 FACE_CASCADE = 'haarcascade_frontalface_default.xml'
 FACE_DETECTION_SCALE = 1.1
 FACE_MIN_NEIGHBORS = 5
 FACE_MIN_SIZE = (30, 30)
+FACE_ANN_MIN_TEMPLATES = None  # Templates a partir dos quais o login usa shortlist LSH (None = sempre exato)
+FACE_ANN_SHORTLIST = 2048
 
 # Audio Settings
 AUDIO_ENABLED = True
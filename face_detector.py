@@ -0,0 +1,242 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# --- FACE DETECTOR ---
+# Serviço de detecção compartilhado por face_recog, generate_frames e /api/login_face:
+#   - cascades Haar carregadas uma vez por thread (threading.local), não a cada chamada
+#   - detecção numa cópia reduzida (lado maior <= max_side); retângulos voltam à escala original
+#     e a ROI é recortada da imagem em resolução cheia
+#   - modo robusto: frontal, perfil, perfil espelhado e frontal ultra-sensível disparados juntos
+#     num pool (OpenCV libera o GIL); o resultado respeita a ordem de prioridade original e o
+#     primeiro acerto cancela os passes que ainda não começaram
+#   - tempos por estágio (decode, cinza, redução, cada passe, recorte) em cada Detection e em stats()
+
+FACE_SIZE = (100, 100)
+DETECT_MAX_SIDE = 480  # 640x480 -> 480x360: face mínima ~32px (janela base da cascade = 24px)
+CASCADE_FRONTAL = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+CASCADE_PROFILE = cv2.data.haarcascades + 'haarcascade_profileface.xml'
+
+
+class DetectionPass(NamedTuple):
+    name: str
+    cascade: str           # 'frontal' ou 'profile'
+    scale_factor: float
+    min_neighbors: int
+    min_size: Optional[Tuple[int, int]]  # Em pixels da imagem original
+    flip: bool
+
+
+# Mesma sequência e parâmetros do detect_face_array_from_image_bytes original
+FRONTAL_PASS = DetectionPass('frontal', 'frontal', 1.1, 5, (30, 30), False)
+ROBUST_PASSES = (
+    FRONTAL_PASS,
+    DetectionPass('profile', 'profile', 1.05, 3, None, False),
+    DetectionPass('profile_flip', 'profile', 1.05, 3, None, True),
+    DetectionPass('frontal_sensitive', 'frontal', 1.03, 2, None, False),
+)
+
+
+class Detection(NamedTuple):
+    face: np.ndarray                 # ROI em cinza redimensionada para FACE_SIZE
+    rect: Tuple[int, int, int, int]  # (x, y, w, h) na imagem original (espelhada se flipped)
+    stage: str                       # Passe que acertou ou 'central_crop'
+    flipped: bool
+    timings: Dict[str, float]        # ms por estágio
+
+
+def _load_cascade(path: str):
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise RuntimeError(f"cascade Haar não encontrada: {path}")
+    return cascade
+
+
+class FaceDetector:
+    """Detector Haar reutilizável: cascades por thread, pirâmide reduzida e passes concorrentes."""
+
+    def __init__(self, max_side: Optional[int] = DETECT_MAX_SIDE, workers: int = 3,
+                 cascade_paths: Optional[Dict[str, str]] = None,
+                 loader: Callable[[str], object] = _load_cascade):
+        self.max_side = max_side
+        self.cascade_paths = cascade_paths or {'frontal': CASCADE_FRONTAL, 'profile': CASCADE_PROFILE}
+        self.loader = loader
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='face-detect')
+        self._stats_lock = threading.Lock()
+        self.loads = 0
+        self.calls = 0
+        self.hits: Dict[str, int] = {}
+        self._stage_ms: Dict[str, List[float]] = {}  # [total, contagem]
+
+    # --- Cascades ---
+
+    def _cascade(self, name: str):
+        """Cascade da thread atual (detectMultiScale não é compartilhado entre threads)."""
+        cascades = getattr(self._local, 'cascades', None)
+        if cascades is None:
+            cascades = self._local.cascades = {}
+        if name not in cascades:
+            cascades[name] = self.loader(self.cascade_paths[name])
+            with self._stats_lock:
+                self.loads += 1
+        return cascades[name]
+
+    # --- Passes ---
+
+    def _downscale(self, gray: np.ndarray) -> Tuple[np.ndarray, float]:
+        h, w = gray.shape[:2]
+        if not self.max_side or max(h, w) <= self.max_side:
+            return gray, 1.0
+        scale = self.max_side / float(max(h, w))
+        small = cv2.resize(gray, (max(1, int(round(w * scale))), max(1, int(round(h * scale)))),
+                           interpolation=cv2.INTER_AREA)
+        return small, scale
+
+    def _run_pass(self, spec: DetectionPass, small: np.ndarray, scale: float) -> Tuple[np.ndarray, float]:
+        """Roda um passe na imagem reduzida; retângulos na escala original e tempo em ms."""
+        t0 = time.perf_counter()
+        image = cv2.flip(small, 1) if spec.flip else small
+        kwargs = {'scaleFactor': spec.scale_factor, 'minNeighbors': spec.min_neighbors}
+        if spec.min_size:
+            kwargs['minSize'] = tuple(max(1, int(round(s * scale))) for s in spec.min_size)
+        rects = np.asarray(self._cascade(spec.cascade).detectMultiScale(image, **kwargs)).reshape(-1, 4)
+        if scale != 1.0 and len(rects):
+            rects = np.round(rects / scale).astype(int)
+        return rects, (time.perf_counter() - t0) * 1000.0
+
+    def faces(self, gray: np.ndarray, spec: DetectionPass = FRONTAL_PASS) -> np.ndarray:
+        """Todos os retângulos (x, y, w, h) de um passe, na escala de gray (ex.: overlay de vídeo)."""
+        small, scale = self._downscale(gray)
+        rects, elapsed = self._run_pass(spec, small, scale)
+        self._record({spec.name: elapsed}, spec.name if len(rects) else None)
+        return rects
+
+    def detect(self, gray: np.ndarray, robust: bool = False,
+               timings: Optional[Dict[str, float]] = None) -> Optional[Detection]:
+        """Maior face pela ordem de prioridade dos passes; central crop em modo robusto; senão None."""
+        timings = {} if timings is None else timings
+        t0 = time.perf_counter()
+        small, scale = self._downscale(gray)
+        timings['downscale'] = (time.perf_counter() - t0) * 1000.0
+        passes = ROBUST_PASSES if robust else (FRONTAL_PASS,)
+        hit = None
+        if len(passes) == 1:
+            rects, timings[FRONTAL_PASS.name] = self._run_pass(FRONTAL_PASS, small, scale)
+            if len(rects):
+                hit = (FRONTAL_PASS, rects)
+        else:
+            futures = [self._pool.submit(self._run_pass, spec, small, scale) for spec in passes]
+            for i, (spec, future) in enumerate(zip(passes, futures)):
+                rects, timings[spec.name] = future.result()
+                if len(rects):
+                    hit = (spec, rects)
+                    for pending in futures[i + 1:]:
+                        pending.cancel()  # Passes de menor prioridade que ainda não começaram
+                    break
+        t0 = time.perf_counter()
+        if hit is None:
+            if not robust:
+                self._record(timings, None)
+                return None
+            # Último recurso: núcleo central (70% do lado menor)
+            h, w = gray.shape[:2]
+            size = int(min(w, h) * 0.7)
+            rect = ((w - size) // 2, (h - size) // 2, size, size)
+            stage, flipped, source = 'central_crop', False, gray
+        else:
+            spec, rects = hit
+            x, y, rw, rh = max(rects, key=lambda r: r[2] * r[3])
+            rect, stage, flipped = (int(x), int(y), int(rw), int(rh)), spec.name, spec.flip
+            source = cv2.flip(gray, 1) if spec.flip else gray
+        x, y, rw, rh = rect
+        face = cv2.resize(source[y:y + rh, x:x + rw], FACE_SIZE)
+        timings['crop'] = (time.perf_counter() - t0) * 1000.0
+        self._record(timings, stage)
+        return Detection(face, rect, stage, flipped, timings)
+
+    def detect_bytes(self, image_bytes: bytes, robust: bool = False) -> Optional[Detection]:
+        """Decodifica (PNG/JPEG) e detecta; None se a imagem for inválida ou sem face."""
+        timings: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        timings['decode'] = (time.perf_counter() - t0) * 1000.0
+        if img is None:
+            return None
+        t0 = time.perf_counter()
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        timings['gray'] = (time.perf_counter() - t0) * 1000.0
+        return self.detect(gray, robust, timings)
+
+    # --- Estatísticas ---
+
+    def _record(self, timings: Dict[str, float], stage: Optional[str]) -> None:
+        with self._stats_lock:
+            self.calls += 1
+            if stage:
+                self.hits[stage] = self.hits.get(stage, 0) + 1
+            for name, ms in timings.items():
+                acc = self._stage_ms.setdefault(name, [0.0, 0])
+                acc[0] += ms
+                acc[1] += 1
+
+    def stats(self) -> Dict:
+        """Chamadas, acertos por passe, cascades carregadas e tempo médio (ms) por estágio."""
+        with self._stats_lock:
+            return {
+                'calls': self.calls,
+                'hits': dict(self.hits),
+                'cascade_loads': self.loads,
+                'stage_ms': {name: round(total / count, 3) for name, (total, count) in self._stage_ms.items()},
+            }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_default_detector: Optional[FaceDetector] = None
+_default_lock = threading.Lock()
+
+
+def get_detector() -> FaceDetector:
+    """Detector compartilhado do processo (criado no primeiro uso)."""
+    global _default_detector
+    if _default_detector is None:
+        with _default_lock:
+            if _default_detector is None:
+                _default_detector = FaceDetector()
+    return _default_detector
+
+
+if __name__ == "__main__":
+    import sys
+    print("--- [FACE DETECTOR BENCHMARK] ---")
+    if not hasattr(cv2, 'CascadeClassifier'):
+        print("[!] Este build do OpenCV não tem CascadeClassifier (módulo objdetect).")
+        sys.exit(0)
+    frame = np.random.default_rng(0).integers(0, 256, (480, 640), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (0, 0), 3)
+    runs = 20
+
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        # Caminho antigo: cascades recriadas e passes em série na resolução cheia
+        frontal, profile = cv2.CascadeClassifier(CASCADE_FRONTAL), cv2.CascadeClassifier(CASCADE_PROFILE)
+        if not len(frontal.detectMultiScale(frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))):
+            if not len(profile.detectMultiScale(frame, scaleFactor=1.05, minNeighbors=3)):
+                if not len(profile.detectMultiScale(cv2.flip(frame, 1), scaleFactor=1.05, minNeighbors=3)):
+                    frontal.detectMultiScale(frame, scaleFactor=1.03, minNeighbors=2)
+    legacy = (time.perf_counter() - t0) / runs
+    detector = FaceDetector()
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        detection = detector.detect(frame, robust=True)
+    current = (time.perf_counter() - t0) / runs
+    print(f"[*] Modo robusto sem face (pior caso): antigo {legacy * 1000:.1f} ms | "
+          f"FaceDetector {current * 1000:.1f} ms ({detection.stage})")
+    print(f"[*] Estágios: {detector.stats()}")
+    detector.close()
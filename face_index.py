@@ -0,0 +1,340 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from signature_ann import SignatureLSH
+
+# --- FACE TEMPLATE INDEX ---
+# Índice em memória dos templates de face_db/ para authenticate_from_image_bytes:
+#   - cada .npz é lido (e tem o hash de membrana conferido) uma única vez, não a cada login
+#   - means (T, pixels) uint8 e top_sigs (T, bins) empilhados de todos os usuários e ângulos
+#   - refresh incremental: mtime da pasta + varredura periódica; só arquivos alterados são relidos
+#   - pontuação numa passada NumPy com a mesma fórmula e limiares do laço original
+#     (0.50 para manifold, 0.80 para templates v1.0)
+#   - branch and bound: limite superior barato (média por blocos <= MAE por pixel) descarta quase
+#     todos os templates; blocos 20x20 para todos, 10x10 + termo topológico só para os que restam
+#     após uma semente exata; a MAE exata só roda nos poucos que ainda podem vencer
+#   - opcional (ann_min_templates): shortlist aproximada por LSH sobre as top_sigs
+#     (signature_ann.py) antes da pontuação completa. Desligada por padrão: os histogramas de
+#     curvatura sozinhos separam pouco as pessoas e a shortlist pode perder o usuário certo
+
+MANIFOLD_THRESHOLD = 0.50
+LEGACY_THRESHOLD = 0.80
+PIXEL_WEIGHT, TOPO_WEIGHT = 0.4, 0.6
+COARSE_BLOCK = 10      # Blocos 10x10 para o limite inferior fino da MAE
+SMALL_BLOCK = 20       # Blocos 20x20: limite mais fraco, 4x mais barato, para o primeiro corte
+EXACT_BATCH = 64       # Templates com MAE exata por rodada do branch and bound
+SIG_EPS = 1e-10        # Mesmo epsilon de TopologicalKernel.compute_geodesic_distance
+ANN_SHORTLIST = 2048   # Templates (mais próximos pela JS) que seguem para a pontuação completa
+
+
+def membrane_hash(**arrays) -> str:
+    """Hash de integridade do template: sha256 do np.savez dos arrays (mesmo formato do enroll)."""
+    stream = io.BytesIO()
+    np.savez(stream, **arrays)
+    return hashlib.sha256(stream.getvalue()).hexdigest()
+
+
+def block_means(images: np.ndarray, block: int = COARSE_BLOCK) -> np.ndarray:
+    """Médias por bloco (N, H, W) -> (N, H/block * W/block); block=1 se não dividir."""
+    n, h, w = images.shape
+    if h % block or w % block:
+        block = 1
+    blocks = images.reshape(n, h // block, block, w // block, block).astype(np.float32)
+    return blocks.mean(axis=(2, 4)).reshape(n, -1)
+
+
+class _UserTemplates(NamedTuple):
+    means: np.ndarray        # (A, H, W) uint8
+    sigs: np.ndarray         # (A, bins) float64 (zeros quando não há top_sig)
+    has_sig: np.ndarray      # (A,) bool
+    threshold: float
+
+
+class _Stack(NamedTuple):
+    users: List[str]
+    owner: np.ndarray        # Template -> índice do usuário
+    means: np.ndarray        # (T, pixels) uint8
+    coarse_small: np.ndarray  # (T, blocos 20x20) float32
+    coarse: np.ndarray       # (T, blocos 10x10) float32
+    sigs: np.ndarray         # (T, bins) + epsilon
+    sig_entropy: np.ndarray  # Σ p·log p por template
+    has_sig: np.ndarray
+    thresholds: np.ndarray
+    ann: Optional[SignatureLSH]  # Só com galeria grande; linhas do LSH -> ann_rows
+    ann_rows: np.ndarray
+
+
+def load_user_templates(path: str) -> Optional[_UserTemplates]:
+    """Lê um .npz de face_db e confere o hash de membrana. None se violado ou ilegível."""
+    data = np.load(path, allow_pickle=True)
+    if 'membrane_hash' in data:
+        if 'manifold' in data:
+            expected = membrane_hash(manifold=data['manifold'])
+        else:
+            expected = membrane_hash(mean=data['mean'], top_sig=data['top_sig'])
+        if expected != str(data['membrane_hash']):
+            return None
+    if 'manifold' in data:
+        angles = list(data['manifold'])
+        means = np.stack([np.asarray(angle['mean'], dtype=np.uint8) for angle in angles])
+        sigs = np.stack([np.asarray(angle['top_sig'], dtype=np.float64) for angle in angles])
+        return _UserTemplates(means, sigs, np.ones(len(angles), dtype=bool), MANIFOLD_THRESHOLD)
+    mean = np.asarray(data['mean'], dtype=np.uint8)[None]
+    if 'top_sig' in data:
+        return _UserTemplates(mean, np.asarray(data['top_sig'], dtype=np.float64)[None],
+                              np.ones(1, dtype=bool), LEGACY_THRESHOLD)
+    # v1.0 sem assinatura: top_score = 0 (só o termo de pixels conta)
+    return _UserTemplates(mean, None, np.zeros(1, dtype=bool), LEGACY_THRESHOLD)
+
+
+class FaceTemplateIndex:
+    """Templates de todos os usuários empilhados em memória, sincronizados com db_dir."""
+
+    def __init__(self, db_dir: str, rescan_interval: float = 2.0, verbose: bool = True,
+                 ann_min_templates: Optional[int] = None, shortlist: int = ANN_SHORTLIST):
+        self.db_dir = db_dir
+        self.rescan_interval = rescan_interval
+        self.verbose = verbose
+        self.ann_min_templates = ann_min_templates  # Galeria mínima para a shortlist LSH; None = sempre exato
+        self.shortlist = shortlist
+        self._files: Dict[str, Tuple[int, int]] = {}  # usuário -> (mtime_ns, tamanho)
+        self._templates: Dict[str, _UserTemplates] = {}
+        self._stack: Optional[_Stack] = None
+        self._dir_mtime: Optional[int] = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.last_stats: Dict = {}
+
+    # --- Sincronização com face_db ---
+
+    def invalidate(self) -> None:
+        """Força nova varredura na próxima consulta (ex.: logo após um enroll)."""
+        self._dir_mtime = None
+
+    def refresh(self) -> bool:
+        """Relê só os arquivos novos/alterados; True se o índice mudou."""
+        try:
+            dir_mtime = os.stat(self.db_dir).st_mtime_ns
+        except OSError:
+            dir_mtime = -1
+        if dir_mtime == self._dir_mtime and time.time() - self._scanned_at < self.rescan_interval:
+            return False
+        with self._lock:
+            self._scanned_at = time.time()
+            self._dir_mtime = dir_mtime
+            current = {}
+            if dir_mtime != -1:
+                with os.scandir(self.db_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.npz'):
+                            stat = entry.stat()
+                            current[entry.name[:-4]] = (stat.st_mtime_ns, stat.st_size)
+            changed = False
+            for user in set(self._files) - set(current):
+                del self._files[user]
+                self._templates.pop(user, None)
+                changed = True
+            for user, stat in current.items():
+                if self._files.get(user) == stat:
+                    continue
+                self._files[user] = stat
+                self._templates.pop(user, None)
+                changed = True
+                try:
+                    templates = load_user_templates(os.path.join(self.db_dir, f'{user}.npz'))
+                    self.loads += 1
+                except Exception as e:
+                    if self.verbose:
+                        print(f"[💥] Erro {user}: {e}")
+                    continue
+                if templates is None:
+                    if self.verbose:
+                        print(f"[⚠️] Violação detectada para {user}!")
+                    continue
+                self._templates[user] = templates
+            if changed or self._stack is None:
+                self._stack = self._build_stack()
+            return changed
+
+    def _build_stack(self) -> _Stack:
+        users = sorted(self._templates)
+        if not users:
+            empty = np.zeros((0, 0))
+            return _Stack([], np.zeros(0, dtype=np.intp), np.zeros((0, 0), dtype=np.uint8), empty, empty,
+                          empty, np.zeros(0), np.zeros(0, dtype=bool), np.zeros(0), None,
+                          np.zeros(0, dtype=np.intp))
+        groups = [self._templates[user] for user in users]
+        bins = max((g.sigs.shape[1] for g in groups if g.sigs is not None), default=1)
+        owner = np.concatenate([np.full(len(g.means), i, dtype=np.intp) for i, g in enumerate(groups)])
+        images = np.concatenate([g.means for g in groups])
+        sigs = np.concatenate([g.sigs if g.sigs is not None else np.zeros((len(g.means), bins))
+                               for g in groups]) + SIG_EPS
+        has_sig = np.concatenate([g.has_sig for g in groups])
+        ann, ann_rows = None, np.flatnonzero(has_sig)
+        if self.ann_min_templates is not None and len(images) >= self.ann_min_templates:
+            # Templates sem top_sig ficam fora: com t_score = 0 nunca passam do limiar 0.80
+            ann = SignatureLSH().fit(sigs[ann_rows])
+        return _Stack(
+            users=users,
+            owner=owner,
+            means=images.reshape(len(images), -1),
+            coarse_small=block_means(images, SMALL_BLOCK),
+            coarse=block_means(images),
+            sigs=sigs,
+            sig_entropy=np.sum(sigs * np.log(sigs), axis=1),
+            has_sig=has_sig,
+            thresholds=np.concatenate([np.full(len(g.means), g.threshold) for g in groups]),
+            ann=ann,
+            ann_rows=ann_rows,
+        )
+
+    def users(self) -> List[str]:
+        self.refresh()
+        return list(self._stack.users)
+
+    def __len__(self) -> int:
+        stack = self._stack
+        return 0 if stack is None else len(stack.owner)
+
+    # --- Identificação ---
+
+    @staticmethod
+    def topo_scores(stack: _Stack, signature: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """t_score = 1 - min(1, 2 * distância geodésica) para as linhas `rows` de uma vez."""
+        q = np.asarray(signature, dtype=np.float64) + SIG_EPS
+        m = 0.5 * (stack.sigs[rows] + q)
+        js = 0.5 * stack.sig_entropy[rows] + 0.5 * np.sum(q * np.log(q)) - np.sum(m * np.log(m), axis=1)
+        t_score = 1.0 - np.minimum(1.0, 2.0 * np.sqrt(np.maximum(0.0, js)))
+        return np.where(stack.has_sig[rows], t_score, 0.0)
+
+    def identify(self, face: np.ndarray, signature: np.ndarray,
+                 context_enzyme: float = 1.0) -> Tuple[Optional[str], Optional[float]]:
+        """Melhor usuário cuja confiança passa do limiar do seu template, ou (None, None).
+
+        Sem shortlist é o mesmo resultado da varredura completa: só são descartados templates
+        cujo limite superior de confiança não alcança o melhor valor exato já encontrado.
+        Com ann_min_templates atingido, só os `shortlist` templates mais próximos pela
+        assinatura topológica (LSH) são pontuados.
+        """
+        self.refresh()
+        stack = self._stack
+        if not len(stack.owner):
+            return None, None
+        face16 = face.astype(np.int16).ravel()
+        query_small, query_fine = block_means(face[None], SMALL_BLOCK)[0], block_means(face[None])[0]
+
+        def pixel_upper(coarse, query, rows):
+            # MAE >= média de |Δ média do bloco| (desigualdade de Jensen); folga cobre o float32
+            lower_mae = np.abs(coarse[rows] - query).mean(axis=1) - 1e-3
+            return PIXEL_WEIGHT * np.maximum(0.0, 1.0 - lower_mae / 100.0)
+
+        best, best_conf, exact = None, -1.0, 0
+
+        def evaluate(rows, t_score):
+            nonlocal best, best_conf, exact
+            mae = np.abs(stack.means[rows].astype(np.int16) - face16).mean(axis=1)
+            conf = (PIXEL_WEIGHT * np.maximum(0.0, 1.0 - mae / 100.0) + TOPO_WEIGHT * t_score) * context_enzyme
+            exact += len(rows)
+            conf[conf <= stack.thresholds[rows]] = -1.0
+            top = conf.max()
+            if top < 0:
+                return
+            row = int(rows[conf == top].min())  # Empate: vale a ordem da varredura (usuário, ângulo)
+            if top > best_conf or (top == best_conf and row < best):
+                best, best_conf = row, float(top)
+
+        # 0. Galeria grande: shortlist aproximada pelas assinaturas (LSH + re-rank por JS)
+        if stack.ann is not None:
+            everyone = np.sort(stack.ann_rows[stack.ann.query(signature, self.shortlist)[0]])
+        else:
+            everyone = np.arange(len(stack.owner))
+        # 1. Limite só de pixels (blocos grandes, t_score <= 1) para todos os templates
+        upper = (pixel_upper(stack.coarse_small, query_small, everyone) + TOPO_WEIGHT) * context_enzyme
+        passing = upper > stack.thresholds[everyone]
+        alive, upper = everyone[passing], upper[passing]
+        # 2. Semente: os mais próximos em pixels dão um bom melhor-exato logo de início
+        if len(alive) > EXACT_BATCH:
+            seed = alive[np.argpartition(-upper, EXACT_BATCH)[:EXACT_BATCH]]
+        else:
+            seed = alive
+        if len(seed):
+            evaluate(seed, self.topo_scores(stack, signature, seed))
+        alive = alive[(upper > best_conf) & ~np.isin(alive, seed)]
+        # 3. Sobreviventes: limite fino (blocos menores + termo topológico exato) e avaliação em lotes
+        candidates = len(alive)
+        if candidates:
+            t_score = self.topo_scores(stack, signature, alive)
+            upper = (pixel_upper(stack.coarse, query_fine, alive) + TOPO_WEIGHT * t_score) * context_enzyme
+            keep = upper > np.maximum(stack.thresholds[alive], best_conf)
+            order = np.argsort(-upper[keep], kind='stable')
+            alive, upper, t_score = alive[keep][order], upper[keep][order], t_score[keep][order]
+            for start in range(0, len(alive), EXACT_BATCH):
+                if upper[start] <= best_conf:
+                    break  # Nenhum template restante pode superar o melhor exato
+                evaluate(alive[start:start + EXACT_BATCH], t_score[start:start + EXACT_BATCH])
+        self.last_stats = {'templates': len(stack.owner), 'shortlist': len(everyone),
+                           'candidates': candidates, 'exact': exact}
+        if best is None:
+            return None, None
+        return stack.users[stack.owner[best]], best_conf
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    from topological_kernel import TopologicalKernel
+    print("--- [FACE TEMPLATE INDEX BENCHMARK] ---")
+    import cv2
+    kernel = TopologicalKernel()
+    rng = np.random.default_rng(0)
+
+    def synthetic_face():
+        # Campo suave (baixa frequência) como uma face: blocos distinguem pessoas diferentes
+        coarse = rng.integers(0, 256, (6, 6)).astype(np.float32)
+        return np.clip(cv2.resize(coarse, (100, 100), interpolation=cv2.INTER_CUBIC), 0, 255)
+
+    path = tempfile.mkdtemp(prefix='face_db_')
+    try:
+        index = FaceTemplateIndex(path, verbose=False)
+        enrolled = 0
+        for target in (10, 100, 1000, 10000):
+            for u in range(enrolled, target):
+                face = synthetic_face()
+                manifold = []
+                for a in range(5):
+                    angle = np.clip(face + rng.normal(0, 8, face.shape), 0, 255).astype(np.uint8)
+                    manifold.append({'mean': angle, 'top_sig': kernel.extract_signature(angle)})
+                np.savez(os.path.join(path, f'user_{u:05d}.npz'), manifold=manifold,
+                         membrane_hash=membrane_hash(manifold=manifold), version="1.1.0_manifold")
+            enrolled = target
+            t0 = time.perf_counter()
+            index.refresh()
+            load = time.perf_counter() - t0
+            probe = np.load(os.path.join(path, 'user_00003.npz'), allow_pickle=True)['manifold'][2]['mean']
+            probe = np.clip(probe + rng.normal(0, 4, probe.shape), 0, 255).astype(np.uint8)
+            probe_sig = kernel.extract_signature(probe)
+            t0 = time.perf_counter()
+            for _ in range(20):
+                user, conf = index.identify(probe, probe_sig)
+            latency = (time.perf_counter() - t0) / 20
+            print(f"[*] {target:>6,} usuários ({len(index):,} templates): login {latency * 1000:.2f} ms | "
+                  f"refinados {index.last_stats['candidates']} | MAE exata em {index.last_stats['exact']} | "
+                  f"carga incremental {load:.2f}s | {user} {conf:.3f}")
+        # Mesma galeria com a shortlist LSH (signature_ann.py): latência x acerto
+        approx = FaceTemplateIndex(path, verbose=False, ann_min_templates=0)
+        approx.refresh()
+        t0 = time.perf_counter()
+        for _ in range(20):
+            user, conf = approx.identify(probe, probe_sig)
+        latency = (time.perf_counter() - t0) / 20
+        print(f"[*] Shortlist LSH ({approx.last_stats['shortlist']} de {len(approx):,} templates): "
+              f"login {latency * 1000:.2f} ms | {user} {conf or 0:.3f}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,305 @@
+import os
+import struct
+import threading
+import time
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, NamedTuple, Optional
+
+from config import FRAME_BUS_NAME, FRAME_BUS_PRODUCER_LEASE, FRAME_BUS_SLOT_BYTES, FRAME_BUS_SLOTS
+
+# --- FRAME BUS ---
+# Ring de frames JPEG em multiprocessing.shared_memory entre produtores locais (HUD de visão)
+# e o telemetry_server, sem POST HTTP por frame:
+#   cabeçalho: magic, versão, nº de slots, bytes por slot, head (seq do último frame publicado),
+#              geração (id aleatório de quem criou o segmento), concessão do produtor anexado
+#              (token da instância + instante da última publicação)
+#   slot:      begin_seq, end_seq, instante de publicação (time.time), tamanho, payload
+# Seqlock por slot: o produtor grava begin=seq, o payload e só então end=seq; o leitor lê end,
+# copia, relê begin e descarta a cópia se algum dos dois mudou (slot sobrescrito no meio).
+# Cada espectador tem seu FrameCursor: recebe um frame só quando head avança e, se atrasou mais
+# de um frame, pula direto para o mais recente (vídeo: latest-frame-wins).
+# Um produtor por vez: o seqlock protege leitores de um escritor, não escritores entre si. O produtor
+# anexado renova a concessão a cada publish; producer_active() deixa o dono recusar as próprias
+# publicações (ex.: /update_frame) enquanto ela estiver valendo.
+# Quem se anexa guarda a geração; is_stale() detecta servidor reiniciado (segmento recriado) ou encerrado.
+
+MAGIC = b'FBUS'
+VERSION = 2
+_HEADER = struct.Struct('<4sIIIQQ')  # magic, versão, slots, slot_bytes, head, geração
+_HEADER_SIZE = 64
+_HEAD_OFFSET = 16
+_HEAD = struct.Struct('<Q')
+_PRODUCER_OFFSET = 32
+_PRODUCER = struct.Struct('<Qd')     # token do produtor anexado, última publicação (time.time)
+_SLOT = struct.Struct('<QQdI4x')     # begin_seq, end_seq, publicado_em, tamanho
+_READ_RETRIES = 3
+_owned_segments = set()  # Segmentos criados por este processo (registrados no resource_tracker)
+
+
+class BusFrame(NamedTuple):
+    seq: int
+    data: bytes
+    published_at: float  # time.time() do produtor
+    latency_ms: float    # produtor -> leitura pelo espectador
+
+
+def _read_header(shm: shared_memory.SharedMemory):
+    """(slots, slot_bytes, geração) ou None se o segmento não é um FrameBus desta versão."""
+    if shm.size < _HEADER_SIZE:
+        return None
+    magic, version, slots, slot_bytes, _, generation = _HEADER.unpack_from(shm.buf, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return slots, slot_bytes, generation
+
+
+def _open_segment(name: str, create: bool, size: int = 0) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if create:
+        _owned_segments.add(name)
+    elif name not in _owned_segments:
+        # Até o Python 3.12 quem só se anexa também registra o segmento no resource_tracker,
+        # que o apagaria quando este processo saísse; o dono (quem criou) é quem faz unlink.
+        # (Filhos de multiprocessing compartilham o tracker do pai: anexe de processos independentes.)
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+    return shm
+
+
+class FrameBus:
+    """Ring de frames em memória compartilhada; create=None anexa se existir, senão cria."""
+
+    def __init__(self, name: str = FRAME_BUS_NAME, slots: int = FRAME_BUS_SLOTS,
+                 slot_bytes: int = FRAME_BUS_SLOT_BYTES, create: Optional[bool] = None):
+        self.name = name
+        self.owner = False
+        if create is not False:
+            try:
+                self._shm = _open_segment(name, True, _HEADER_SIZE + slots * (_SLOT.size + slot_bytes))
+                self.owner = True
+                generation = int.from_bytes(os.urandom(8), 'little') | 1  # Nunca 0
+                _HEADER.pack_into(self._shm.buf, 0, MAGIC, VERSION, slots, slot_bytes, 0, generation)
+            except FileExistsError:
+                if create:
+                    raise
+        if not self.owner:
+            self._shm = _open_segment(name, False)  # FileNotFoundError se ninguém criou
+            header = _read_header(self._shm)
+            if header is None:
+                self._shm.close()
+                raise ValueError(f"segmento {name!r} não é um FrameBus v{VERSION}")
+            slots, slot_bytes, generation = header
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.generation = generation
+        self._token = int.from_bytes(os.urandom(8), 'little') | 1  # Identifica esta instância na concessão
+        self._buf = self._shm.buf
+        # Serializa só as threads deste processo. Entre processos vale a concessão do produtor anexado:
+        # o servidor consulta producer_active() antes de publicar frames recebidos por HTTP.
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=1024)
+        self.delivered = 0
+        self.skipped = 0   # Frames que um espectador nunca viu (já havia outro mais novo)
+        self.torn = 0      # Leituras descartadas pelo seqlock
+        self.viewers = 0
+
+    @classmethod
+    def attach(cls, name: str = FRAME_BUS_NAME) -> 'FrameBus':
+        """Anexa a um bus existente (produtor local); FileNotFoundError se o servidor não o criou."""
+        return cls(name, create=False)
+
+    def producer_active(self, lease: float = FRAME_BUS_PRODUCER_LEASE) -> bool:
+        """True se outra instância anexada publicou nos últimos `lease` segundos (e não fechou)."""
+        token, seen_at = _PRODUCER.unpack_from(self._buf, _PRODUCER_OFFSET)
+        return token not in (0, self._token) and time.time() - seen_at < lease
+
+    def is_stale(self) -> bool:
+        """True se o segmento com este nome sumiu ou foi recriado (outra geração).
+
+        No Linux um segmento removido continua mapeado: sem esta checagem o produtor anexado
+        seguiria publicando num bus que nenhum servidor lê. Custa um shm_open; chame a cada poucos segundos.
+        """
+        if self.owner:
+            return False
+        try:
+            shm = _open_segment(self.name, False)
+        except FileNotFoundError:
+            return True
+        try:
+            header = _read_header(shm)
+        finally:
+            shm.close()
+        return header is None or header[2] != self.generation
+
+    def _slot_offset(self, seq: int) -> int:
+        return _HEADER_SIZE + (seq % self.slots) * (_SLOT.size + self.slot_bytes)
+
+    @property
+    def head(self) -> int:
+        return _HEAD.unpack_from(self._buf, _HEAD_OFFSET)[0]
+
+    # --- Produtor ---
+
+    def publish(self, data: bytes, published_at: Optional[float] = None) -> int:
+        """Grava um frame no próximo slot e avança head; devolve o seq publicado."""
+        size = len(data)
+        if size > self.slot_bytes:
+            raise ValueError(f"frame de {size} bytes excede o slot de {self.slot_bytes} bytes")
+        with self._write_lock:
+            seq = self.head + 1
+            off = self._slot_offset(seq)
+            _, end, _, _ = _SLOT.unpack_from(self._buf, off)
+            _SLOT.pack_into(self._buf, off, seq, end, 0.0, 0)  # begin primeiro: slot em escrita
+            start = off + _SLOT.size
+            self._buf[start:start + size] = data
+            now = time.time()
+            _SLOT.pack_into(self._buf, off, seq, seq, now if published_at is None else published_at, size)
+            _HEAD.pack_into(self._buf, _HEAD_OFFSET, seq)
+            if not self.owner:
+                _PRODUCER.pack_into(self._buf, _PRODUCER_OFFSET, self._token, now)  # Renova a concessão
+        return seq
+
+    # --- Consumidores ---
+
+    def _read_slot(self, seq: int) -> Optional[BusFrame]:
+        off = self._slot_offset(seq)
+        _, end, published_at, size = _SLOT.unpack_from(self._buf, off)
+        if end != seq:
+            return None
+        start = off + _SLOT.size
+        data = bytes(self._buf[start:start + size])
+        begin = _SLOT.unpack_from(self._buf, off)[0]
+        if begin != seq:
+            return None
+        return BusFrame(seq, data, published_at, (time.time() - published_at) * 1000.0)
+
+    def read_latest(self, after: int = 0) -> Optional[BusFrame]:
+        """Frame mais recente com seq > after, ou None se não houver nada novo."""
+        for _ in range(_READ_RETRIES):
+            head = self.head
+            if head <= after:
+                return None
+            frame = self._read_slot(head)
+            if frame is not None:
+                return frame
+        with self._stats_lock:
+            self.torn += 1
+        return None
+
+    def cursor(self) -> 'FrameCursor':
+        """Cursor independente para um espectador (começa no frame atual, se houver)."""
+        return FrameCursor(self)
+
+    def _record(self, frame: BusFrame, skipped: int) -> None:
+        with self._stats_lock:
+            self.delivered += 1
+            self.skipped += skipped
+            self._latencies.append(frame.latency_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Frames publicados/entregues/pulados e latência produtor -> espectador (ms)."""
+        with self._stats_lock:
+            ordered = sorted(self._latencies)
+            delivered, skipped, torn, viewers = self.delivered, self.skipped, self.torn, self.viewers
+
+        def pick(q):
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3) if ordered else None
+        return {'published': self.head, 'generation': self.generation, 'delivered': delivered, 'skipped': skipped, 'torn': torn,
+                'viewers': viewers, 'latency_p50_ms': pick(0.5), 'latency_p99_ms': pick(0.99)}
+
+    def close(self) -> None:
+        """Solta o mapeamento (e a concessão de produtor, se for desta instância); o dono também remove o segmento."""
+        if not self.owner and _PRODUCER.unpack_from(self._buf, _PRODUCER_OFFSET)[0] == self._token:
+            _PRODUCER.pack_into(self._buf, _PRODUCER_OFFSET, 0, 0.0)
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            _owned_segments.discard(self.name)
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class FrameCursor:
+    """Posição de um espectador no bus: poll() só devolve frame quando o seq avança."""
+
+    def __init__(self, bus: FrameBus):
+        self.bus = bus
+        self.seq = 0
+        self.closed = False
+        with bus._stats_lock:
+            bus.viewers += 1
+
+    def poll(self) -> Optional[BusFrame]:
+        frame = self.bus.read_latest(self.seq)
+        if frame is None:
+            return None
+        skipped = frame.seq - self.seq - 1 if self.seq else 0
+        self.seq = frame.seq
+        self.bus._record(frame, skipped)
+        return frame
+
+    def wait(self, timeout: Optional[float] = None, poll_interval: float = 0.002) -> Optional[BusFrame]:
+        """poll() bloqueante (threads); None no timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            frame = self.poll()
+            if frame is not None or (deadline is not None and time.monotonic() >= deadline):
+                return frame
+            time.sleep(poll_interval)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            with self.bus._stats_lock:
+                self.bus.viewers -= 1
+
+
+if __name__ == "__main__":
+    import os
+    import subprocess
+    import sys
+
+    print("--- [FRAME BUS BENCHMARK] ---")
+    name = f"frame_bus_bench_{os.getpid()}"
+    bus = FrameBus(name, create=True)
+    frame_bytes = os.urandom(24 * 1024)  # JPEG 320x240 q60 típico do HUD
+    frames, fps, viewers = 150, 15, 8
+    duration = frames / fps
+
+    # Produtor em outro interpretador, como o HUD lançado pelo SYSTEM_CORE_ACTIVATE
+    producer = subprocess.Popen([sys.executable, '-c', (
+        "import os, time\n"
+        "from frame_bus import FrameBus\n"
+        f"bus = FrameBus.attach({name!r})\n"
+        f"for _ in range({frames}):\n"
+        f"    bus.publish(os.urandom({len(frame_bytes)}))\n"
+        f"    time.sleep({1.0 / fps})\n"
+        "bus.close()\n")])
+    cursors = [bus.cursor() for _ in range(viewers)]
+    sent = 0
+    while producer.poll() is None or any(c.seq < bus.head for c in cursors):
+        for cursor in cursors:
+            if cursor.poll() is not None:
+                sent += 1
+        time.sleep(0.002)
+    # Gerador antigo: reenviava o frame atual a cada 40 ms para cada espectador
+    legacy = int(duration / 0.04) * viewers
+    stats = bus.stats()
+    print(f"[*] {viewers} espectadores, produtor em outro processo a {fps} fps por {duration:.0f}s")
+    print(f"[*] Envios: antigo ~{legacy} ({legacy * len(frame_bytes) / 1e6:.1f} MB) | "
+          f"bus {sent} ({sent * len(frame_bytes) / 1e6:.1f} MB)")
+    print(f"[*] Latência produtor -> espectador: p50 {stats['latency_p50_ms']} ms | "
+          f"p99 {stats['latency_p99_ms']} ms | pulados {stats['skipped']} | descartes seqlock {stats['torn']}")
+    t0 = time.perf_counter()
+    for _ in range(10000):
+        bus.publish(frame_bytes)
+    print(f"[*] publish de 24 KiB: {(time.perf_counter() - t0) / 10000 * 1e6:.1f} µs")
+    for cursor in cursors:
+        cursor.close()
+    bus.close()
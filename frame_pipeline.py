@@ -0,0 +1,423 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import CAMERA_FPS, CAMERA_HEIGHT, CAMERA_WIDTH
+from face_detector import FACE_SIZE
+
+# --- FRAME PIPELINE ---
+# generate_frames em estágios, cada um na sua thread:
+#   captura -> detecção -> encoder MJPEG
+#                  \-> reconhecimento (pool de workers)
+# Entre estágios há um LatestSlot (latest-frame-wins): quem produz só sobrescreve o item mais
+# recente e quem consome pega o último; um estágio lento perde frames, nunca segura o anterior.
+# O reconhecimento recebe a ROI em cinza já recortada (sem PNG) e publica o último resultado;
+# o encoder desenha o resultado disponível no momento, então o MJPEG nunca espera o reconhecimento.
+# O overlay mostra FPS medido e latência por estágio (a partir do instante da captura).
+
+CAMERA_RETRY_INTERVAL = 5.0  # s entre tentativas de reabrir a câmera
+RECOGNIZE_INTERVAL = 1.0     # s mínimos entre ROIs enviadas ao reconhecimento
+STAGES = ('capture', 'detect', 'recognize', 'encode')
+
+
+def open_camera(index: int = 0):
+    """cv2.VideoCapture com a resolução e o FPS de config.py; None se não abrir."""
+    cam = cv2.VideoCapture(index)
+    if not cam.isOpened():
+        cam.release()
+        return None
+    cam.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+    cam.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+    cam.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
+    return cam
+
+
+class LatestSlot:
+    """Guarda só o item mais recente com número de sequência; put nunca bloqueia."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item: Any = None
+        self._seq = 0
+        self._taken = 0
+        self.dropped = 0  # Itens sobrescritos sem nunca terem sido lidos
+        self.closed = False
+
+    def put(self, item: Any) -> int:
+        with self._cond:
+            if self._seq > self._taken:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def get(self, after: int = 0, timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """Primeiro item com seq > after (espera até timeout); (after, None) se não chegou."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after or self.closed, timeout):
+                return after, None
+            if self._seq <= after:
+                return after, None
+            self._taken = self._seq
+            return self._seq, self._item
+
+    def take(self, timeout: Optional[float] = None) -> Any:
+        """Consome o item mais recente (cada item vai para um único worker); None no timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._taken or self.closed, timeout):
+                return None
+            if self._seq <= self._taken:
+                return None
+            self._taken = self._seq
+            item, self._item = self._item, None
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StageMeter:
+    """FPS (janela deslizante) e latência desde a captura de um estágio."""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self.count = 0
+        self._times: deque = deque()
+        self._latencies: deque = deque(maxlen=256)
+        self._lock = threading.Lock()
+
+    def mark(self, captured_at: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.count += 1
+            self._times.append(now)
+            while self._times and now - self._times[0] > self.window:
+                self._times.popleft()
+            if captured_at is not None:
+                self._latencies.append((now - captured_at) * 1000.0)
+
+    def fps(self) -> float:
+        with self._lock:
+            times = [t for t in self._times if time.monotonic() - t <= self.window]
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(times[-1] - times[0], 1e-6)
+
+    def latency_ms(self, q: float = 0.5) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p99 = self.latency_ms(0.5), self.latency_ms(0.99)
+        return {'count': self.count, 'fps': round(self.fps(), 1),
+                'latency_p50_ms': None if p50 is None else round(p50, 1),
+                'latency_p99_ms': None if p99 is None else round(p99, 1)}
+
+
+class Frame(NamedTuple):
+    seq: int
+    captured_at: float  # time.monotonic() da captura
+    image: np.ndarray   # BGR
+    online: bool        # False = placeholder de câmera offline
+
+
+class Detected(NamedTuple):
+    frame: Frame
+    faces: np.ndarray   # (n, 4) x, y, w, h
+
+
+class Recognition(NamedTuple):
+    user: Optional[str]
+    confidence: Optional[float]
+    at: float           # time.monotonic() do resultado
+    latency_ms: float   # captura -> resultado
+
+
+def offline_frame(width: int = 640, height: int = 480) -> np.ndarray:
+    """Placeholder de câmera offline (fundo em gradiente + aviso)."""
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    shade = (30 + np.arange(height) / height * 30).astype(np.uint8)
+    frame[:, :, 0] = shade[:, None]
+    frame[:, :, 1] = shade[:, None]
+    frame[:, :, 2] = shade[:, None] + 20
+    cv2.putText(frame, '📷 CAMERA OFFLINE', (180, 200), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 100, 100), 2)
+    cv2.putText(frame, 'Conectando...', (230, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 1)
+    cv2.rectangle(frame, (280, 320), (360, 380), (100, 100, 255), 2)
+    cv2.circle(frame, (320, 350), 15, (100, 100, 255), 2)
+    return frame
+
+
+def draw_face_box(frame: np.ndarray, rect, label: str) -> None:
+    """Retângulo com cantos destacados (estilo futurista) e nome do usuário."""
+    x, y, w, h = (int(v) for v in rect)
+    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    corner_len, thickness, color = 20, 3, (0, 255, 255)
+    for cx, cy, dx, dy in ((x, y, 1, 1), (x + w, y, -1, 1), (x, y + h, 1, -1), (x + w, y + h, -1, -1)):
+        cv2.line(frame, (cx, cy), (cx + dx * corner_len, cy), color, thickness)
+        cv2.line(frame, (cx, cy), (cx, cy + dy * corner_len), color, thickness)
+    cv2.putText(frame, f'👤 {label}', (x, y - 10), cv2.FONT_HERSHEY_DUPLEX, 0.7, (0, 255, 255), 2)
+
+
+class FramePipeline:
+    """Captura, detecção, reconhecimento e encoder MJPEG em threads ligadas por LatestSlots."""
+
+    def __init__(self, camera_factory: Callable[[], Any] = open_camera, detector=None,
+                 recognize: Optional[Callable[[np.ndarray], Tuple[Optional[str], Optional[float]]]] = None,
+                 on_recognized: Optional[Callable[[Recognition], None]] = None,
+                 recognition_workers: int = 2, recognize_interval: float = RECOGNIZE_INTERVAL,
+                 target_fps: float = CAMERA_FPS, jpeg_quality: int = 90, offline_fps: float = 5.0):
+        self.camera_factory = camera_factory
+        self.detector = detector
+        self.recognize = recognize
+        self.on_recognized = on_recognized
+        self.recognition_workers = recognition_workers
+        self.recognize_interval = recognize_interval
+        self.target_fps = target_fps
+        self.jpeg_quality = jpeg_quality
+        self.offline_fps = offline_fps
+        self.meters = {stage: StageMeter() for stage in STAGES}
+        self.current_user = "Guest"
+        self.last_recognition: Optional[Recognition] = None
+        self.recognition_errors = 0
+        self._captured = LatestSlot()
+        self._detected = LatestSlot()
+        self._roi = LatestSlot()
+        self._encoded = LatestSlot()
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._camera = None
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> 'FramePipeline':
+        """Sobe as threads (idempotente)."""
+        with self._lock:
+            if self._threads:
+                return self
+            self._stop.clear()
+            targets = [('capture', self._capture_loop), ('detect', self._detect_loop), ('encode', self._encode_loop)]
+            if self.recognize is not None:
+                targets += [(f'recognize-{i}', self._recognize_loop) for i in range(self.recognition_workers)]
+            for name, target in targets:
+                thread = threading.Thread(target=target, name=f'frame-{name}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._lock:
+            self._stop.set()
+            for slot in (self._captured, self._detected, self._roi, self._encoded):
+                slot.close()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+            if self._camera is not None:
+                self._camera.release()
+                self._camera = None
+            # Slots novos para um próximo start()
+            self._captured, self._detected, self._roi, self._encoded = (LatestSlot(), LatestSlot(),
+                                                                        LatestSlot(), LatestSlot())
+
+    # --- Estágios ---
+
+    def _capture_loop(self) -> None:
+        seq, last_attempt, placeholder = 0, 0.0, None
+        period = 1.0 / self.target_fps if self.target_fps else 0.0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            cam = self._camera
+            if (cam is None or not cam.isOpened()) and started - last_attempt >= CAMERA_RETRY_INTERVAL:
+                last_attempt = started
+                try:
+                    cam = self._camera = self.camera_factory()
+                except Exception:
+                    cam = self._camera = None
+            if cam is None or not cam.isOpened():
+                if placeholder is None:
+                    placeholder = offline_frame()
+                seq += 1
+                self._captured.put(Frame(seq, time.monotonic(), placeholder.copy(), False))
+                self.meters['capture'].mark()
+                self._stop.wait(1.0 / self.offline_fps)
+                continue
+            ok, image = cam.read()
+            if not ok or image is None:
+                self._stop.wait(0.01)
+                continue
+            seq += 1
+            captured_at = time.monotonic()
+            self._captured.put(Frame(seq, captured_at, image, True))
+            self.meters['capture'].mark()
+            # Fontes que não bloqueiam em read() (arquivo, teste) seguem o FPS alvo
+            self._stop.wait(max(0.0, period - (time.monotonic() - started)))
+
+    def _detect_loop(self) -> None:
+        seen, last_roi = 0, 0.0
+        while not self._stop.is_set():
+            seen, frame = self._captured.get(seen, timeout=0.5)
+            if frame is None:
+                continue
+            faces = np.zeros((0, 4), dtype=int)
+            if frame.online and self.detector is not None:
+                gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+                try:
+                    faces = np.asarray(self.detector.faces(gray)).reshape(-1, 4)
+                except Exception:
+                    faces = np.zeros((0, 4), dtype=int)
+                now = time.monotonic()
+                if len(faces) and self.recognize is not None and now - last_roi >= self.recognize_interval:
+                    x, y, w, h = max(faces, key=lambda r: r[2] * r[3])
+                    roi = cv2.resize(gray[y:y + h, x:x + w], FACE_SIZE)
+                    self._roi.put((frame.captured_at, roi))
+                    last_roi = now
+            self._detected.put(Detected(frame, faces))
+            self.meters['detect'].mark(frame.captured_at)
+
+    def _recognize_loop(self) -> None:
+        while not self._stop.is_set():
+            item = self._roi.take(timeout=0.5)
+            if item is None:
+                continue
+            captured_at, roi = item
+            try:
+                user, confidence = self.recognize(roi)
+            except Exception:
+                self.recognition_errors += 1
+                continue
+            now = time.monotonic()
+            result = Recognition(user, confidence, now, (now - captured_at) * 1000.0)
+            self.last_recognition = result
+            self.current_user = user if user else "Guest (Unknown)"
+            self.meters['recognize'].mark(captured_at)
+            if self.on_recognized is not None:
+                self.on_recognized(result)
+
+    def _encode_loop(self) -> None:
+        seen = 0
+        while not self._stop.is_set():
+            seen, detected = self._detected.get(seen, timeout=0.5)
+            if detected is None:
+                continue
+            frame = detected.frame
+            image = frame.image
+            if frame.online:
+                self.draw_overlay(image, detected.faces)
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY,
+                                                      self.jpeg_quality if frame.online else 85])
+            if not ok:
+                continue
+            self._encoded.put(buffer.tobytes())
+            self.meters['encode'].mark(frame.captured_at)
+
+    def draw_overlay(self, frame: np.ndarray, faces: np.ndarray) -> None:
+        """Caixas das faces, barra superior e FPS/latência medidos por estágio."""
+        user = self.current_user
+        for rect in faces:
+            draw_face_box(frame, rect, user)
+        height, width = frame.shape[:2]
+        overlay = frame.copy()
+        cv2.rectangle(overlay, (0, 0), (width, 70), (0, 0, 0), -1)
+        cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
+        cv2.putText(frame, '🌌 GALAXY BITCOIN SYSTEM', (10, 25), cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f'User: {user}', (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        face_status = f"✅ {len(faces)} face(s)" if len(faces) else "❌ No face"
+        cv2.putText(frame, face_status, (width - 150, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                    (0, 255, 0) if len(faces) else (100, 100, 255), 1)
+        encode_latency = self.meters['encode'].latency_ms()
+        cv2.putText(frame, f"FPS cap {self.meters['capture'].fps():.0f} det {self.meters['detect'].fps():.0f} "
+                           f"out {self.meters['encode'].fps():.0f}", (width - 250, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (200, 200, 200), 1)
+        recognition = self.last_recognition
+        latency = f"lat {encode_latency or 0:.0f} ms"
+        if recognition is not None:
+            latency += f" | rec {recognition.latency_ms:.0f} ms"
+        cv2.putText(frame, latency, (width - 250, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+
+    # --- Saída ---
+
+    def mjpeg(self, timeout: float = 1.0) -> Iterator[bytes]:
+        """Partes multipart/x-mixed-replace para um espectador; só envia quando há frame novo."""
+        self.start()
+        seen = 0
+        while self.running:
+            seen, jpeg = self._encoded.get(seen, timeout=timeout)
+            if jpeg is None:
+                continue
+            yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+    def stats(self) -> Dict[str, Any]:
+        recognition = self.last_recognition
+        return {
+            'stages': {stage: meter.stats() for stage, meter in self.meters.items()},
+            'dropped': {'detect': self._captured.dropped, 'encode': self._detected.dropped,
+                        'recognize': self._roi.dropped},
+            'current_user': self.current_user,
+            'recognition_errors': self.recognition_errors,
+            'last_recognition': None if recognition is None else recognition._asdict(),
+        }
+
+
+if __name__ == "__main__":
+    print("--- [FRAME PIPELINE BENCHMARK] ---")
+
+    class SyntheticCamera:
+        """Frames 640x480 com uma 'face' clara que se move."""
+
+        def __init__(self):
+            self.t = 0
+
+        def isOpened(self):
+            return True
+
+        def read(self):
+            self.t += 1
+            frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+            x = 200 + (self.t * 3) % 200
+            cv2.circle(frame, (x, 240), 80, (200, 200, 200), -1)
+            return True, frame
+
+        def release(self):
+            pass
+
+    class CircleDetector:
+        def faces(self, gray):
+            ys, xs = np.nonzero(gray > 128)
+            if not len(xs):
+                return np.zeros((0, 4), dtype=int)
+            return np.array([[xs.min(), ys.min(), xs.max() - xs.min(), ys.max() - ys.min()]])
+
+    def slow_recognizer(roi):
+        time.sleep(0.4)  # Reconhecimento lento (galeria grande, CPU ocupada)
+        return 'synthetic_user', 0.9
+
+    pipeline = FramePipeline(SyntheticCamera, detector=CircleDetector(), recognize=slow_recognizer,
+                             recognize_interval=0.0, target_fps=30)
+    received = 0
+    t0 = time.perf_counter()
+    for chunk in pipeline.mjpeg():
+        received += 1
+        if time.perf_counter() - t0 > 5:
+            break
+    elapsed = time.perf_counter() - t0
+    stats = pipeline.stats()
+    pipeline.stop()
+    print(f"[*] MJPEG: {received / elapsed:.1f} fps entregues com reconhecimento de 400 ms por ROI")
+    for stage, values in stats['stages'].items():
+        print(f"    {stage:<10} {values}")
+    print(f"[*] Descartados (latest-frame-wins): {stats['dropped']} | usuário: {stats['current_user']}")
@@ -0,0 +1,144 @@
+import json
+import os
+from typing import Dict, Optional, Sequence
+
+# --- LEDGER / BALANCE INDEX ---
+# Índice incremental de saldos: cada bloco anexado é aplicado uma única vez,
+# e as transações pendentes ficam num overlay separado. Consulta de saldo = O(1).
+# O remetente paga amount + fee; a taxa chega ao minerador dentro da recompensa do bloco.
+
+
+def _debit(tx, fee: Optional[float] = None) -> float:
+    if fee is None:
+        fee = getattr(tx, 'fee', 0.0)  # Transações antigas/simples não têm taxa
+    return tx.amount + fee
+
+
+class PendingOverlay:
+    """Deltas de saldo das transações ainda não mineradas."""
+
+    def __init__(self, txs=()):
+        self.deltas: Dict[str, float] = {}
+        for tx in txs:
+            self.add(tx)
+
+    def add(self, tx, fee: Optional[float] = None) -> None:
+        """fee substitui tx.fee (o Mempool conta a taxa antes de gravá-la na transação)."""
+        self.deltas[tx.sender] = self.deltas.get(tx.sender, 0.0) - _debit(tx, fee)
+        self.deltas[tx.recipient] = self.deltas.get(tx.recipient, 0.0) + tx.amount
+
+    def remove(self, tx, fee: Optional[float] = None) -> None:
+        self.deltas[tx.sender] = self.deltas.get(tx.sender, 0.0) + _debit(tx, fee)
+        self.deltas[tx.recipient] = self.deltas.get(tx.recipient, 0.0) - tx.amount
+
+    def clear(self) -> None:
+        self.deltas.clear()
+
+    def delta(self, address: str) -> float:
+        return self.deltas.get(address, 0.0)
+
+
+class BalanceIndex:
+    """Saldos confirmados por endereço, mantidos em sincronia com a cadeia."""
+
+    def __init__(self):
+        self.balances: Dict[str, float] = {}
+        self.height = 0          # Número de blocos aplicados
+        self.tip_hash: Optional[str] = None
+        self.rebuilds = 0
+        self.saved_height = 0    # Altura do último snapshot gravado/carregado
+        self._source = None  # Sequência indexada (None = snapshot ainda não conferido)
+
+    def rebuild(self, chain: Sequence) -> None:
+        """Reconstrói o índice do zero a partir da cadeia."""
+        self.balances = {}
+        self.height = 0
+        self.tip_hash = None
+        for block in chain:
+            self.apply_block(block)
+        self._source = chain
+        self.rebuilds += 1
+
+    def apply_block(self, block) -> None:
+        balances = self.balances
+        for tx in block.transactions:
+            balances[tx.sender] = balances.get(tx.sender, 0.0) - _debit(tx)
+            balances[tx.recipient] = balances.get(tx.recipient, 0.0) + tx.amount
+        self.height += 1
+        self.tip_hash = block.hash
+
+    def is_diverged(self, chain: Sequence) -> bool:
+        """True se a cadeia não é mais a que foi indexada (outra sequência, encurtada ou reorg).
+
+        Com blocos encadeados por previous_hash, o mesmo hash na altura indexada implica o mesmo
+        histórico; um reorg troca esse bloco (ou encurta a cadeia) e é detectado. Blocos alterados
+        sem recalcular o hash são adulteração: quem pega isso é o ChainValidator.
+        """
+        if self._source is not None and chain is not self._source:
+            return True  # Cadeia substituída por outra sequência (ex.: troca pela mais longa)
+        if self.height == 0:
+            return False
+        if len(chain) < self.height:
+            return True
+        return chain[self.height - 1].hash != self.tip_hash
+
+    def sync(self, chain: Sequence) -> None:
+        """Aplica blocos novos ou reconstrói se o índice divergiu da cadeia."""
+        if self.is_diverged(chain):
+            print(f"[⚠️] Índice de saldos divergiu da cadeia na altura {self.height}. Reconstruindo...")
+            self.rebuild(chain)
+            return
+        self._source = chain
+        for i in range(self.height, len(chain)):
+            self.apply_block(chain[i])
+
+    def save(self, path: str) -> None:
+        """Grava um snapshot (saldos + altura + hash da ponta) para acelerar o próximo boot.
+
+        Atômico: escreve num temporário e troca com os.replace; um crash deixa o snapshot anterior inteiro.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'height': self.height, 'tip_hash': self.tip_hash, 'balances': self.balances}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.saved_height = self.height
+
+    def checkpoint(self, path: str, every: int) -> bool:
+        """Grava o snapshot se ao menos `every` blocos foram aplicados desde o último. True se gravou."""
+        if self.height - self.saved_height < max(every, 1):
+            return False
+        self.save(path)
+        return True
+
+    def load(self, path: str, chain: Sequence) -> bool:
+        """Carrega um snapshot e sincroniza com a cadeia (reconstrói se divergir)."""
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            self.balances = snapshot['balances']
+            self.height = snapshot['height']
+            self.tip_hash = snapshot['tip_hash']
+            self.saved_height = self.height
+            self._source = None
+        except (OSError, ValueError, KeyError):
+            self.rebuild(chain)
+            return False
+        self.sync(chain)
+        return True
+
+    def confirmed_balance(self, address: str) -> float:
+        return self.balances.get(address, 0.0)
+
+    def balance(self, address: str, chain: Sequence, pending=None) -> float:
+        """Saldo confirmado (+ transações pendentes, se informadas)."""
+        self.sync(chain)
+        balance = self.confirmed_balance(address)
+        if pending is not None:
+            # O Mempool mantém o overlay a cada add/remove/evicção; outras coleções são somadas na hora
+            overlay = getattr(pending, 'overlay', None)
+            if overlay is None:
+                overlay = PendingOverlay(pending)
+            balance += overlay.delta(address)
+        return balance
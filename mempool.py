@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from bitcoin_crypto import key_matches_address
+from ledger_index import PendingOverlay
+
+# --- MEMPOOL ---
+# Pool de transações pendentes:
+#   - dedup O(1) por tx_hash
+#   - prioridade por fee rate (taxa / byte) com heap; a taxa fica em tx.fee e é debitada do remetente
+#   - ordem por remetente: a n-ésima transação de um endereço nunca entra antes da (n-1)-ésima
+#   - teto de memória com evicção das transações de menor fee rate
+#   - templates de bloco respeitando o tamanho máximo do bloco
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_BLOCK_BYTES = 1000000  # Como o limite clássico de 1 MB do Bitcoin
+
+
+def estimate_tx_size(tx, fee: Optional[float] = None) -> int:
+    """Tamanho aproximado da transação no codec binário (endereços + valores + hash + assinatura + chave + taxa).
+
+    fee, se informado, substitui tx.fee (o Mempool mede a transação antes de admiti-la).
+    """
+    signature = getattr(tx, 'signature', None)
+    sig_bytes = len(signature) // 2 + 2 if signature else 0
+    public_key = getattr(tx, 'public_key', None)
+    key_bytes = len(public_key) // 2 + 1 if public_key else 0
+    if fee is None:
+        fee = getattr(tx, 'fee', 0.0)
+    fee_bytes = 8 if fee else 0
+    return (len(tx.sender.encode()) + len(tx.recipient.encode()) + 2 + 1 + 16 + 32
+            + sig_bytes + key_bytes + fee_bytes)
+
+
+class MempoolEntry:
+    __slots__ = ('tx', 'fee', 'size', 'fee_rate', 'seq', 'removed')
+
+    def __init__(self, tx, fee: float, size: int, seq: int):
+        self.tx = tx
+        self.fee = fee
+        self.size = size
+        self.fee_rate = fee / size if size else 0.0
+        self.seq = seq
+        self.removed = False
+
+
+class Mempool:
+    """Mempool com prioridade por taxa, limite de memória e ordem por remetente."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, sizer=estimate_tx_size):
+        self.max_bytes = max_bytes
+        self.sizer = sizer  # sizer(tx, fee) -> bytes
+        self.total_bytes = 0
+        self.evicted = 0
+        self.overlay = PendingOverlay()  # Deltas de saldo para o BalanceIndex
+        self._entries: Dict[str, MempoolEntry] = {}  # tx_hash -> entrada (ordem de chegada)
+        self._by_sender: Dict[str, deque] = {}
+        self._evict_heap: List = []  # (fee_rate, -seq, entrada): menor taxa, mais nova primeiro
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator:
+        with self._lock:
+            return iter([entry.tx for entry in self._entries.values()])
+
+    def __contains__(self, item) -> bool:
+        tx_hash = item if isinstance(item, str) else item.tx_hash
+        return tx_hash in self._entries
+
+    def fee_of(self, tx_hash: str) -> Optional[float]:
+        entry = self._entries.get(tx_hash)
+        return entry.fee if entry else None
+
+    def add(self, tx, fee: float = 0.0) -> bool:
+        """Adiciona a transação. False se duplicada, com taxa inválida ou despejada por falta de espaço.
+
+        Transações assinadas também são recusadas se a chave pública não deriva o endereço do remetente.
+        """
+        if not isinstance(fee, (int, float)) or not math.isfinite(fee) or fee < 0:
+            return False  # NaN/inf quebrariam a ordem do heap; taxa negativa criaria saldo
+        if getattr(tx, 'signature', None) is not None and not key_matches_address(tx.public_key, tx.sender):
+            return False  # O ChainValidator recusaria o bloco inteiro (FAIL_SIGNATURE)
+        with self._lock:
+            if tx.tx_hash in self._entries:
+                return False
+            entry = MempoolEntry(tx, fee, self.sizer(tx, fee), next(self._seq))
+            self._entries[tx.tx_hash] = entry
+            self._by_sender.setdefault(tx.sender, deque()).append(entry)
+            heapq.heappush(self._evict_heap, (entry.fee_rate, -entry.seq, entry))
+            self.total_bytes += entry.size
+            self.overlay.add(tx, fee)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            if entry.removed:
+                return False  # Despejada na hora: a transação sai intacta, com a taxa que já tinha
+            tx.fee = fee  # Vai para o bloco: BalanceIndex debita do remetente
+            return True
+
+    append = add  # Compatibilidade com o uso antigo de lista
+
+    def _drop(self, entry: MempoolEntry) -> None:
+        entry.removed = True
+        del self._entries[entry.tx.tx_hash]
+        self.total_bytes -= entry.size
+        self.overlay.remove(entry.tx, entry.fee)
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._evict_heap:
+            _, _, victim = heapq.heappop(self._evict_heap)
+            if victim.removed:
+                continue
+            # Sem a vítima, as transações posteriores do mesmo remetente ficariam órfãs
+            queue = self._by_sender[victim.tx.sender]
+            while queue:
+                entry = queue.pop()
+                self._drop(entry)
+                self.evicted += 1
+                if entry is victim:
+                    break
+            if not queue:
+                del self._by_sender[victim.tx.sender]
+
+    def remove(self, tx_hash: str):
+        """Remove uma transação (ex.: incluída num bloco). Retorna a transação ou None."""
+        with self._lock:
+            entry = self._entries.get(tx_hash)
+            if entry is None:
+                return None
+            self._drop(entry)
+            queue = self._by_sender[entry.tx.sender]
+            queue.remove(entry)
+            if not queue:
+                del self._by_sender[entry.tx.sender]
+            if len(self._evict_heap) > 2 * len(self._entries) + 64:
+                # Compacta as entradas já removidas (deleção preguiçosa)
+                self._evict_heap = [item for item in self._evict_heap if not item[2].removed]
+                heapq.heapify(self._evict_heap)
+            return entry.tx
+
+    def remove_many(self, txs) -> None:
+        for tx in txs:
+            self.remove(tx.tx_hash)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_sender.clear()
+            self._evict_heap.clear()
+            self.total_bytes = 0
+            self.overlay.clear()
+
+    def block_template(self, max_bytes: int = DEFAULT_MAX_BLOCK_BYTES) -> List:
+        """Seleciona transações por fee rate sem ultrapassar max_bytes, respeitando a ordem por remetente."""
+        with self._lock:
+            heap = []
+            cursors = {}
+            for sender, queue in self._by_sender.items():
+                head = queue[0]
+                heap.append((-head.fee_rate, head.seq, sender))
+                cursors[sender] = 0
+            heapq.heapify(heap)
+            selected = []
+            remaining = max_bytes
+            while heap:
+                _, _, sender = heapq.heappop(heap)
+                queue = self._by_sender[sender]
+                entry = queue[cursors[sender]]
+                if entry.size > remaining:
+                    continue  # Próximas do mesmo remetente também ficam para o próximo bloco
+                selected.append(entry.tx)
+                remaining -= entry.size
+                cursors[sender] += 1
+                if cursors[sender] < len(queue):
+                    nxt = queue[cursors[sender]]
+                    heapq.heappush(heap, (-nxt.fee_rate, nxt.seq, sender))
+            return selected
@@ -0,0 +1,119 @@
+import hashlib
+from typing import List, Optional, Sequence, Tuple
+
+# --- MERKLE TREE ---
+# Árvore de Merkle sobre digests crus (32 bytes) com todos os níveis em cache.
+# Regra de consenso herdada de Block.calculate_merkle_root:
+#   pai = SHA256(hex(esquerdo) + hex(direito)), duplicando o último nó de níveis ímpares.
+# Folha única = a própria raiz; árvore vazia = SHA256(b'').
+
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+ProofStep = Tuple[bytes, bool]  # (digest do irmão, irmão está à direita?)
+
+
+def hash_pair(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(left.hex().encode() + right.hex().encode()).digest()
+
+
+class MerkleTree:
+    """Mantém os níveis da árvore; append/update recalculam só o caminho até a raiz (O(log n))."""
+
+    def __init__(self, leaves: Sequence[bytes] = ()):
+        self.levels: List[List[bytes]] = [list(leaves)]
+        self._build()
+
+    @classmethod
+    def from_hex(cls, tx_hashes: Sequence[str]) -> 'MerkleTree':
+        return cls([bytes.fromhex(h) for h in tx_hashes])
+
+    def _build(self) -> None:
+        level = self.levels[0]
+        del self.levels[1:]
+        while len(level) > 1:
+            parents = [
+                hash_pair(level[i], level[i + 1] if i + 1 < len(level) else level[i])
+                for i in range(0, len(level), 2)
+            ]
+            self.levels.append(parents)
+            level = parents
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @property
+    def root(self) -> bytes:
+        if not self.levels[0]:
+            return EMPTY_ROOT
+        return self.levels[-1][0]
+
+    @property
+    def root_hex(self) -> str:
+        return self.root.hex()
+
+    def _update_path(self, index: int) -> None:
+        depth = 0
+        while len(self.levels[depth]) > 1:
+            level = self.levels[depth]
+            parent = index // 2
+            left = level[2 * parent]
+            right = level[2 * parent + 1] if 2 * parent + 1 < len(level) else left
+            if depth + 1 == len(self.levels):
+                self.levels.append([])
+            upper = self.levels[depth + 1]
+            node = hash_pair(left, right)
+            if parent == len(upper):
+                upper.append(node)
+            else:
+                upper[parent] = node
+            index = parent
+            depth += 1
+        del self.levels[depth + 1:]
+
+    def append(self, leaf: bytes) -> None:
+        self.levels[0].append(leaf)
+        self._update_path(len(self.levels[0]) - 1)
+
+    def update(self, index: int, leaf: bytes) -> None:
+        self.levels[0][index] = leaf
+        self._update_path(index)
+
+    def proof(self, index: int) -> List[ProofStep]:
+        """Prova de inclusão da folha `index`: irmãos do caminho até a raiz."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        steps = []
+        for level in self.levels[:-1]:
+            if index % 2:
+                steps.append((level[index - 1], False))
+            else:
+                sibling = level[index + 1] if index + 1 < len(level) else level[index]
+                steps.append((sibling, True))
+            index //= 2
+        return steps
+
+    def index_of(self, leaf: bytes) -> Optional[int]:
+        try:
+            return self.levels[0].index(leaf)
+        except ValueError:
+            return None
+
+
+def verify_proof(leaf: bytes, proof: Sequence[ProofStep], root: bytes) -> bool:
+    """Verifica uma prova sem precisar das demais transações do bloco (cliente leve)."""
+    node = leaf
+    for sibling, sibling_is_right in proof:
+        node = hash_pair(node, sibling) if sibling_is_right else hash_pair(sibling, node)
+    return node == root
+
+
+def verify_proof_hex(tx_hash: str, proof: Sequence[Tuple[str, bool]], merkle_root: str) -> bool:
+    return verify_proof(bytes.fromhex(tx_hash), proof_from_hex(proof), bytes.fromhex(merkle_root))
+
+
+def proof_to_hex(proof: Sequence[ProofStep]) -> List[Tuple[str, bool]]:
+    return [(sibling.hex(), is_right) for sibling, is_right in proof]
+
+
+def proof_from_hex(proof: Sequence[Tuple[str, bool]]) -> List[ProofStep]:
+    return [(bytes.fromhex(sibling), is_right) for sibling, is_right in proof]
@@ -0,0 +1,224 @@
+import hashlib
+import multiprocessing as mp
+import os
+import queue
+import time
+from typing import Callable, Optional, Tuple
+
+# --- PROOF-OF-WORK MINING ENGINE ---
+# Motor de mineração paralela compartilhado por Block, SingularityBlock e SimpleBlock.
+# O cabeçalho é dividido em prefixo (antes do nonce) e sufixo (depois do nonce):
+#   hash = SHA256(prefixo + str(nonce) + sufixo)
+
+PROGRESS_INTERVAL = 100000  # Nonces entre relatórios de progresso
+STOP_CHECK_INTERVAL = 4096  # Nonces entre verificações do sinal de parada
+
+
+def difficulty_target(difficulty: int) -> Optional[bytes]:
+    """Alvo numérico equivalente a `hexdigest().startswith('0' * difficulty)`.
+
+    Um digest de 32 bytes atende o alvo se for estritamente menor que 16^(64 - difficulty).
+    Comparar bytes big-endian de mesmo tamanho é comparar os inteiros. None = qualquer hash serve.
+    """
+    if difficulty <= 0:
+        return None
+    if difficulty < 64:
+        return (1 << (256 - 4 * difficulty)).to_bytes(32, 'big')
+    # 64: só o digest zero passa (bytes(32) < bytes(32) + b'\x01'); acima de 64 nenhum passa
+    return bytes(32) + b'\x01' if difficulty == 64 else bytes(32)
+
+
+class HeaderHasher:
+    """Midstate SHA-256: absorve o prefixo constante uma vez e só anexa nonce + sufixo."""
+
+    def __init__(self, prefix: str, suffix: str = ""):
+        self._midstate = hashlib.sha256(prefix.encode())
+        self._suffix = suffix.encode()
+
+    def digest(self, nonce: int) -> bytes:
+        h = self._midstate.copy()
+        h.update(b'%d' % nonce)
+        if self._suffix:
+            h.update(self._suffix)
+        return h.digest()
+
+    def hexdigest(self, nonce: int) -> str:
+        return self.digest(nonce).hex()
+
+
+class MiningCancelled(Exception):
+    """Mineração interrompida pelo cancel_event (ex.: outro bloco chegou antes)."""
+
+
+def meets_target(digest: bytes, target: Optional[bytes]) -> bool:
+    return target is None or digest < target
+
+
+def _search_nonces(prefix: str, suffix: str, difficulty: int, start: int, step: int,
+                   stop_event, result_queue, progress=None, slot: int = 0) -> None:
+    """Worker: percorre start, start+step, start+2*step... até achar o alvo ou receber parada.
+
+    progress[slot] recebe o próximo nonce a testar a cada STOP_CHECK_INTERVAL (progresso no pai).
+    """
+    target = difficulty_target(difficulty)
+    if target is None:
+        result_queue.put((start, HeaderHasher(prefix, suffix).hexdigest(start)))
+        stop_event.set()
+        return
+    copy = hashlib.sha256(prefix.encode()).copy
+    tail = suffix.encode()
+    nonce = start
+    while True:
+        for _ in range(STOP_CHECK_INTERVAL):
+            h = copy()
+            h.update(b'%d' % nonce)
+            if tail:
+                h.update(tail)
+            digest = h.digest()
+            if digest < target:
+                result_queue.put((nonce, digest.hex()))
+                stop_event.set()
+                return
+            nonce += step
+        if progress is not None:
+            progress[slot] = nonce
+        if stop_event.is_set():
+            return
+
+
+class MiningEngine:
+    """Divide o espaço de nonces entre um pool de processos e para todos no primeiro acerto."""
+
+    def __init__(self, workers: Optional[int] = None, min_parallel_difficulty: int = 5):
+        self.workers = workers or os.cpu_count() or 1
+        # Abaixo desta dificuldade o custo de subir processos supera o ganho
+        self.min_parallel_difficulty = min_parallel_difficulty
+        self.last_hash_count = 0
+        self.last_elapsed = 0.0
+
+    def should_parallelize(self, difficulty: int) -> bool:
+        return self.workers > 1 and difficulty >= self.min_parallel_difficulty
+
+    def mine(self, prefix: str, suffix: str, difficulty: int, start_nonce: int = 0,
+             on_progress: Optional[Callable[[int, str], None]] = None,
+             cancel_event=None) -> Tuple[int, str]:
+        """Retorna (nonce, hash) vencedor. O primeiro nonce testado é start_nonce + 1.
+
+        Se cancel_event (threading/multiprocessing Event) for acionado, levanta MiningCancelled.
+        on_progress(nonce, hash) é chamado a cada PROGRESS_INTERVAL nonces; no modo paralelo o
+        nonce informado é o menor ainda não testado por algum worker (todos abaixo dele já foram).
+        """
+        start_time = time.time()
+        if self.should_parallelize(difficulty):
+            nonce, digest = self._mine_parallel(prefix, suffix, difficulty, start_nonce, cancel_event,
+                                                on_progress)
+        else:
+            nonce, digest = self._mine_serial(prefix, suffix, difficulty, start_nonce, on_progress,
+                                              cancel_event)
+        self.last_elapsed = time.time() - start_time
+        return nonce, digest
+
+    def _mine_serial(self, prefix, suffix, difficulty, start_nonce, on_progress, cancel_event=None):
+        target = difficulty_target(difficulty)
+        if target is None:
+            return start_nonce + 1, HeaderHasher(prefix, suffix).hexdigest(start_nonce + 1)
+        copy = hashlib.sha256(prefix.encode()).copy
+        tail = suffix.encode()
+        nonce = start_nonce
+        while True:
+            nonce += 1
+            h = copy()
+            h.update(b'%d' % nonce)
+            if tail:
+                h.update(tail)
+            digest = h.digest()
+            if digest < target:
+                self.last_hash_count = nonce - start_nonce
+                return nonce, digest.hex()
+            if on_progress and nonce % PROGRESS_INTERVAL == 0:
+                on_progress(nonce, digest.hex())
+            if cancel_event is not None and nonce % STOP_CHECK_INTERVAL == 0 and cancel_event.is_set():
+                self.last_hash_count = nonce - start_nonce
+                raise MiningCancelled(f"cancelado no nonce {nonce:,}")
+
+    def _mine_parallel(self, prefix, suffix, difficulty, start_nonce, cancel_event=None, on_progress=None):
+        ctx = mp.get_context()
+        stop_event = ctx.Event()
+        result_queue = ctx.Queue()
+        progress = ctx.Array('q', [start_nonce + 1 + i for i in range(self.workers)], lock=False)
+        reported = start_nonce // PROGRESS_INTERVAL
+        procs = [
+            ctx.Process(
+                target=_search_nonces,
+                args=(prefix, suffix, difficulty, start_nonce + 1 + i, self.workers,
+                      stop_event, result_queue, progress, i),
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        for p in procs:
+            p.start()
+        try:
+            while True:
+                try:
+                    nonce, digest = result_queue.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    done = min(progress)  # Todos os nonces abaixo deste já foram testados
+                    if on_progress and done // PROGRESS_INTERVAL > reported:
+                        reported = done // PROGRESS_INTERVAL
+                        on_progress(done, HeaderHasher(prefix, suffix).hexdigest(done))
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise MiningCancelled("cancelado durante a busca paralela")
+                    if not any(p.is_alive() for p in procs) and result_queue.empty():
+                        raise RuntimeError("Todos os workers de mineração terminaram sem resultado")
+        finally:
+            stop_event.set()
+            for p in procs:
+                p.join(timeout=5)
+                if p.is_alive():
+                    p.terminate()
+        # Aproximação: todos os workers avançam em paralelo até o nonce vencedor
+        self.last_hash_count = nonce - start_nonce
+        return nonce, digest
+
+
+_default_engine: Optional[MiningEngine] = None
+
+
+def get_default_engine() -> MiningEngine:
+    """Motor compartilhado do processo (criado sob demanda)."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = MiningEngine()
+    return _default_engine
+
+
+def set_default_engine(engine: MiningEngine) -> None:
+    global _default_engine
+    _default_engine = engine
+
+
+if __name__ == "__main__":
+    print("--- [MINING ENGINE BENCHMARK] ---")
+    index, prev, ts, merkle = 1, '0' * 64, time.time(), hashlib.sha256(b'demo').hexdigest()
+    header = f"{index}{prev}{ts}{merkle}"
+    n = 200000
+    t0 = time.time()
+    for nonce in range(n):
+        # Caminho antigo: remonta o cabeçalho inteiro e compara o hexdigest
+        hashlib.sha256(f"{index}{prev}{ts}{merkle}{nonce}".encode()).hexdigest().startswith('00000')
+    t_naive = time.time() - t0
+    t0 = time.time()
+    copy, target = hashlib.sha256(header.encode()).copy, difficulty_target(5)
+    for nonce in range(n):
+        h = copy()
+        h.update(b'%d' % nonce)
+        h.digest() < target
+    t_mid = time.time() - t0
+    print(f"[*] 1 core: f-string+hexdigest {n / t_naive:,.0f} H/s | midstate {n / t_mid:,.0f} H/s")
+    for workers in (1, os.cpu_count() or 1):
+        engine = MiningEngine(workers=workers, min_parallel_difficulty=1)
+        nonce, digest = engine.mine(header, "", 5)
+        rate = engine.last_hash_count / max(engine.last_elapsed, 1e-9)
+        print(f"[*] workers={workers}: nonce={nonce:,} tempo={engine.last_elapsed:.2f}s (~{rate:,.0f} H/s)")
@@ -0,0 +1,294 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from mining_engine import MiningCancelled, MiningEngine, get_default_engine
+
+# --- MINING SCHEDULER ---
+# Fila de jobs de mineração com um único worker para /api/mine:
+#   - um só escritor da cadeia: lock da blockchain + commit_block recusa templates de topo velho
+#   - fila limitada: uma rajada de requisições não multiplica threads nem uso de CPU
+#   - cada job tem id, status e progresso consultáveis
+#   - se outro bloco vira o topo durante a busca, a tentativa é cancelada e refeita no novo topo
+#   - eventos ('block_mined', 'mining_progress', 'mining_job') via callback emit(evento, dados)
+# A blockchain precisa expor: lock, tip_listeners, difficulty, prepare_block(endereço),
+# commit_block(bloco, incluídas) e block_reward(bloco) — BitcoinBlockchain e SimpleBlockchain já expõem.
+
+JOB_QUEUED = 'queued'
+JOB_MINING = 'mining'
+JOB_DONE = 'done'
+JOB_CANCELLED = 'cancelled'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_DONE, JOB_CANCELLED, JOB_FAILED)
+
+
+class QueueFull(Exception):
+    """Fila de mineração cheia: o cliente deve tentar de novo mais tarde."""
+
+
+class MiningJob:
+    """Pedido de mineração de um bloco para um endereço."""
+
+    def __init__(self, miner_address: str, label: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex[:16]
+        self.miner_address = miner_address
+        self.label = label or miner_address
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.attempt_started_at: Optional[float] = None
+        self.nonces_tried = 0
+        self.restarts = 0  # Tentativas refeitas porque outro bloco chegou antes
+        self.block_index: Optional[int] = None
+        self.block_hash: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.cancel_requested = False
+        self._finished = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até o job terminar (done/cancelled/failed)."""
+        return self._finished.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        elapsed = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        rate = 0.0
+        if self.status == JOB_MINING and self.attempt_started_at:
+            rate = self.nonces_tried / max(time.time() - self.attempt_started_at, 1e-9)
+        return {
+            'job_id': self.job_id,
+            'miner': self.label,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed': elapsed,
+            'progress': {'nonces_tried': self.nonces_tried, 'hash_rate': rate, 'restarts': self.restarts},
+            'block_index': self.block_index,
+            'block_hash': self.block_hash,
+            'error': self.error,
+        }
+
+
+class MiningScheduler:
+    """Worker único que minera os jobs da fila, um de cada vez."""
+
+    def __init__(self, blockchain, engine: Optional[MiningEngine] = None, max_queue: int = 8,
+                 max_restarts: int = 5, history: int = 256,
+                 emit: Optional[Callable[[str, Dict], None]] = None):
+        self.blockchain = blockchain
+        self.engine = engine
+        self.max_restarts = max_restarts
+        self.history = history
+        self.emit = emit
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._jobs: 'OrderedDict[str, MiningJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._current: Optional[MiningJob] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        blockchain.tip_listeners.append(self._on_new_tip)
+
+    # --- API ---
+
+    def submit(self, miner_address: str, label: Optional[str] = None) -> MiningJob:
+        """Enfileira um job. Levanta QueueFull se a fila estiver no limite."""
+        job = MiningJob(miner_address, label)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"fila de mineração cheia ({self._queue.maxsize} jobs)")
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._ensure_worker()
+        return job
+
+    def get(self, job_id: str) -> Optional[MiningJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job: MiningJob) -> Optional[int]:
+        """Posição na fila (0 = próximo); None se já saiu da fila."""
+        with self._queue.mutex:
+            pending = list(self._queue.queue)
+        return pending.index(job) if job in pending else None
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.cancel_requested = True
+            job.cancel_event.set()
+            # Ainda na fila: sai dela e libera a vaga. Já retirado pelo worker: ele vê cancel_requested
+            queued = self._dequeue(job)
+        if queued:
+            self._finish(job, JOB_CANCELLED, error="cancelado pelo usuário")
+        return True
+
+    def _dequeue(self, job: MiningJob) -> bool:
+        with self._queue.mutex:
+            try:
+                self._queue.queue.remove(job)
+            except ValueError:
+                return False
+            self._queue.not_full.notify()
+            return True
+
+    def stats(self) -> Dict:
+        current = self._current
+        return {
+            'queued': self._queue.qsize(),
+            'max_queue': self._queue.maxsize,
+            'current_job': current.job_id if current else None,
+            'jobs_tracked': len(self._jobs),
+        }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        current = self._current
+        if current is not None:
+            current.cancel_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- Worker ---
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='mining-scheduler', daemon=True)
+                self._thread.start()
+
+    def _trim_history(self) -> None:
+        # Esquece os jobs terminados mais antigos além do limite de histórico
+        excess = len(self._jobs) - self.history
+        for job_id in [jid for jid, job in self._jobs.items() if job.finished][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                job = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job.finished:  # Cancelado enquanto esperava
+                continue
+            try:
+                self._mine_job(job)
+            except Exception as e:
+                self._finish(job, JOB_FAILED, error=str(e))
+
+    def _on_new_tip(self, block) -> None:
+        # Chamado sob o lock da cadeia. O próprio commit acontece com _current = None.
+        job = self._current
+        if job is not None:
+            job.cancel_event.set()
+
+    def _mine_job(self, job: MiningJob) -> None:
+        chain = self.blockchain
+        job.status = JOB_MINING
+        job.started_at = time.time()
+        self._emit('mining_job', job.to_dict())
+        start_nonce = 0
+
+        def on_progress(nonce: int, digest: str) -> None:
+            job.nonces_tried = nonce - start_nonce  # Só a tentativa atual, como attempt_started_at
+            self._emit('mining_progress', {'job_id': job.job_id, 'nonce': nonce})
+
+        while True:
+            job.cancel_event.clear()
+            if job.cancel_requested or self._stopped.is_set():
+                self._finish(job, JOB_CANCELLED, error="cancelado")
+                return
+            self._current = job
+            try:
+                block, included = chain.prepare_block(job.miner_address)
+                job.attempt_started_at = time.time()
+                job.nonces_tried = 0
+                start_nonce = block.nonce
+                block.mine_block(chain.difficulty, engine=self.engine or get_default_engine(),
+                                 cancel_event=job.cancel_event, on_progress=on_progress)
+            except MiningCancelled:
+                block = None
+            finally:
+                self._current = None  # Antes do commit: o próprio bloco não cancela o job
+            committed = block is not None and chain.commit_block(block, included)
+            if committed:
+                job.block_index = block.index
+                job.block_hash = block.hash
+                self._finish(job, JOB_DONE)
+                self._emit('block_mined', {
+                    'job_id': job.job_id,
+                    'block_number': block.index,
+                    'hash': block.hash,
+                    'miner': job.label,
+                    'reward': chain.block_reward(block),
+                    'timestamp': time.time(),
+                })
+                return
+            if job.cancel_requested or self._stopped.is_set():
+                self._finish(job, JOB_CANCELLED, error="cancelado")
+                return
+            # Outro bloco virou o topo: refaz o template em cima dele
+            job.restarts += 1
+            if job.restarts > self.max_restarts:
+                self._finish(job, JOB_CANCELLED, error="topo mudou repetidamente; job descartado")
+                return
+
+    def _finish(self, job: MiningJob, status: str, error: Optional[str] = None) -> bool:
+        """Marca o job como terminado uma única vez (cancel() e o worker podem chegar juntos)."""
+        with self._lock:
+            if job.finished:
+                return False
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+        job._finished.set()
+        self._emit('mining_job', job.to_dict())
+        return True
+
+    def _emit(self, event: str, payload: Dict) -> None:
+        if self.emit is None:
+            return
+        try:
+            self.emit(event, payload)
+        except Exception:
+            pass  # Falha de transporte não derruba o worker de mineração
+
+
+if __name__ == "__main__":
+    from bitcoin_blockchain import BitcoinBlockchain
+    print("--- [MINING SCHEDULER DEMO] ---")
+
+    def print_block_mined(event: str, data: Dict) -> None:
+        if event == 'block_mined':
+            print(f"[event] block_mined #{data['block_number']} por {data['miner']} (job {data['job_id']})")
+
+    chain = BitcoinBlockchain(difficulty=3)
+    scheduler = MiningScheduler(chain, max_queue=4, emit=print_block_mined)
+    accepted, rejected = [], 0
+    t0 = time.time()
+    for i in range(20):  # Rajada: só max_queue jobs entram, o resto recebe QueueFull (HTTP 429)
+        try:
+            accepted.append(scheduler.submit(f"miner_{i}"))
+        except QueueFull:
+            rejected += 1
+    for job in accepted:
+        job.wait()
+    print(f"[*] {len(accepted)} jobs minerados, {rejected} recusados em {time.time() - t0:.2f}s "
+          f"| cadeia: {len(chain.chain)} blocos | válida: {chain.is_chain_valid()}")
+    scheduler.stop()
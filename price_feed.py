@@ -0,0 +1,309 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+try:
+    import websocket
+    HAS_WEBSOCKET = True
+except Exception:
+    websocket = None
+    HAS_WEBSOCKET = False
+
+# --- STREAMING PRICE FEED ---
+# Uma única thread leitora por feed:
+#   - reconexão com backoff exponencial + jitter (sem recursão, sem thread nova por queda)
+#   - buffer circular (deque com maxlen) com os ticks mais recentes
+#   - assinantes recebem o preço mais recente "conflacionado": a leitora só troca um slot e
+#     notifica; quem é lento perde ticks intermediários, nunca atrasa o socket
+#   - estatísticas de vazão, latência (bolsa -> recebido, recebido -> entregue) e quedas
+
+DEFAULT_BINANCE_URL = 'wss://stream.binance.com:9443/ws/btcusdt@ticker'
+
+
+class PriceTick(NamedTuple):
+    price: float
+    exchange_time: Optional[float]  # Horário do evento na bolsa (s), se informado
+    received_at: float
+    data: Dict[str, Any]
+
+
+def parse_binance_ticker(message: str) -> Optional[PriceTick]:
+    """Ticker 24h da Binance: 'c' = último preço, 'E' = horário do evento em ms."""
+    data = json.loads(message)
+    price = float(data.get('c', 0))
+    if price <= 0:
+        return None
+    event_ms = data.get('E')
+    return PriceTick(price, event_ms / 1000.0 if event_ms else None, time.time(), data)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Subscription:
+    """Slot conflacionado de um assinante: guarda só o tick mais recente ainda não entregue."""
+
+    def __init__(self, feed: 'PriceFeed', callback: Optional[Callable[[PriceTick], None]] = None):
+        self.feed = feed
+        self.callback = callback
+        self.delivered = 0
+        self.conflated = 0  # Ticks sobrescritos antes de serem entregues
+        self.errors = 0
+        self.delivery_latencies = deque(maxlen=1024)
+        self._pending: Optional[PriceTick] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if callback is not None:
+            self._thread = threading.Thread(target=self._deliver_loop, name='price-feed-subscriber',
+                                            daemon=True)
+            self._thread.start()
+
+    def offer(self, tick: PriceTick) -> None:
+        """Chamado pela thread leitora: O(1), nunca bloqueia esperando o assinante."""
+        with self._cond:
+            if self._pending is not None:
+                self.conflated += 1
+            self._pending = tick
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[PriceTick]:
+        """Modo pull: espera e retorna o tick mais recente ainda não visto (None no timeout)."""
+        with self._cond:
+            if self._pending is None and not self._closed:
+                self._cond.wait(timeout)
+            tick, self._pending = self._pending, None
+        if tick is not None:
+            self.delivered += 1
+            self.delivery_latencies.append(time.time() - tick.received_at)
+        return tick
+
+    def _deliver_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                tick, self._pending = self._pending, None
+            self.delivered += 1
+            self.delivery_latencies.append(time.time() - tick.received_at)
+            try:
+                self.callback(tick)
+            except Exception:
+                self.errors += 1
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.feed._unsubscribe(self)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self.delivery_latencies)
+        return {
+            'delivered': self.delivered,
+            'conflated': self.conflated,
+            'errors': self.errors,
+            'delivery_latency_p50': _percentile(latencies, 0.5),
+            'delivery_latency_p99': _percentile(latencies, 0.99),
+        }
+
+
+class PriceFeed:
+    """Feed de preços via WebSocket com uma thread leitora de vida longa."""
+
+    def __init__(self, url: str = DEFAULT_BINANCE_URL,
+                 parse: Callable[[str], Optional[PriceTick]] = parse_binance_ticker,
+                 buffer_size: int = 1024, backoff_initial: float = 0.5, backoff_max: float = 30.0,
+                 idle_timeout: float = 30.0, connect: Optional[Callable[[str], Any]] = None):
+        self.url = url
+        self.parse = parse
+        self.buffer = deque(maxlen=buffer_size)  # Ticks recentes (buffer circular)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.idle_timeout = idle_timeout  # Sem mensagens por esse tempo = conexão morta
+        self._connect = connect or self._default_connect
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self.connected = False
+        self.connects = 0
+        self.reconnects = 0
+        self.ticks_received = 0
+        self.parse_errors = 0
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self._exchange_latencies = deque(maxlen=1024)
+
+    @staticmethod
+    def _default_connect(url: str):
+        if not HAS_WEBSOCKET:
+            raise RuntimeError("Biblioteca 'websocket-client' nao disponivel.")
+        return websocket.create_connection(url, timeout=10)
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> 'PriceFeed':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='price-feed-reader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                # abort() derruba o socket e acorda o recv() na hora; close() esperaria o handshake
+                getattr(ws, 'abort', ws.close)()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for subscription in list(self._subscribers):
+            subscription.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Assinantes ---
+
+    def subscribe(self, callback: Optional[Callable[[PriceTick], None]] = None) -> Subscription:
+        """Com callback: entrega numa thread própria do assinante. Sem: use Subscription.get()."""
+        subscription = Subscription(self, callback)
+        latest = self.latest()
+        if latest is not None:
+            subscription.offer(latest)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def latest(self) -> Optional[PriceTick]:
+        try:
+            return self.buffer[-1]
+        except IndexError:
+            return None
+
+    def recent(self, n: Optional[int] = None) -> List[PriceTick]:
+        ticks = list(self.buffer)
+        return ticks if n is None else ticks[-n:]
+
+    # --- Thread leitora ---
+
+    def _run(self) -> None:
+        backoff = self.backoff_initial
+        while not self._stop.is_set():
+            try:
+                self._ws = self._connect(self.url)
+            except Exception as e:
+                self.last_error = str(e)
+            else:
+                self.connects += 1
+                if self.connects > 1:
+                    self.reconnects += 1
+                self.connected = True
+                backoff = self.backoff_initial
+                try:
+                    self._read_loop(self._ws)
+                except Exception as e:
+                    self.last_error = str(e)
+                finally:
+                    self.connected = False
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+            if self._stop.is_set():
+                break
+            # Backoff exponencial com jitter; stop() interrompe a espera
+            self._stop.wait(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def _read_loop(self, ws) -> None:
+        ws.settimeout(min(1.0, self.idle_timeout))
+        last_message = time.time()
+        while not self._stop.is_set():
+            try:
+                message = ws.recv()
+            except Exception as e:
+                if HAS_WEBSOCKET and isinstance(e, websocket.WebSocketTimeoutException):
+                    if time.time() - last_message > self.idle_timeout:
+                        raise ConnectionError("feed ocioso: sem mensagens")
+                    continue
+                raise
+            if not message:  # Conexão fechada pelo servidor
+                return
+            last_message = time.time()
+            try:
+                tick = self.parse(message)
+            except Exception:
+                self.parse_errors += 1
+                continue
+            if tick is not None:
+                self._publish(tick)
+
+    def _publish(self, tick: PriceTick) -> None:
+        self.buffer.append(tick)
+        self.ticks_received += 1
+        if tick.exchange_time:
+            self._exchange_latencies.append(tick.received_at - tick.exchange_time)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(tick)
+
+    # --- Estatísticas ---
+
+    def stats(self) -> Dict[str, Any]:
+        ticks = list(self.buffer)
+        rate = 0.0
+        if len(ticks) > 1:
+            span = ticks[-1].received_at - ticks[0].received_at
+            rate = (len(ticks) - 1) / span if span > 0 else 0.0
+        latencies = list(self._exchange_latencies)
+        with self._lock:
+            subscribers = [s.stats() for s in self._subscribers]
+        return {
+            'connected': self.connected,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'ticks_received': self.ticks_received,
+            'parse_errors': self.parse_errors,
+            'ticks_per_second': rate,
+            'exchange_latency_p50': _percentile(latencies, 0.5),
+            'exchange_latency_p99': _percentile(latencies, 0.99),
+            'buffered': len(ticks),
+            'last_error': self.last_error,
+            'subscribers': subscribers,
+        }
+
+
+if __name__ == "__main__":
+    print("--- [PRICE FEED] ---")
+    feed = PriceFeed().start()
+    sub = feed.subscribe(lambda tick: print(f"[tick] BTC ${tick.price:,.2f}"))
+    try:
+        time.sleep(10)
+    finally:
+        print(f"[*] Stats: {feed.stats()}")
+        feed.stop()
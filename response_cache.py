@@ -0,0 +1,196 @@
+import asyncio
+import inspect
+import threading
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# --- RESPONSE CACHE ---
+# Cache TTL + stale-while-revalidate para chamadas HTTP bloqueantes (BitcoinAPI):
+#   idade < ttl               -> valor em cache (sem rede)
+#   ttl <= idade < ttl+stale  -> valor velho na hora + UMA revalidação em segundo plano
+#   sem valor / velho demais  -> busca síncrona; N chamadores simultâneos = 1 busca (coalescência)
+# Falha na busca (None/exceção) não apaga o último valor bom: ele continua sendo servido.
+# get_or_fetch_async faz o mesmo para corrotinas (coalescência por event loop) sobre as mesmas entradas.
+
+Policy = Tuple[float, float]  # (ttl, janela stale) em segundos
+DEFAULT_POLICY: Policy = (5.0, 30.0)
+
+
+class _Entry:
+    __slots__ = ('value', 'stored_at')
+
+    def __init__(self, value, stored_at: float):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class _Flight:
+    """Busca em andamento para uma chave; os demais chamadores esperam o resultado dela."""
+    __slots__ = ('done', 'value')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class ResponseCache:
+    """Cache thread-safe com TTL, stale-while-revalidate e coalescência de requisições."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._async_flights: Dict[Hashable, asyncio.Future] = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'fetches': 0, 'coalesced': 0, 'errors': 0}
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: float, stale: float = 0.0):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.stored_at
+                if age < ttl:
+                    self.stats['hits'] += 1
+                    return entry.value
+                if age < ttl + stale:
+                    self.stats['stale_hits'] += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        threading.Thread(target=self._run_flight, args=(key, fetch, flight),
+                                         name='cache-revalidate', daemon=True).start()
+                    return entry.value
+            self.stats['misses'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+        if leader:
+            self._run_flight(key, fetch, flight)
+        else:
+            flight.done.wait()
+        return flight.value
+
+    def _run_flight(self, key: Hashable, fetch: Callable[[], Any], flight: _Flight) -> None:
+        try:
+            value = fetch()
+        except Exception:
+            value = None
+        with self._lock:
+            flight.value = self._store(key, value)
+            del self._flights[key]
+        flight.done.set()
+
+    def _store(self, key: Hashable, value):
+        """Grava o resultado de uma busca (sob o lock); retorna o valor a entregar aos chamadores."""
+        self.stats['fetches'] += 1
+        if value is not None:
+            self._entries[key] = _Entry(value, self.clock())
+            return value
+        self.stats['errors'] += 1
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None  # Último valor bom
+
+    async def get_or_fetch_async(self, key: Hashable, fetch: Callable[[], Awaitable], ttl: float,
+                                 stale: float = 0.0):
+        loop = asyncio.get_running_loop()
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.stored_at
+                if age < ttl:
+                    self.stats['hits'] += 1
+                    return entry.value
+                if age < ttl + stale:
+                    self.stats['stale_hits'] += 1
+                    pending = self._async_flights.get(key)
+                    if pending is None or pending.get_loop() is not loop:
+                        future = self._async_flights[key] = loop.create_future()
+                        self._spawn(loop, self._run_async_flight(key, fetch, future))
+                    return entry.value
+            self.stats['misses'] += 1
+            future = self._async_flights.get(key)
+            if future is None or future.get_loop() is not loop:
+                future = self._async_flights[key] = loop.create_future()
+                # Em task própria: se o primeiro chamador for cancelado, os demais ainda recebem
+                self._spawn(loop, self._run_async_flight(key, fetch, future))
+            else:
+                self.stats['coalesced'] += 1
+        return await asyncio.shield(future)
+
+    def _spawn(self, loop, coro) -> None:
+        task = loop.create_task(coro)
+        self._tasks.add(task)  # Referência forte até terminar
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_async_flight(self, key: Hashable, fetch: Callable[[], Awaitable],
+                                future: asyncio.Future) -> None:
+        try:
+            value = await fetch()
+        except Exception:
+            value = None
+        with self._lock:
+            value = self._store(key, value)
+            if self._async_flights.get(key) is future:
+                del self._async_flights[key]
+        if not future.done():
+            future.set_result(value)
+
+    def peek(self, key: Hashable):
+        """Valor em cache (mesmo velho) sem disparar busca."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        """Apaga tudo, ou só as chaves de um endpoint (primeiro elemento da chave)."""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if isinstance(k, tuple) and k[0] == prefix]:
+                    del self._entries[key]
+
+
+def cached_method(method):
+    """Decora um método de instância com self.cache (ResponseCache) e self.ttls {nome: (ttl, stale)}.
+
+    A chave é o nome do método + argumentos normalizados (get_current_price() e
+    get_current_price('USD') compartilham a entrada); o método original fica em .uncached.
+    """
+    name = method.__name__
+    signature = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        ttl, stale = self.ttls.get(name, DEFAULT_POLICY)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (name,) + tuple(bound.arguments.values())[1:]
+        return self.cache.get_or_fetch(key, lambda: method(self, *args, **kwargs), ttl, stale)
+
+    wrapper.uncached = method
+    return wrapper
+
+
+def cached_async_method(name: str):
+    """Como cached_method, para a variante async; `name` é o endpoint síncrono cuja entrada é compartilhada."""
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            ttl, stale = self.ttls.get(name, DEFAULT_POLICY)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (name,) + tuple(bound.arguments.values())[1:]
+            return await self.cache.get_or_fetch_async(key, lambda: method(self, *args, **kwargs), ttl, stale)
+
+        wrapper.uncached = method
+        return wrapper
+    return decorate
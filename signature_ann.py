@@ -0,0 +1,169 @@
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# --- SIGNATURE ANN (LSH) ---
+# Busca aproximada de vizinhos para as assinaturas topológicas (histogramas de curvatura, 64 bins):
+#   - embedding de Hellinger: sqrt(p / Σp) fica na esfera unitária e a distância de Hellinger
+#     é equivalente à divergência de Jensen-Shannon (H² <= JS <= 2·ln2·H²); centralizado pela
+#     média da galeria para que os hiperplanos separem histogramas que são todos positivos
+#   - SimHash: L tabelas de K bits (sinal de projeções aleatórias), chaves ordenadas + searchsorted
+#     em vez de dicionários; multi-probe: a chave exata e as K vizinhas a 1 bit em cada tabela;
+#     K acompanha o tamanho da galeria (~log2 N - 1) para manter os baldes com poucos itens
+#   - re-rank em dois passos: produto interno de Hellinger (float32, barato) escolhe os `rerank`
+#     melhores candidatos e só esses recebem a JS exata de TopologicalKernel.compute_geodesic_distance
+
+SIG_EPS = 1e-10  # Mesmo epsilon de TopologicalKernel.compute_geodesic_distance
+
+
+def js_divergence(sigs: np.ndarray, signature: np.ndarray) -> np.ndarray:
+    """JS entre cada linha de sigs (N, bins) e signature, como em compute_geodesic_distance."""
+    p = np.asarray(sigs, dtype=np.float64) + SIG_EPS
+    q = np.asarray(signature, dtype=np.float64) + SIG_EPS
+    m = 0.5 * (p + q)
+    return 0.5 * np.sum(p * np.log(p / m), axis=1) + 0.5 * np.sum(q * np.log(q / m), axis=1)
+
+
+def hellinger_embedding(sigs: np.ndarray) -> np.ndarray:
+    """sqrt do histograma normalizado: produto interno = coeficiente de Bhattacharyya."""
+    sigs = np.atleast_2d(np.asarray(sigs, dtype=np.float64))
+    total = sigs.sum(axis=1, keepdims=True)
+    return np.sqrt(sigs / np.where(total > 0, total, 1.0))
+
+
+class SignatureLSH:
+    """Índice LSH (SimHash multi-tabela) sobre assinaturas topológicas, com re-rank por JS."""
+
+    def __init__(self, n_tables: int = 8, n_bits: Optional[int] = None, multiprobe: bool = True,
+                 rerank: int = 256, seed: int = 0):
+        if n_bits is not None and not 1 <= n_bits <= 62:
+            raise ValueError("n_bits deve estar entre 1 e 62")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.multiprobe = multiprobe
+        self.rerank = rerank
+        self.seed = seed
+        self.sigs: Optional[np.ndarray] = None
+        self._embedded: Optional[np.ndarray] = None  # (N, bins) float32
+        self._planes: Optional[np.ndarray] = None
+        self._center: Optional[np.ndarray] = None
+        self._keys: Optional[np.ndarray] = None   # (L, N) chaves ordenadas por tabela
+        self._order: Optional[np.ndarray] = None  # (L, N) linha da galeria de cada chave
+        self._weights: Optional[np.ndarray] = None
+        self.last_stats: Dict = {}
+
+    def __len__(self) -> int:
+        return 0 if self.sigs is None else len(self.sigs)
+
+    def _hash(self, embedded: np.ndarray) -> np.ndarray:
+        """(N, dim) -> (L, N) chaves int64."""
+        bits = ((embedded - self._center) @ self._planes) > 0  # (N, L*K)
+        bits = bits.reshape(len(embedded), self.n_tables, len(self._weights))
+        return (bits @ self._weights).T
+
+    def fit(self, sigs: np.ndarray) -> "SignatureLSH":
+        """(Re)constrói o índice para a galeria sigs (N, bins); linhas = ids devolvidos em query."""
+        self.sigs = np.asarray(sigs, dtype=np.float64)
+        embedded = hellinger_embedding(self.sigs)
+        bits = self.n_bits or int(np.clip(np.log2(max(len(embedded), 1)) - 1, 4, 16))
+        self._weights = np.left_shift(np.int64(1), np.arange(bits, dtype=np.int64))
+        rng = np.random.default_rng(self.seed)
+        self._planes = rng.standard_normal((embedded.shape[1], self.n_tables * bits))
+        self._center = embedded.mean(axis=0) if len(embedded) else np.zeros(embedded.shape[1])
+        self._embedded = embedded.astype(np.float32)
+        keys = self._hash(embedded)
+        self._order = np.argsort(keys, axis=1, kind='stable')
+        self._keys = np.take_along_axis(keys, self._order, axis=1)
+        return self
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Linhas da galeria que colidem com a consulta em alguma tabela (com multi-probe)."""
+        if not len(self):
+            return np.zeros(0, dtype=np.intp)
+        keys = self._hash(hellinger_embedding(signature))[:, 0]  # (L,)
+        if self.multiprobe:
+            probes = np.concatenate([keys[:, None], keys[:, None] ^ self._weights[None, :]], axis=1)
+        else:
+            probes = keys[:, None]
+        found = []
+        for table in range(self.n_tables):
+            table_keys = self._keys[table]
+            starts = np.searchsorted(table_keys, probes[table], side='left')
+            ends = np.searchsorted(table_keys, probes[table], side='right')
+            for start, end in zip(starts, ends):
+                if end > start:
+                    found.append(self._order[table, start:end])
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        return np.unique(np.concatenate(found))
+
+    def query(self, signature: np.ndarray, k: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+        """Até k vizinhos aproximados: (linhas, divergência JS) em ordem crescente de JS."""
+        candidates = self.candidates(signature)
+        self.last_stats = {'gallery': len(self), 'candidates': len(candidates)}
+        if not len(candidates):
+            return candidates, np.zeros(0)
+        if len(candidates) > max(k, self.rerank):
+            # Maior coeficiente de Bhattacharyya = menor Hellinger ~ menor JS
+            affinity = self._embedded[candidates] @ hellinger_embedding(signature)[0].astype(np.float32)
+            candidates = candidates[np.argpartition(-affinity, max(k, self.rerank))[:max(k, self.rerank)]]
+        js = js_divergence(self.sigs[candidates], signature)
+        if len(candidates) > k:
+            top = np.argpartition(js, k)[:k]
+            candidates, js = candidates[top], js[top]
+        order = np.argsort(js, kind='stable')
+        return candidates[order], js[order]
+
+
+def brute_force(sigs: np.ndarray, signature: np.ndarray, k: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+    """Referência exata: JS contra a galeria inteira."""
+    js = js_divergence(sigs, signature)
+    top = np.argpartition(js, min(k, len(js) - 1))[:k] if len(js) > k else np.arange(len(js))
+    order = np.argsort(js[top], kind='stable')
+    return top[order], js[top][order]
+
+
+def synthetic_gallery(n: int, bins: int = 64, seed: int = 0) -> np.ndarray:
+    """Histogramas de curvatura sintéticos: mistura de 3 gaussianas por identidade (densidade em [-1, 1])."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(-1, 1, bins)
+    centers = rng.uniform(-0.6, 0.6, (n, 3, 1))
+    widths = rng.uniform(0.05, 0.3, (n, 3, 1))
+    weights = rng.dirichlet(np.ones(3), n)[:, :, None]
+    hist = (weights * np.exp(-0.5 * ((x - centers) / widths) ** 2)).sum(axis=1)
+    return hist / hist.sum(axis=1, keepdims=True) * (bins / 2.0)
+
+
+def perturb(sigs: np.ndarray, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """Nova captura da mesma identidade: ruído multiplicativo e renormalização."""
+    noisy = np.atleast_2d(sigs) * rng.lognormal(0.0, noise, np.atleast_2d(sigs).shape)
+    return noisy / noisy.sum(axis=1, keepdims=True) * (sigs.shape[-1] / 2.0)
+
+
+if __name__ == "__main__":
+    print("--- [SIGNATURE ANN BENCHMARK] ---")
+    rng = np.random.default_rng(1)
+    for n in (10000, 100000):
+        gallery = synthetic_gallery(n, seed=n)
+        t0 = time.perf_counter()
+        index = SignatureLSH().fit(gallery)
+        build = time.perf_counter() - t0
+        queries = rng.choice(n, 200, replace=False)
+        probes = perturb(gallery[queries], 0.15, rng)
+        hits1 = hits10 = candidates = 0
+        ann_time = exact_time = 0.0
+        for target, probe in zip(queries, probes):
+            t0 = time.perf_counter()
+            exact_ids, _ = brute_force(gallery, probe, 10)
+            exact_time += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            ann_ids, _ = index.query(probe, 10)
+            ann_time += time.perf_counter() - t0
+            candidates += index.last_stats['candidates']
+            hits1 += bool(len(ann_ids)) and ann_ids[0] == exact_ids[0]
+            hits10 += len(np.intersect1d(ann_ids, exact_ids)) / 10.0
+        q = len(queries)
+        print(f"[*] {n:>7,} identidades: build {build:.2f}s | força bruta {exact_time / q * 1000:.2f} ms | "
+              f"LSH {ann_time / q * 1000:.2f} ms ({candidates / q:,.0f} candidatos) | "
+              f"recall@1 {hits1 / q:.3f} | recall@10 {hits10 / q:.3f}")
@@ -7,17 +7,27 @@ from flask import Flask, render_template, Response, jsonify, request, redirect,
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import cv2
+import os
 import threading
 import time
 import hashlib
+import math
 from datetime import datetime, timedelta
 import numpy as np
 import io
 import logging
-from functools import wraps
+from functools import partial, wraps
 
 # Sistema de Reconhecimento e Tokenização Ψ
-from face_recog import enroll_user_manifold, authenticate_from_image_bytes, derive_cognitive_token, validate_cognitive_token
+from face_recog import enroll_user_manifold, authenticate_from_image_bytes, authenticate_from_face_array, derive_cognitive_token, validate_cognitive_token, video_kernel
+from face_detector import get_detector
+from frame_pipeline import FramePipeline
+from ledger_index import BalanceIndex
+from mempool import DEFAULT_MAX_BLOCK_BYTES, Mempool
+from mining_engine import HeaderHasher, MiningEngine, get_default_engine
+from mining_scheduler import MiningScheduler, QueueFull
+from tick_store import TickRecorder, TickStore
+from trade_ledger import TradeLedger
 
 # Importar APIs Bitcoin reais
 try:
@@ -31,6 +41,9 @@ except:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TICK_STORE_DIR = os.path.join('data', 'ticks')
+TRADE_LEDGER_DIR = os.path.join('data', 'trading')
+
 # Sistema Bitcoin Simplificado Integrado
 class SimpleWallet:
     def __init__(self, name: str):
@@ -54,17 +67,20 @@ class SimpleBlock:
         self.nonce = 0
         self.hash = ""
     
+    def header_parts(self):
+        return f"{self.index}{self.timestamp}{len(self.transactions)}{self.previous_hash}", ""
+    
     def calculate_hash(self):
-        data = f"{self.index}{self.timestamp}{len(self.transactions)}{self.previous_hash}{self.nonce}"
-        return hashlib.sha256(data.encode()).hexdigest()
+        prefix, suffix = self.header_parts()
+        return HeaderHasher(prefix, suffix).hexdigest(self.nonce)
     
-    def mine_block(self, difficulty: int):
-        target = '0' * difficulty
+    def mine_block(self, difficulty: int, engine: MiningEngine = None, cancel_event=None, on_progress=None):
+        engine = engine or get_default_engine()
         logger.info(f"⛏️ Minerando bloco #{self.index}...")
         start = time.time()
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
+        prefix, suffix = self.header_parts()
+        self.nonce, self.hash = engine.mine(prefix, suffix, difficulty, start_nonce=self.nonce,
+                                            on_progress=on_progress, cancel_event=cancel_event)
         elapsed = time.time() - start
         logger.info(f"✅ Bloco minerado! Tempo: {elapsed:.2f}s, Nonce: {self.nonce}")
 
@@ -72,43 +88,65 @@ class SimpleBlockchain:
     def __init__(self, difficulty: int = 2):
         self.chain = []
         self.difficulty = difficulty
-        self.pending_transactions = []
+        self.pending_transactions = Mempool()
+        self.max_block_bytes = DEFAULT_MAX_BLOCK_BYTES
         self.mining_reward = 50.0
+        self.ledger = BalanceIndex()
+        self.lock = threading.RLock()  # Escritor único da cadeia
+        self.tip_listeners = []
         
         genesis = SimpleBlock(0, [], "0")
         genesis.mine_block(self.difficulty)
         self.chain.append(genesis)
+        self.ledger.rebuild(self.chain)
     
-    def add_transaction(self, transaction: SimpleTransaction):
+    def add_transaction(self, transaction: SimpleTransaction, fee: float = 0.0):
         if transaction.sender != "SYSTEM":
             balance = self.get_balance(transaction.sender)
-            if balance < transaction.amount:
+            if balance < transaction.amount + fee:  # A taxa também sai do saldo do remetente
+                return False
+        return self.pending_transactions.add(transaction, fee)
+    
+    def append_block(self, block: SimpleBlock):
+        with self.lock:
+            self.chain.append(block)
+            self.ledger.sync(self.chain)
+            for listener in list(self.tip_listeners):
+                listener(block)
+    
+    def prepare_block(self, miner_address: str):
+        with self.lock:
+            transactions = self.pending_transactions.block_template(self.max_block_bytes)
+            block = SimpleBlock(len(self.chain), transactions, self.chain[-1].hash)
+            block.miner_address = miner_address
+            return block, list(transactions)
+    
+    def commit_block(self, block: SimpleBlock, included: list) -> bool:
+        """Anexa o bloco se ele ainda estende o topo; a recompensa (subsídio + taxas) entra no mempool."""
+        with self.lock:
+            if block.previous_hash != self.chain[-1].hash:
                 return False
-        self.pending_transactions.append(transaction)
-        return True
+            self.append_block(block)
+            self.pending_transactions.remove_many(included)
+            fees = sum(getattr(tx, 'fee', 0.0) for tx in included)
+            reward = SimpleTransaction("SYSTEM", block.miner_address, self.mining_reward + fees)
+            block.reward = reward.amount
+            self.pending_transactions.add(reward)
+            return True
+    
+    def block_reward(self, block: SimpleBlock) -> float:
+        """Subsídio + taxas que commit_block creditou ao minerador do bloco."""
+        return block.reward
     
     def mine_pending_transactions(self, miner_address: str):
-        block = SimpleBlock(len(self.chain), self.pending_transactions, self.chain[-1].hash)
-        block.mine_block(self.difficulty)
-        self.chain.append(block)
-        
-        reward = SimpleTransaction("SYSTEM", miner_address, self.mining_reward)
-        self.pending_transactions = [reward]
+        while True:
+            block, included = self.prepare_block(miner_address)
+            block.mine_block(self.difficulty)
+            if self.commit_block(block, included):
+                return block
     
     def get_balance(self, address: str) -> float:
-        balance = 0
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender == address:
-                    balance -= tx.amount
-                if tx.recipient == address:
-                    balance += tx.amount
-        for tx in self.pending_transactions:
-            if tx.sender == address:
-                balance -= tx.amount
-            if tx.recipient == address:
-                balance += tx.amount
-        return balance
+        return self.ledger.balance(address, self.chain, self.pending_transactions)
 
 class SimpleBitcoinSystem:
     def __init__(self, difficulty: int = 2):
@@ -118,7 +156,10 @@ class SimpleBitcoinSystem:
         # Inicializar API Bitcoin real se disponível
         if HAS_BITCOIN_API:
             self.bitcoin_api = BitcoinAPI()
-            self.trading_engine = TradingEngine(self.bitcoin_api)
+            # Histórico local de ticks/candles: estratégias e dashboards não voltam ao CoinGecko
+            self.tick_store = TickStore(TICK_STORE_DIR)
+            self.trading_engine = TradingEngine(self.bitcoin_api, tick_store=self.tick_store,
+                                                ledger=TradeLedger(TRADE_LEDGER_DIR))
             self.real_btc_price = None
             
             # Iniciar WebSocket para preços em tempo real
@@ -132,8 +173,11 @@ class SimpleBitcoinSystem:
                     })
             
             self.bitcoin_api.start_websocket(price_callback)
+            self.tick_recorder = TickRecorder(self.tick_store, self.bitcoin_api.price_feed).start()
+            self.trading_engine.attach_price_feed(self.bitcoin_api.price_feed)
         else:
             self.bitcoin_api = None
+            self.tick_store = None
             self.trading_engine = None
             self.real_btc_price = None
     
@@ -197,6 +241,8 @@ def receptor_validation(f):
 # Estado Global
 bitcoin_system = SimpleBitcoinSystem(difficulty=2)
 bitcoin_system.socketio = socketio
+# Worker único + fila limitada: rajadas de /api/mine não multiplicam threads nem disputam a cadeia
+mining_scheduler = MiningScheduler(bitcoin_system.blockchain, max_queue=8, emit=socketio.emit)
 current_user = "Guest"
 voice_command = ""
 
@@ -204,150 +250,27 @@ voice_command = ""
 # O servidor não gerencia mais hardware local para evitar o 'Paradoxo da Câmera Roubada'.
 # O processamento biométrico é feito via POST de espectros (byte arrays) capturados pelo navegador.
 
+CAMERA_STREAM = 'camera'  # Chave da base SVD reaproveitada entre frames (face_recog.video_kernel)
+
+
+def _on_recognized(result):
+    """Resultado do worker de reconhecimento vira o usuário exibido em /api/status."""
+    global current_user
+    user = result.user or "Guest (Unknown)"
+    if user != current_user:
+        video_kernel.reset_basis(CAMERA_STREAM)  # Outro sujeito: a base do anterior não serve de partida
+    current_user = user
+
+
+# Captura, detecção, reconhecimento (pool) e encoder em threads separadas; sobe no primeiro espectador
+frame_pipeline = FramePipeline(detector=get_detector(),
+                               recognize=partial(authenticate_from_face_array, stream=CAMERA_STREAM),
+                               on_recognized=_on_recognized)
+
+
 def generate_frames():
-    """Gera frames da câmera com detecção facial REAL"""
-    global face_detected, camera_active
-    
-    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    
-    frame_count = 0
-    last_camera_check = 0
-    
-    while True:
-        try:
-            with camera_lock:
-                # Verificar câmera periodicamente
-                current_time = time.time()
-                if current_time - last_camera_check > 5:
-                    cam = get_camera()
-                    last_camera_check = current_time
-                else:
-                    cam = camera
-                
-                if cam is None or not cam.isOpened():
-                    # Gerar placeholder profissional
-                    frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                    
-                    # Fundo gradiente
-                    for i in range(480):
-                        color = int(30 + (i / 480) * 30)
-                        frame[i, :] = [color, color, color + 20]
-                    
-                    # Texto informativo
-                    cv2.putText(frame, '📷 CAMERA OFFLINE', (180, 200),
-                               cv2.FONT_HERSHEY_DUPLEX, 1, (255, 100, 100), 2)
-                    cv2.putText(frame, 'Conectando...', (230, 280),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 1)
-                    
-                    # Ícone de câmera (retângulo estilizado)
-                    cv2.rectangle(frame, (280, 320), (360, 380), (100, 100, 255), 2)
-                    cv2.circle(frame, (320, 350), 15, (100, 100, 255), 2)
-                    
-                    face_detected = False
-                    camera_active = False
-                    
-                    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                    time.sleep(0.2)
-                    continue
-                
-                # Câmera ativa - ler frame
-                success, frame = cam.read()
-                if not success:
-                    continue
-                
-                frame_count += 1
-                
-                # Detectar face (otimizado - não em todo frame)
-                if frame_count % 3 == 0:
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-                    
-                    face_detected = len(faces) > 0
-                    
-                    # Real-time identification (every ~1s when face is detected)
-                    if face_detected and frame_count % 30 == 0:
-                        try:
-                            # Encode current frame to bytes for recognition
-                            _, buf = cv2.imencode('.png', frame)
-                            from face_recog import authenticate_from_image_bytes
-                            recognized_user, _ = authenticate_from_image_bytes(buf.tobytes())
-                            if recognized_user:
-                                current_user = recognized_user
-                            else:
-                                if 'authenticated' not in session: # Only reset guest name if not logged in
-                                    current_user = "Guest (Unknown)"
-                        except Exception as e:
-                            logger.error(f"Erro na identificação em tempo real: {e}")
-
-                    # Desenhar retângulos e informações
-                    for (x, y, w, h) in faces:
-                        # Retângulo principal
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                        
-                        # Retângulos nos cantos (estilo futurista)
-                        corner_len = 20
-                        thickness = 3
-                        color = (0, 255, 255)
-                        
-                        # Canto superior esquerdo
-                        cv2.line(frame, (x, y), (x+corner_len, y), color, thickness)
-                        cv2.line(frame, (x, y), (x, y+corner_len), color, thickness)
-                        
-                        # Canto superior direito
-                        cv2.line(frame, (x+w, y), (x+w-corner_len, y), color, thickness)
-                        cv2.line(frame, (x+w, y), (x+w, y+corner_len), color, thickness)
-                        
-                        # Canto inferior esquerdo
-                        cv2.line(frame, (x, y+h), (x+corner_len, y+h), color, thickness)
-                        cv2.line(frame, (x, y+h), (x, y+h-corner_len), color, thickness)
-                        
-                        # Canto inferior direito
-                        cv2.line(frame, (x+w, y+h), (x+w-corner_len, y+h), color, thickness)
-                        cv2.line(frame, (x+w, y+h), (x+w, y+h-corner_len), color, thickness)
-                        
-                        # Nome do usuário (com animação de brilho se reconhecido)
-                        name_tag = f'👤 {current_user}'
-                        cv2.putText(frame, name_tag, (x, y-10),
-                                   cv2.FONT_HERSHEY_DUPLEX, 0.7, (0, 255, 255), 2)
-                
-                # Overlay de informações
-                height, width = frame.shape[:2]
-                
-                # Barra superior com info
-                overlay = frame.copy()
-                cv2.rectangle(overlay, (0, 0), (width, 70), (0, 0, 0), -1)
-                cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-                
-                # Textos informativos
-                cv2.putText(frame, f'🌌 GALAXY BITCOIN SYSTEM', (10, 25),
-                           cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-                cv2.putText(frame, f'User: {current_user}', (10, 50),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-                
-                # Status face
-                face_status = f"✅ {len(faces)} face(s)" if face_detected else "❌ No face"
-                cv2.putText(frame, face_status, (width - 150, 25),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0) if face_detected else (100, 100, 255), 1)
-                
-                # FPS
-                cv2.putText(frame, f'FPS: 30', (width - 150, 50),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-                
-                # Codificar e enviar
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
-                frame_bytes = buffer.tobytes()
-                
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        except Exception as e:
-            logger.error(f"Erro no generate_frames: {e}")
-            time.sleep(0.1)
-        
-        time.sleep(0.033)  # ~30 FPS
+    """Stream MJPEG com detecção facial REAL; o reconhecimento nunca segura os frames."""
+    yield from frame_pipeline.mjpeg()
 
 @app.route('/')
 @receptor_validation
@@ -534,6 +457,23 @@ def get_bitcoin_price():
     
     return jsonify({'error': 'API não disponível', 'price_usd': 0})
 
+@app.route('/api/bitcoin/candles')
+def get_bitcoin_candles():
+    """Candles OHLCV do histórico local (?interval=1m|5m|1h|1d&count=100)"""
+    if not bitcoin_system.tick_store:
+        return jsonify({'error': 'Histórico local não disponível'}), 503
+    interval = request.args.get('interval', '1h')
+    try:
+        count = int(request.args.get('count', 100))
+    except ValueError:
+        return jsonify({'error': 'count deve ser um inteiro'}), 400
+    count = max(1, min(count, 5000))
+    try:
+        candles = bitcoin_system.tick_store.last_candles(interval, count)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'interval': interval, **candles.to_dict()})
+
 @app.route('/api/bitcoin/stats')
 def get_bitcoin_stats():
     """Obtém estatísticas da blockchain Bitcoin real"""
@@ -551,10 +491,16 @@ def create_transaction():
     sender = data.get('sender', 'User')
     recipient = data.get('recipient', 'Miner')
     amount = float(data.get('amount', 1.0))
+    try:
+        fee = float(data.get('fee', 0.0))
+    except (TypeError, ValueError):
+        fee = math.nan
+    if not math.isfinite(fee) or fee < 0:
+        return jsonify({'success': False, 'message': 'fee deve ser um número finito >= 0'}), 400
     
     tx = bitcoin_system.create_validated_transaction(sender, recipient, amount)
     if tx:
-        success = bitcoin_system.blockchain.add_transaction(tx)
+        success = bitcoin_system.blockchain.add_transaction(tx, fee)
         if success:
             # Emitir evento via WebSocket
             socketio.emit('transaction_created', {
@@ -578,28 +524,49 @@ def create_transaction():
 
 @app.route('/api/mine', methods=['POST'])
 def mine_block():
-    """Minera um novo bloco"""
-    data = request.json
+    """Enfileira a mineração de um novo bloco"""
+    data = request.json or {}
     miner = data.get('miner', 'Miner')
     
-    def mine_async():
-        bitcoin_system.mine_block_with_ai(miner)
-        
-        # Emitir evento de bloco minerado
-        socketio.emit('block_mined', {
-            'block_number': len(bitcoin_system.blockchain.chain) - 1,
-            'miner': miner,
-            'reward': bitcoin_system.blockchain.mining_reward,
-            'timestamp': time.time()
-        })
+    wallet = bitcoin_system.system_wallets.get(miner)
+    if wallet is None:
+        return jsonify({
+            'success': False,
+            'message': f'Carteira {miner} não encontrada'
+        }), 404
     
-    thread = threading.Thread(target=mine_async, daemon=True)
-    thread.start()
+    try:
+        job = mining_scheduler.submit(wallet.address, label=miner)
+    except QueueFull as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429
     
     return jsonify({
         'success': True,
-        'message': f'Mineração iniciada por {miner}'
-    })
+        'message': f'Mineração enfileirada para {miner}',
+        'job_id': job.job_id,
+        'status': job.status,
+        'queue_position': mining_scheduler.queue_position(job)
+    }), 202
+
+@app.route('/api/mine/<job_id>', methods=['GET'])
+def mine_status(job_id):
+    """Status e progresso de um job de mineração"""
+    job = mining_scheduler.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job não encontrado'}), 404
+    status = job.to_dict()
+    status['queue_position'] = mining_scheduler.queue_position(job)
+    return jsonify({'success': True, 'job': status})
+
+@app.route('/api/mine/<job_id>', methods=['DELETE'])
+def mine_cancel(job_id):
+    """Cancela um job de mineração na fila ou em andamento"""
+    if not mining_scheduler.cancel(job_id):
+        return jsonify({'success': False, 'message': 'Job inexistente ou já finalizado'}), 404
+    return jsonify({'success': True, 'job_id': job_id})
 
 @app.route('/api/wallet/create', methods=['POST'])
 def create_wallet():
@@ -613,6 +580,7 @@ def create_wallet():
             'message': 'Carteira já existe'
         }), 400
     
+    # SimpleWallet não tem par de chaves (endereço = hash do nome): não há ECDSA para gerar em lote
     wallet = bitcoin_system.create_user_wallet(name)
     
     return jsonify({
@@ -629,7 +597,9 @@ def camera_status():
     """Status do Sistema de Resonância"""
     return jsonify({
         'active': True,
-        'current_user': session.get('user', 'Guest')
+        'current_user': session.get('user', 'Guest'),
+        'detector': get_detector().stats(),  # Acertos por passe e ms médios por estágio
+        'pipeline': frame_pipeline.stats()    # FPS, latência e descartes por estágio do vídeo
     })
 
 
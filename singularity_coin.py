@@ -4,6 +4,7 @@ from typing import Optional, List
 import numpy as np
 from bitcoin_blockchain import BitcoinBlockchain, Block, Transaction
 from biometric_blockchain_key import BiometricCryptBridge
+from config import LEDGER_CHECKPOINT_BLOCKS
 from topological_kernel import TopologicalKernel
 from lattice_engine import LatticeEngine
 
@@ -14,19 +15,37 @@ class SingularityBlock(Block):
         self.lattice_witness = None # Prova Pós-Quântica (LWE)
         self.nexus_resonance = 0.0
 
-    def calculate_hash(self) -> str:
+    def header_parts(self):
         # O Hash agora inclui o manifold_proof e o lattice_witness no colapso
         proof_str = str(self.manifold_proof) if self.manifold_proof is not None else ""
         lattice_str = str(self.lattice_witness) if self.lattice_witness is not None else ""
-        block_data = f"{self.index}{self.previous_hash}{self.timestamp}{self.merkle_root}{self.nonce}{proof_str}{lattice_str}"
-        return hashlib.sha256(block_data.encode()).hexdigest()
+        prefix, _ = super().header_parts()
+        return prefix, f"{proof_str}{lattice_str}"
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['manifold_proof'] = self.manifold_proof
+        data['lattice_witness'] = self.lattice_witness
+        data['nexus_resonance'] = float(self.nexus_resonance)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        block = super().from_dict(data)
+        block.manifold_proof = data.get('manifold_proof')
+        block.lattice_witness = data.get('lattice_witness')
+        block.nexus_resonance = data.get('nexus_resonance', 0.0)
+        return block
 
 class SingularityCoin(BitcoinBlockchain):
-    def __init__(self, difficulty=4):
+    block_class = SingularityBlock
+    reward_sender = "SINGULARITY_RESERVE"
+
+    def __init__(self, difficulty=4, data_dir=None, checkpoint_every=LEDGER_CHECKPOINT_BLOCKS):
         self.bridge = BiometricCryptBridge()
         self.kernel = TopologicalKernel()
         self.lattice = LatticeEngine(n=50) # Post-Quantum Layer
-        super().__init__(difficulty)
+        super().__init__(difficulty, data_dir, checkpoint_every)
 
     def create_genesis_block(self) -> None:
         print("[*] INICIANDO COLAPSO DO BLOCO GENESIS DA SINGULARIDADE...")
@@ -34,33 +53,29 @@ class SingularityCoin(BitcoinBlockchain):
         genesis_block = SingularityBlock(0, [genesis_tx], "0" * 64)
         genesis_block.manifold_proof = "THE_VOID_GEOMETRY"
         genesis_block.mine_block(self.difficulty)
-        self.chain.append(genesis_block)
+        self.append_block(genesis_block)
 
     def mine_biometric_block(self, miner_username: str, top_sig: np.ndarray, resonance: float) -> Optional[SingularityBlock]:
         if resonance < 0.8:
             print("[!] Falha de Consenso: Ressonancia Biometrica insuficiente.")
             return None
-        reward = self.get_mining_reward()
         wallet_info = self.bridge.open_galaxy_wallet(top_sig)
         miner_addr = wallet_info['address']
-        reward_tx = Transaction("SINGULARITY_RESERVE", miner_addr, reward)
-        self.pending_transactions.append(reward_tx)
-        # 2. Criar Bloco com Prova de Manifold e Lattice Witness
-        block = SingularityBlock(
-            index=len(self.chain),
-            transactions=self.pending_transactions,
-            previous_hash=self.get_latest_block().hash
-        )
-        block.manifold_proof = hashlib.sha256(top_sig.tobytes()).hexdigest()
-        block.nexus_resonance = resonance
-        
+        manifold_proof = hashlib.sha256(top_sig.tobytes()).hexdigest()
         # Gerar testemunho do reticulado (Post-Quantum)
-        block.lattice_witness = self.lattice.dynamic_hash(top_sig.tobytes())
+        lattice_witness = self.lattice.dynamic_hash(top_sig.tobytes())
+        while True:
+            # 2. Template com recompensa = subsídio + taxas, mais Prova de Manifold e Lattice Witness
+            block, included = self.prepare_block(miner_addr)
+            block.manifold_proof = manifold_proof
+            block.nexus_resonance = resonance
+            block.lattice_witness = lattice_witness
 
-        # 3. Colapsar o Nonce
-        block.mine_block(self.difficulty)
-        self.chain.append(block)
-        self.pending_transactions = []
+            # 3. Colapsar o Nonce
+            block.mine_block(self.difficulty)
+            if self.commit_block(block, included):
+                break
+            print("[!] Outro bloco chegou primeiro - refazendo o template PoHM")
         print(f"[*] Bloco {block.index} [PoHM] minerado por {miner_username}!")
         return block
 
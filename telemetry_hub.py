@@ -0,0 +1,353 @@
+import asyncio
+import copy
+import json
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+# --- TELEMETRY HUB ---
+# Pub/sub do estado do HUD para os clientes WebSocket do telemetry_server:
+#   - tópicos: biometric, vocal_sync, financial e session (user, wallet, terminal_status)
+#   - o cliente assina só o que mostra e recebe deltas no estilo JSON Patch (RFC 6902)
+#     apenas quando algum valor muda; publicações são acumuladas e a cada flush_interval sai
+#     um delta por tópico alterado, serializado uma vez e compartilhado por todos os assinantes
+#   - snapshot completo ao assinar e a cada snapshot_interval (ressincroniza quem perdeu algo)
+#   - fila limitada por cliente: estourou -> 'conflate' troca o atraso por um snapshot novo,
+#     'drop' desconecta o cliente lento
+# Mensagens (texto JSON):
+#   {"type": "snapshot", "seq": 12, "state": {"biometric": {...}, ...}}
+#   {"type": "patch", "seq": 13, "topic": "biometric", "ops": [{"op": "replace", "path": "/biometric/resonance", "value": 0.8}]}
+
+TOPICS = ('biometric', 'vocal_sync', 'financial', 'session')
+SESSION_KEYS = ('user', 'wallet', 'terminal_status')
+FLUSH_INTERVAL = 0.1     # s: deltas saem a no máximo 10 Hz (ritmo do dashboard)
+SNAPSHOT_INTERVAL = 5.0  # s
+MAX_PENDING = 64         # mensagens na fila de um cliente
+SLOW_POLICIES = ('conflate', 'drop')
+
+
+def _escape(key: str) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def diff(old: Any, new: Any, path: str = '') -> List[Dict[str, Any]]:
+    """Operações add/remove/replace (JSON Patch) que levam old a new; dicts são comparados por chave."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f'{path}/{_escape(key)}'})
+        for key, value in new.items():
+            child = f'{path}/{_escape(key)}'
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops.extend(diff(old[key], value, child))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def apply_patch(state: Dict[str, Any], ops: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aplica os deltas em state (no lugar) e o devolve; lado do cliente e testes."""
+    for op in ops:
+        keys = [k.replace('~1', '/').replace('~0', '~') for k in op['path'].split('/')[1:]]
+        target = state
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        if op['op'] == 'remove':
+            target.pop(keys[-1], None)
+        else:
+            target[keys[-1]] = op['value']
+    return state
+
+
+def split_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """bridge.state -> {tópico: valor}; chaves soltas vão para 'session'."""
+    topics = {topic: state[topic] for topic in TOPICS[:-1] if topic in state}
+    topics['session'] = {key: state.get(key) for key in SESSION_KEYS}
+    return topics
+
+
+class Subscription:
+    """Fila de um cliente: mensagens já serializadas + pedido pendente de snapshot."""
+
+    def __init__(self, hub: 'TelemetryHub', topics: Iterable[str]):
+        self.hub = hub
+        self.topics = frozenset(topics)
+        self.pending: deque = deque()
+        self.needs_snapshot = True  # Primeiro envio é sempre o estado completo
+        self.last_snapshot = 0.0
+        self.closed = False
+        self.conflated = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self._event: Optional[asyncio.Event] = None
+
+    def _wake(self) -> None:
+        if self._event is not None:
+            self._event.set()
+
+    def _push(self, message: str) -> None:
+        if self.closed:
+            return
+        if len(self.pending) >= self.hub.max_pending:
+            if self.hub.slow_policy == 'drop':
+                self.hub._drop(self)
+                return
+            # Conflate: o atraso inteiro vira um único snapshot do estado atual
+            self.pending.clear()
+            self.needs_snapshot = True
+            self.conflated += 1
+            self.hub.conflated += 1
+        else:
+            self.pending.append(message)
+        self._wake()
+
+    def drain(self, now: Optional[float] = None) -> List[str]:
+        """Mensagens prontas para enviar (snapshot se pedido ou vencido, senão os deltas)."""
+        now = time.monotonic() if now is None else now
+        if self.snapshot_due(now):
+            self.pending.clear()  # O snapshot já contém tudo o que estava na fila
+            self.needs_snapshot = False
+            self.last_snapshot = now
+            messages = [self.hub.snapshot_message(self.topics)]
+        else:
+            messages = list(self.pending)
+            self.pending.clear()
+        self.sent_messages += len(messages)
+        self.sent_bytes += sum(len(m) for m in messages)
+        return messages
+
+    def snapshot_due(self, now: float) -> bool:
+        return self.needs_snapshot or now - self.last_snapshot >= self.hub.snapshot_interval
+
+    async def next_batch(self) -> List[str]:
+        """Espera deltas (ou o snapshot periódico, acordado por TelemetryHub.run) e devolve o lote.
+
+        Lista vazia = assinatura encerrada (unsubscribe ou cliente lento derrubado).
+        """
+        if self._event is None:
+            self._event = asyncio.Event()
+        while not self.closed:
+            if self.pending or self.snapshot_due(time.monotonic()):
+                return self.drain()
+            self._event.clear()
+            await self._event.wait()  # Sem wait_for: nenhuma Task nova por espera
+        return []
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class TelemetryHub:
+    """Estado por tópico, deltas serializados uma vez e entregues às assinaturas de cada tópico."""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, snapshot_interval: float = SNAPSHOT_INTERVAL,
+                 max_pending: int = MAX_PENDING, slow_policy: str = 'conflate'):
+        if slow_policy not in SLOW_POLICIES:
+            raise ValueError(f"slow_policy deve ser um de {SLOW_POLICIES}")
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.max_pending = max_pending
+        self.slow_policy = slow_policy
+        self.state: Dict[str, Any] = {}  # Último valor publicado por tópico
+        self.sent: Dict[str, Any] = {}   # Valor já entregue em deltas (base do próximo diff)
+        self.dirty: set = set()
+        self.seq = 0
+        self.subscribers: Dict[str, set] = {topic: set() for topic in TOPICS}
+        self.published = 0   # Deltas enviados
+        self.unchanged = 0   # Publicações sem mudança (nada enviado)
+        self.dropped = 0     # Clientes desconectados por lentidão
+        self.conflated = 0   # Filas trocadas por um snapshot
+
+    # --- Assinaturas ---
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        topics = TOPICS if topics is None else tuple(topics)
+        unknown = set(topics) - set(TOPICS)
+        if unknown:
+            raise ValueError(f"tópicos desconhecidos: {sorted(unknown)}")
+        sub = Subscription(self, topics)
+        for topic in sub.topics:
+            self.subscribers[topic].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        sub.closed = True
+        for topic in sub.topics:
+            self.subscribers[topic].discard(sub)
+        sub._wake()
+
+    def _drop(self, sub: Subscription) -> None:
+        self.dropped += 1
+        self.unsubscribe(sub)
+
+    @property
+    def clients(self) -> int:
+        return len(set().union(*self.subscribers.values()))
+
+    # --- Publicação ---
+
+    def publish(self, topic: str, value: Any) -> bool:
+        """Registra o valor atual de um tópico; o delta sai no próximo flush. True se mudou."""
+        if topic not in self.subscribers:
+            raise ValueError(f"tópico desconhecido: {topic}")
+        if topic in self.state and not diff(self.state[topic], value):
+            self.unchanged += 1
+            return False
+        self.state[topic] = copy.deepcopy(value)
+        self.dirty.add(topic)
+        if not self.flush_interval:
+            self.flush()
+        return True
+
+    def publish_state(self, state: Dict[str, Any]) -> int:
+        """Publica um bridge.state inteiro; devolve quantos tópicos mudaram."""
+        return sum(self.publish(topic, value) for topic, value in split_state(state).items())
+
+    def flush(self) -> int:
+        """Um delta por tópico alterado desde o último flush, serializado uma vez para todos."""
+        messages = 0
+        for topic in sorted(self.dirty):
+            value = self.state[topic]
+            whole = [{'op': 'add' if topic not in self.sent else 'replace', 'path': f'/{topic}', 'value': value}]
+            ops = diff(self.sent[topic], value, f'/{topic}') if topic in self.sent else whole
+            self.sent[topic] = copy.deepcopy(value)
+            if not ops:
+                continue  # Mudou e voltou dentro da janela: nada a enviar
+            self.seq += 1
+            self.published += 1
+            messages += 1
+            message = json.dumps({'type': 'patch', 'seq': self.seq, 'topic': topic, 'ops': ops})
+            if len(ops) > 1:
+                # Tópico que muda quase inteiro: um replace do tópico sai menor que vários ops
+                compact = json.dumps({'type': 'patch', 'seq': self.seq, 'topic': topic, 'ops': whole})
+                message = min(message, compact, key=len)
+            for sub in list(self.subscribers[topic]):
+                sub._push(message)
+        self.dirty.clear()
+        return messages
+
+    async def run(self) -> None:
+        """Laço de fundo do servidor: flush no ritmo do dashboard e snapshots periódicos vencidos."""
+        while True:
+            self.flush()
+            now = time.monotonic()
+            for sub in set().union(*self.subscribers.values()):
+                if sub.snapshot_due(now):
+                    sub._wake()
+            await asyncio.sleep(self.flush_interval or FLUSH_INTERVAL)
+
+    def snapshot_message(self, topics: Iterable[str] = TOPICS) -> str:
+        # Estado já entregue (coerente com seq); o que está pendente chega no próximo delta
+        return json.dumps({'type': 'snapshot', 'seq': self.seq,
+                           'state': {topic: self.sent[topic] for topic in topics if topic in self.sent}})
+
+    def stats(self) -> Dict[str, Any]:
+        subs = set().union(*self.subscribers.values())
+        return {
+            'seq': self.seq, 'clients': len(subs), 'published': self.published, 'unchanged': self.unchanged,
+            'dropped': self.dropped, 'conflated': self.conflated,
+            'per_topic': {topic: len(s) for topic, s in self.subscribers.items()},
+        }
+
+
+if __name__ == "__main__":
+    import random
+
+    print("--- [TELEMETRY HUB LOAD TEST] ---")
+    CLIENTS, SLOW_EVERY, DURATION, UPDATE_HZ, LEGACY_HZ = 1000, 20, 5.0, 15, 10
+
+    def hud_state(rng, t):
+        """Estado como o TelemetryBridge monta: biometria muda sempre, o resto raramente."""
+        focus = round(0.5 + 0.5 * rng.random(), 4)
+        return {
+            "biometric": {"resonance": focus, "entropy": round(rng.random(), 4), "focus_score": focus,
+                          "liveness": f"{rng.random() * 100:.1f}%"},
+            "vocal_sync": {"kinetic_res": round(t // 2 * 0.1, 2), "vocal_salt": f"0x{int(t) // 3:08X}",
+                           "status": "CONVERGED" if int(t) % 4 == 0 else "SYNCING"},
+            "financial": {"balance_sig": 50.0, "blocks": 1 + int(t) // 2, "last_hash": f"0x{int(t) // 3:08X}"},
+            "terminal_status": "BRIDGE_LIVE", "user": "alice", "wallet": "UNLOCKED",
+        }
+
+    async def producer(publish, rng, deadline):
+        t0 = time.monotonic()
+        while time.monotonic() < deadline:
+            publish(hud_state(rng, time.monotonic() - t0))
+            await asyncio.sleep(1.0 / UPDATE_HZ)
+
+    async def run_legacy():
+        """websocket_endpoint antigo: bridge.state inteiro em JSON, por cliente, a 10 Hz."""
+        rng = random.Random(0)
+        bridge = {'state': hud_state(rng, 0)}
+        sent = [0]
+        deadline = time.monotonic() + DURATION
+
+        async def client(slow):
+            while time.monotonic() < deadline:
+                message = json.dumps(bridge['state'])
+                json.loads(message)  # Decodificação no cliente, como no hub
+                sent[0] += len(message)
+                await asyncio.sleep(1.0 / LEGACY_HZ + (0.2 if slow else 0))
+
+        cpu = time.process_time()
+        await asyncio.gather(producer(lambda s: bridge.__setitem__('state', s), rng, deadline),
+                             *(client(i % SLOW_EVERY == 0) for i in range(CLIENTS)))
+        return sent[0], time.process_time() - cpu
+
+    async def run_hub():
+        rng = random.Random(0)
+        hub = TelemetryHub(max_pending=16)
+        deadline = time.monotonic() + DURATION
+        subs: List[Subscription] = []
+        views: List[Dict[str, Any]] = []
+
+        async def client(i):
+            # Um terço dos painéis mostra só biometria; clientes lentos demoram 200 ms por envio
+            topics = ('biometric',) if i % 3 == 0 else ('vocal_sync', 'financial', 'session') if i % 3 == 1 else None
+            sub = hub.subscribe(topics)
+            subs.append(sub)
+            view: Dict[str, Any] = {}
+            views.append(view)
+            while True:
+                batch = await sub.next_batch()
+                if not batch:
+                    return
+                for message in batch:
+                    data = json.loads(message)
+                    if data['type'] == 'snapshot':
+                        view.clear()
+                        view.update(data['state'])
+                    else:
+                        apply_patch(view, data['ops'])
+                if i % SLOW_EVERY == 0:
+                    await asyncio.sleep(0.2)
+
+        async def stop_clients():
+            await asyncio.sleep(DURATION + 3 * FLUSH_INTERVAL)  # Últimos deltas entregues
+            fast_ok = all(views[i] == {t: hub.sent[t] for t in subs[i].topics}
+                          for i in range(CLIENTS) if i % SLOW_EVERY)
+            stats = hub.stats()
+            for sub in subs:
+                sub.close()
+            return fast_ok, stats
+
+        cpu = time.process_time()
+        flusher = asyncio.ensure_future(hub.run())
+        results = await asyncio.gather(stop_clients(), producer(hub.publish_state, rng, deadline),
+                                       *(client(i) for i in range(CLIENTS)))
+        elapsed = time.process_time() - cpu
+        flusher.cancel()
+        fast_ok, stats = results[0]
+        return sum(sub.sent_bytes for sub in subs), elapsed, stats, fast_ok
+
+    legacy_bytes, legacy_cpu = asyncio.run(run_legacy())
+    hub_bytes, hub_cpu, stats, fast_ok = asyncio.run(run_hub())
+    print(f"[*] {CLIENTS} clientes ({CLIENTS // SLOW_EVERY} lentos), HUD a {UPDATE_HZ} Hz por {DURATION:.0f}s")
+    print(f"[*] Antigo (estado inteiro a {LEGACY_HZ} Hz): {legacy_bytes / 1e6:.2f} MB | CPU {legacy_cpu:.2f}s")
+    print(f"[*] Hub (deltas por tópico):      {hub_bytes / 1e6:.2f} MB | CPU {hub_cpu:.2f}s "
+          f"(inclui json.loads + apply_patch nos clientes)")
+    print(f"[*] Banda -{(1 - hub_bytes / legacy_bytes) * 100:.0f}% | visões dos clientes rápidos em dia: {fast_ok}")
+    print(f"[*] {stats}")
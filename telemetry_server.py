@@ -9,6 +9,9 @@ import time
 import sys
 import cv2
 
+from frame_bus import FrameBus
+from telemetry_hub import TelemetryHub
+
 app = FastAPI()
 
 app.add_middleware(
@@ -31,7 +34,6 @@ class TelemetryBridge:
     def __init__(self):
         self.start_time = time.time()
         self.active_sessions = 0
-        self.current_frame = None
         self.state = {
             "biometric": {"resonance": 0.0, "entropy": 0.0, "focus_score": 0.0, "liveness": "SCANNING"},
             "vocal_sync": {"kinetic_res": 0.0, "vocal_salt": "0x00000000", "status": "INITIALIZING"},
@@ -56,45 +58,106 @@ class TelemetryBridge:
         self.state["wallet"] = hud_data.wallet
 
 bridge = TelemetryBridge()
+# Frames em memória compartilhada: produtores locais publicam direto (FrameBus.attach), sem HTTP.
+# O bus (app.state.frame_bus) nasce no startup e é removido no shutdown, não no import.
+FRAME_POLL_MIN = 0.005  # s: espera logo depois de um frame
+FRAME_POLL_MAX = 0.05   # s: teto do backoff com o bus parado (produtor local não tem como avisar)
+# WebSocket: deltas por tópico a no máximo 10 Hz, só quando algo muda (ver telemetry_hub)
+hub = TelemetryHub()
+hub.publish_state(bridge.state)
 
 @app.post("/update_state")
 async def update_state(data: HUDState):
     bridge.update(data)
+    hub.publish_state(bridge.state)
     return {"status": "ok"}
 
 @app.post("/update_frame")
 async def update_frame(request: Request):
-    # Receber frame JPEG via bytes
+    # Produtores remotos: frame JPEG via bytes, publicado no mesmo bus dos locais
+    frame_bus = app.state.frame_bus
+    if frame_bus.producer_active():
+        # Um escritor por vez: dois produtores no mesmo slot entregariam frames misturados
+        return Response(content="produtor local anexado ao frame bus", status_code=409)
     body = await request.body()
-    bridge.current_frame = body
-    return {"status": "ok"}
+    try:
+        seq = frame_bus.publish(body)
+    except ValueError as e:
+        return Response(content=str(e), status_code=413)
+    app.state.frame_published.set()  # Acorda os espectadores; clear logo em seguida não os perde
+    app.state.frame_published.clear()
+    return {"status": "ok", "seq": seq}
 
-async def frame_generator():
-    while True:
-        if bridge.current_frame:
+async def frame_generator(cursor, published):
+    # Cada espectador tem seu cursor: só envia quando o seq avança, nada é reenviado.
+    # Frames por HTTP acordam na hora (published); os do produtor local são vistos por polling com backoff.
+    interval = FRAME_POLL_MIN
+    try:
+        while True:
+            frame = cursor.poll()
+            if frame is None:
+                try:
+                    await asyncio.wait_for(published.wait(), interval)
+                except asyncio.TimeoutError:
+                    interval = min(interval * 2, FRAME_POLL_MAX)
+                continue
+            interval = FRAME_POLL_MIN
             yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + bridge.current_frame + b'\r\n')
-        await asyncio.sleep(0.04) # ~25 FPS stream
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame.data + b'\r\n')
+    finally:
+        cursor.close()
 
 @app.get("/video_feed")
 async def video_feed():
-    return StreamingResponse(frame_generator(), media_type="multipart/x-mixed-replace; boundary=frame")
+    cursor = app.state.frame_bus.cursor()
+    return StreamingResponse(frame_generator(cursor, app.state.frame_published),
+                             media_type="multipart/x-mixed-replace; boundary=frame")
+
+@app.get("/frame_bus")
+async def frame_bus_stats():
+    return app.state.frame_bus.stats()
+
+@app.on_event("startup")
+async def start_hub():
+    app.state.frame_bus = FrameBus()
+    app.state.frame_published = asyncio.Event()
+    app.state.hub_task = asyncio.create_task(hub.run())
+
+@app.on_event("shutdown")
+async def stop_background():
+    app.state.hub_task.cancel()
+    app.state.frame_bus.close()
 
 @app.get("/telemetry")
 async def get_telemetry():
     return bridge.state
 
+@app.get("/telemetry/hub")
+async def get_hub_stats():
+    return hub.stats()
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    # /ws?topics=biometric,financial (padrão: todos); snapshot ao conectar, depois só deltas
+    topics = websocket.query_params.get("topics")
+    try:
+        sub = hub.subscribe(topics.split(",") if topics else None)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
     bridge.active_sessions += 1
     try:
         while True:
-            await websocket.send_json(bridge.state)
-            await asyncio.sleep(0.1) # 10Hz é suficiente para o dashboard
+            batch = await sub.next_batch()
+            if not batch:
+                break  # Cliente lento derrubado pelo hub
+            for message in batch:
+                await websocket.send_text(message)
     except Exception:
         pass
     finally:
+        sub.close()
         bridge.active_sessions -= 1
 
 if __name__ == "__main__":
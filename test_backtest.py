@@ -0,0 +1,100 @@
+"""Backtest vetorizado: equity com taxas, log de trades, sweep paralelo."""
+import numpy as np
+import pytest
+
+from backtest import DEFAULT_FEE, param_grid, run_backtest, simulate, sweep
+from bitcoin_api import TradingEngine
+from tick_store import TickStore
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(11)
+    return 30000.0 * np.exp(np.cumsum(rng.normal(0, 0.01, 3000)))
+
+
+def loop_equity(prices, position, fee, initial):
+    cash, btc, held, equity = initial, 0.0, 0.0, []
+    for i, target in enumerate(position):
+        value = cash + btc * prices[i]
+        delta = target - held
+        if delta:
+            traded = abs(delta) * value
+            if delta > 0:
+                cash -= traded
+                btc += traded * (1 - fee) / prices[i]
+            else:
+                btc -= traded / prices[i]
+                cash += traded * (1 - fee)
+            held = target
+        equity.append(cash + btc * prices[i])
+    return np.array(equity)
+
+
+def test_simulate_matches_trade_by_trade_loop(prices):
+    rng = np.random.default_rng(5)
+    position = (rng.random(len(prices)) > 0.7).astype(float)
+    np.testing.assert_allclose(simulate(prices, position, 0.001, 10000.0),
+                               loop_equity(prices, position, 0.001, 10000.0), rtol=1e-9)
+
+
+def test_buy_and_hold_pays_one_fee(prices):
+    result = run_backtest(prices, lambda p: np.ones(len(p)), timestamps=np.arange(len(prices)))
+    assert result.trades == 1
+    assert result.final_equity == pytest.approx(10000.0 * (1 - DEFAULT_FEE) * prices[-1] / prices[0])
+    (trade,) = result.trade_log()
+    assert trade['type'] == 'BUY' and trade['timestamp'] == 0.0
+    assert trade['amount_btc'] == pytest.approx(10000.0 * (1 - DEFAULT_FEE) / prices[0])
+    peak = np.maximum.accumulate(prices)
+    assert result.max_drawdown == pytest.approx(np.max(1 - prices / peak))
+
+
+def test_trade_log_alternates_and_strategies_validate(prices):
+    result = run_backtest(prices, 'mean_reversion', {'window': 30, 'entry': 1.5})
+    log = result.trade_log()
+    assert log and [t['type'] for t in log[:2]] == ['BUY', 'SELL']
+    assert all(a['type'] != b['type'] for a, b in zip(log, log[1:]))
+    assert len(log) == result.trades
+    with pytest.raises(ValueError):
+        run_backtest(prices, 'martingale')
+
+
+def buy_above_first(prices, level=1.0):
+    return (prices > prices[0] * level).astype(float)
+
+
+def test_sweep_cache_is_per_call_and_results_are_explicit(prices):
+    grid = param_grid(window=[10, 20, 10], entry=[1.0, 2.0])  # Janela repetida: média vem do cache do lote
+    ranked = sweep(prices, 'mean_reversion', grid, workers=1)
+    for summary in ranked:
+        assert run_backtest(prices, 'mean_reversion', summary['params']).pnl == pytest.approx(summary['pnl'])
+    other = prices[::-1].copy()  # Outra série: nada herdado da chamada anterior
+    assert sweep(other, 'mean_reversion', [{'window': 10}], workers=1)[0]['pnl'] == pytest.approx(
+        run_backtest(other, 'mean_reversion', {'window': 10}).pnl)
+    custom = sweep(prices, buy_above_first, param_grid(level=[0.9, 1.1]), workers=1)  # Sem parâmetro cache
+    assert len(custom) == 2
+    result = run_backtest(prices, 'sma_crossover')
+    assert result.exposure == result.summary['exposure']
+    with pytest.raises(AttributeError):
+        result.pnl_percent
+
+
+def test_parallel_sweep_matches_serial(prices):
+    grid = param_grid(fast=range(2, 20, 2), slow=range(20, 100, 10))
+    serial = sweep(prices, 'sma_crossover', grid, workers=1)
+    parallel = sweep(prices, 'sma_crossover', grid, workers=2)
+    assert len(serial) == len(grid) == len(parallel)
+    assert [s['params'] for s in serial] == [p['params'] for p in parallel]
+    assert [s['pnl'] for s in serial] == sorted((s['pnl'] for s in serial), reverse=True)
+    best = run_backtest(prices, 'sma_crossover', serial[0]['params'])
+    assert best.pnl == pytest.approx(serial[0]['pnl'])
+
+
+def test_trading_engine_backtests_local_history(tmp_path, prices):
+    store = TickStore(str(tmp_path))
+    store.append_ticks(1_700_000_000_000 + np.arange(len(prices)) * 3_600_000, prices)
+    engine = TradingEngine(api=None, tick_store=store)
+    result = engine.backtest('momentum', {'lookback': 24}, interval='1h')
+    assert len(result.equity) == len(prices)
+    assert result.timestamps[0] == pytest.approx(1_700_000_000.0 - 1_700_000_000 % 3600)
+    store.close()
@@ -0,0 +1,217 @@
+"""BitcoinAPI contra servidores HTTP locais (stubs): cache, corrida de provedores, keep-alive e async."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("websocket")
+
+from bitcoin_api import BitcoinAPI
+from response_cache import ResponseCache
+
+
+class StubUpstream:
+    """Servidor HTTP local que imita CoinGecko/blockchain.info e conta as requisições."""
+
+    def __init__(self):
+        self.hits = {}
+        self.clients = set()  # (host, porta) de origem: uma conexão keep-alive = uma porta
+        self.delay = 0.0
+        self.price = 50000.0
+        self.fail = False
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                stub.hits[path] = stub.hits.get(path, 0) + 1
+                stub.clients.add(self.client_address)
+                time.sleep(stub.delay)
+                if stub.fail:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps(stub.payload(path)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def payload(self, path):
+        if path == '/simple/price':
+            return {'bitcoin': {'usd': self.price}}
+        if path == '/ticker':
+            return {'USD': {'last': self.price}}
+        if path == '/prices/BTC-USD/spot':
+            return {'data': {'amount': str(self.price)}}
+        if path == '/stats':
+            return {'hash_rate': 1.0, 'difficulty': 2.0, 'totalbc': 1e8, 'n_tx': 7}
+        return {}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+
+def wait_hits(upstream, path, count):
+    """Os provedores correm juntos: o pedido do CoinGecko pode chegar depois da resposta vencedora."""
+    for _ in range(200):
+        if upstream.hits.get(path, 0) >= count:
+            break
+        time.sleep(0.01)
+    return upstream.hits.get(path, 0)
+
+
+def make_api(upstream, clock=None, ttls=None):
+    urls = {name: upstream.url for name in ('coingecko', 'blockchain', 'coinbase')}
+    return BitcoinAPI(base_urls=urls, ttls=ttls, cache=ResponseCache(clock or time.monotonic))
+
+
+def test_concurrent_callers_share_one_fetch(upstream):
+    upstream.delay = 0.3
+    api = make_api(upstream)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(api.get_current_price())) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [50000.0] * 20
+    assert wait_hits(upstream, '/simple/price', 1) == 1
+    assert api.cache.stats['coalesced'] == 19
+
+
+def test_ttl_then_stale_while_revalidate(upstream):
+    clock = FakeClock()
+    api = make_api(upstream, clock, ttls={'get_current_price': (5.0, 30.0)})
+    assert api.get_current_price() == 50000.0
+    upstream.price = 51000.0
+    clock.now += 4
+    assert api.get_current_price('USD') == 50000.0  # Fresco: sem rede
+    assert wait_hits(upstream, '/simple/price', 1) == 1
+
+    clock.now += 2  # Velho mas dentro da janela: responde na hora e revalida ao fundo
+    assert api.get_current_price() == 50000.0
+    for _ in range(100):
+        if api.cache.peek(('get_current_price', 'USD')) == 51000.0:
+            break
+        time.sleep(0.01)
+    assert api.get_current_price() == 51000.0
+    assert wait_hits(upstream, '/simple/price', 2) == 2
+
+    clock.now += 100  # Fora da janela stale: busca síncrona
+    upstream.price = 52000.0
+    assert api.get_current_price() == 52000.0
+
+
+def test_endpoints_have_separate_ttls_and_failures_keep_last_value(upstream):
+    clock = FakeClock()
+    api = make_api(upstream, clock)
+    assert api.get_blockchain_stats()['total_transactions'] == 7
+    api.get_current_price()
+    clock.now += 10  # Preço (ttl 5s) venceu; stats (ttl 120s) não
+    upstream.fail = True
+    assert api.get_blockchain_stats()['total_transactions'] == 7
+    assert upstream.hits['/stats'] == 1
+    clock.now += 1000
+    assert api.get_blockchain_stats()['total_transactions'] == 7  # Upstream fora: último valor bom
+    assert upstream.hits['/stats'] == 2
+
+
+@pytest.fixture
+def providers():
+    stubs = {name: StubUpstream() for name in ('coingecko', 'blockchain', 'coinbase')}
+    yield stubs
+    for stub in stubs.values():
+        stub.close()
+
+
+def make_racing_api(providers):
+    return BitcoinAPI(base_urls={name: stub.url for name, stub in providers.items()})
+
+
+def test_price_providers_race_concurrently(providers):
+    providers['coingecko'].delay = 2.0   # Lento
+    providers['blockchain'].fail = True  # Fora do ar
+    providers['coinbase'].price = 50100.0
+    api = make_racing_api(providers)
+    t0 = time.monotonic()
+    assert api.get_current_price() == 50100.0
+    assert time.monotonic() - t0 < 1.0  # Antes: 2s do primeiro + 503 do segundo em série
+    # O vencedor pode responder antes de o pedido do provedor fora do ar chegar ao stub
+    for _ in range(100):
+        if all(stub.hits for stub in providers.values()):
+            break
+        time.sleep(0.01)
+    assert all(stub.hits for stub in providers.values())
+    api.close()
+
+
+def test_all_providers_failing_returns_none(providers):
+    for stub in providers.values():
+        stub.fail = True
+    api = make_racing_api(providers)
+    assert api.get_current_price() is None
+    api.close()
+
+
+def test_session_reuses_connections(upstream):
+    api = make_api(upstream)
+    for _ in range(5):
+        api.cache.invalidate()
+        assert api.get_blockchain_stats()['total_transactions'] == 7
+    assert upstream.hits['/stats'] == 5
+    assert len(upstream.clients) == 1
+    api.close()
+
+
+def test_async_variants_race_and_coalesce(providers):
+    pytest.importorskip("aiohttp")
+    providers['coingecko'].delay = 2.0
+    providers['blockchain'].fail = True
+    api = make_racing_api(providers)
+
+    async def scenario():
+        t0 = time.monotonic()
+        prices = await asyncio.gather(*[api.get_current_price_async() for _ in range(10)])
+        elapsed = time.monotonic() - t0
+        stats = await api.get_blockchain_stats_async()
+        await api.aclose()
+        return prices, elapsed, stats
+
+    prices, elapsed, stats = asyncio.run(scenario())
+    assert prices == [50000.0] * 10 and elapsed < 1.0
+    assert providers['coinbase'].hits['/prices/BTC-USD/spot'] == 1  # 10 chamadores, 1 corrida
+    assert stats is None  # blockchain.info fora do ar
+    assert api.get_current_price() == 50000.0  # Sync e async compartilham o cache
+    api.close()
@@ -0,0 +1,100 @@
+"""Verificação de assinaturas em lote (BitcoinCrypto.verify_signatures)."""
+import pytest
+
+pytest.importorskip("ecdsa")
+
+import bitcoin_crypto
+from bitcoin_blockchain import Block, Transaction
+from bitcoin_crypto import BitcoinCrypto, BitcoinWallet, shutdown_pool
+from chain_validator import FAIL_SIGNATURE, check_blocks
+from mempool import Mempool
+
+
+def signed_items(crypto, n, n_keys=3):
+    wallets = [crypto.create_wallet() for _ in range(n_keys)]
+    items = []
+    for i in range(n):
+        private_key, public_key, _ = wallets[i % n_keys]
+        items.append((f"msg_{i}", crypto.sign_message(f"msg_{i}", private_key), public_key))
+    return items
+
+
+def test_batch_matches_single_verification():
+    crypto = BitcoinCrypto()
+    items = signed_items(crypto, 80)
+    items[5] = ("tampered", items[5][1], items[5][2])
+    items[40] = (items[40][0], items[40][1], "02" + "00" * 32)
+    try:
+        batch = crypto.verify_signatures(items, workers=2)
+    finally:
+        shutdown_pool()
+    assert batch == [crypto.verify_signature(*item) for item in items]
+    assert [i for i, ok in enumerate(batch) if not ok] == [5, 40]
+
+
+def test_block_with_forged_signature_fails_validation():
+    wallet = BitcoinWallet()
+    wallet.private_key, wallet.public_key, wallet.address = wallet.crypto.create_wallet()
+    txs = [Transaction(wallet.address, "Bob", 1.0 + i) for i in range(3)]
+    for tx in txs:
+        tx.sign(wallet)
+    block = Block(1, txs, "00" * 32)
+    block.hash = block.calculate_hash()
+    assert check_blocks([block], 1, 0) is None
+    txs[1].signature = txs[0].signature
+    assert check_blocks([block], 1, 0) == (1, FAIL_SIGNATURE)
+
+
+def test_valid_signature_from_another_key_is_rejected():
+    victim, thief = BitcoinWallet(), BitcoinWallet()
+    for wallet in (victim, thief):
+        wallet.private_key, wallet.public_key, wallet.address = wallet.crypto.create_wallet()
+    honest = Transaction(victim.address, "Bob", 1.0)
+    honest.sign(victim)
+    stolen = Transaction(victim.address, thief.address, 50.0)
+    stolen.sign(thief)  # Assinatura ECDSA válida, mas a chave não é a dona do endereço
+    assert thief.crypto.verify_signature(stolen.tx_hash, stolen.signature, stolen.public_key)
+
+    block = Block(1, [honest, stolen], "00" * 32)
+    block.hash = block.calculate_hash()
+    assert check_blocks([block], 1, 0) == (1, FAIL_SIGNATURE)
+    pool = Mempool()
+    assert pool.add(honest) and not pool.add(stolen)
+    stolen.public_key = None
+    assert not pool.add(stolen)  # Assinada sem chave pública também não entra
+
+
+def test_generator_table_matches_ecdsa():
+    import ecdsa
+    from bitcoin_crypto import SECP256K1_N, derive_public_keys
+    generator = ecdsa.SECP256k1.generator
+    scalars = [1, 2, 255, 256, 2 ** 255, SECP256K1_N - 1, 0xC0FFEE << 100]
+    for k, public_key in zip(scalars, derive_public_keys(['%064x' % k for k in scalars])):
+        point = generator * k
+        expected = ('03' if point.y() & 1 else '02') + point.x().to_bytes(32, 'big').hex()
+        assert public_key == expected
+    with pytest.raises(ValueError):
+        derive_public_keys(['00' * 32])
+
+
+def test_create_wallets_produces_usable_keys():
+    crypto = BitcoinCrypto()
+    try:
+        wallets = crypto.create_wallets(300, workers=2)
+    finally:
+        shutdown_pool()
+    assert len({private_key for private_key, _, _ in wallets}) == 300
+    private_key, public_key, address = wallets[-1]
+    assert crypto.public_key_to_address(public_key) == address
+    assert crypto.verify_signature("m", crypto.sign_message("m", private_key), public_key)
+
+
+def test_pool_follows_the_requested_worker_count():
+    try:
+        assert bitcoin_crypto._get_pool(2) is bitcoin_crypto._get_pool(2)
+        assert bitcoin_crypto._get_pool(3)._max_workers == 3
+        crypto = BitcoinCrypto()
+        assert len(crypto.create_wallets(300, workers=3)) == 300
+    finally:
+        shutdown_pool()
+    assert not bitcoin_crypto._pools
@@ -0,0 +1,113 @@
+"""Round-trip do codec binário contra a forma dict (to_dict)."""
+import io
+
+import pytest
+
+from bitcoin_blockchain import Block, Transaction
+from block_codec import CodecError, decode, encode_block, encode_transaction, read_frames, write_frame
+
+
+def make_block(n_txs=3):
+    txs = [Transaction(f"sender_{i}", f"recipient_{i}", 1.25 * i) for i in range(n_txs)]
+    block = Block(7, txs, "ab" * 32)
+    block.nonce = 987654321
+    block.hash = block.calculate_hash()
+    return block
+
+
+def test_transaction_round_trip():
+    tx = Transaction("Alice_é", "Bob", 12.5)
+    tx.signature = "3045022100" + "11" * 32
+    decoded = decode(encode_transaction(tx))
+    assert decoded.to_dict() == tx.to_dict()
+    assert decoded.calculate_hash() == tx.tx_hash
+
+
+def test_integer_fields_keep_their_type():
+    # O Genesis usa timestamp/amount inteiros: f"{timestamp}" entra no hash
+    tx = Transaction("GENESIS", "SYSTEM", 0, timestamp=1231006505)
+    block = Block(0, [tx], "0" * 64, timestamp=1231006505)
+    block.hash = block.calculate_hash()
+    decoded = decode(encode_block(block))
+    assert decoded.timestamp == 1231006505 and isinstance(decoded.timestamp, int)
+    assert decoded.transactions[0].calculate_hash() == tx.tx_hash
+    assert decoded.calculate_hash() == block.hash
+
+
+def test_block_round_trip_matches_dict_form():
+    block = make_block()
+    decoded = decode(encode_block(block))
+    assert decoded.to_dict() == block.to_dict()
+    assert decoded.calculate_merkle_root() == block.merkle_root
+
+
+def test_unmined_block_and_text_signature():
+    block = make_block(1)
+    block.hash = None
+    block.transactions[0].signature = "not-hex-signature"
+    assert decode(encode_block(block)).to_dict() == block.to_dict()
+
+
+def test_binary_is_smaller_than_json():
+    import json
+    block = make_block(20)
+    assert len(encode_block(block)) < len(json.dumps(block.to_dict())) / 2
+
+
+def test_streaming_round_trip():
+    items = [make_block(2), Transaction("x", "y", 3.0), make_block(0)]
+    stream = io.BytesIO()
+    for item in items:
+        write_frame(stream, item)
+    stream.seek(0)
+    decoded = list(read_frames(stream))
+    assert [d.to_dict() for d in decoded] == [i.to_dict() for i in items]
+
+
+def test_rejects_unknown_version_and_truncation():
+    frame = encode_block(make_block())
+    with pytest.raises(CodecError):
+        decode(b"\x09" + frame[1:])
+    stream = io.BytesIO()
+    write_frame(stream, make_block())
+    with pytest.raises(CodecError):
+        list(read_frames(io.BytesIO(stream.getvalue()[:-5])))
+
+
+def test_truncated_and_empty_frames_raise_codec_error():
+    tx = Transaction("Alice_é", "Bob", 1.0)
+    tx.signature = "3045022100" + "33" * 32
+    tx.public_key = "02" + "ab" * 32
+    for frame in (encode_block(make_block()), encode_transaction(tx)):
+        with pytest.raises(CodecError):
+            decode(frame[:-5])
+        for size in range(len(frame)):  # Qualquer prefixo do frame
+            with pytest.raises(CodecError):
+                decode(frame[:size])
+    with pytest.raises(CodecError):
+        decode(b"")
+
+
+def test_singularity_block_round_trip():
+    singularity_coin = pytest.importorskip("singularity_coin")
+    block = singularity_coin.SingularityBlock(3, [Transaction("a", "b", 1.0)], "cd" * 32)
+    block.manifold_proof = "THE_VOID_GEOMETRY"
+    block.lattice_witness = "ef" * 32
+    block.nexus_resonance = 0.93
+    block.hash = block.calculate_hash()
+    decoded = decode(encode_block(block))
+    assert isinstance(decoded, singularity_coin.SingularityBlock)
+    assert decoded.to_dict() == block.to_dict()
+    assert decoded.calculate_hash() == block.hash
+
+
+def test_public_key_round_trip_and_v1_frames():
+    tx = Transaction("Alice", "Bob", 2.0)
+    tx.signature = "3045022100" + "22" * 32
+    tx.public_key = "02" + "ab" * 32
+    decoded = decode(encode_transaction(tx))
+    assert decoded.public_key == tx.public_key and decoded.to_dict() == tx.to_dict()
+    # Frames v1 (sem chave pública) continuam decodificáveis
+    tx.public_key = None
+    legacy = b"\x01" + encode_transaction(tx)[1:]
+    assert decode(legacy).to_dict() == tx.to_dict()
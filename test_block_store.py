@@ -0,0 +1,117 @@
+"""BlockStore/PersistentChain: reabertura, crash sem close, cauda corrompida, JSON antigo e saldos."""
+import json
+import os
+
+import pytest
+
+from bitcoin_blockchain import BitcoinBlockchain, Block, Transaction
+from block_store import INDEX_RECORD, BlockStore, PersistentChain, open_chain
+
+
+def make_block(index, prev="0" * 64):
+    block = Block(index, [Transaction("alice", f"bob_{index}", 1.5 * index, timestamp=1000 + index)], prev,
+                  timestamp=2000 + index)
+    block.hash = block.calculate_hash()
+    return block
+
+
+def fill(path, n, **kwargs):
+    chain = open_chain(str(path), **kwargs)
+    prev = "0" * 64
+    for i in range(n):
+        block = make_block(i, prev)
+        chain.append(block)
+        prev = block.hash
+    return chain
+
+
+def test_close_and_reopen(tmp_path):
+    fill(tmp_path, 5).close()
+    chain = open_chain(str(tmp_path))
+    assert len(chain) == 5 and [b.index for b in chain] == list(range(5))
+    assert chain[-1].to_dict() == make_block(4, chain[3].hash).to_dict()
+    assert [b.index for b in chain[1:3]] == [1, 2]
+    chain.append(make_block(5, chain[-1].hash))
+    chain.close()
+    assert len(open_chain(str(tmp_path))) == 6
+
+
+def test_reopen_after_unclean_shutdown(tmp_path):
+    fill(tmp_path, 3)  # Sem close(): só os flush de cada append
+    chain = open_chain(str(tmp_path))
+    assert [b.hash for b in chain] == [b.hash for b in fill(tmp_path / "ref", 3)]
+
+
+def test_partial_index_record_and_orphan_bytes_are_dropped(tmp_path):
+    fill(tmp_path, 3).close()
+    with open(tmp_path / "index.dat", "ab") as f:
+        f.write(b"\x01\x02\x03")  # Registro de índice pela metade
+    with open(tmp_path / "blk00000.dat", "ab") as f:
+        f.write(b"lixo")  # Dados sem registro de índice
+    chain = open_chain(str(tmp_path))
+    assert len(chain) == 3
+    chain.append(make_block(3, chain[-1].hash))
+    assert chain.store.read(3) and [b.index for b in chain] == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("damage", ["truncate", "flip"])
+def test_damaged_tail_is_discarded(tmp_path, damage):
+    fill(tmp_path, 4).close()
+    segment = tmp_path / "blk00000.dat"
+    size = os.path.getsize(segment)
+    if damage == "truncate":
+        with open(segment, "r+b") as f:
+            f.truncate(size - 5)  # SO perdeu o fim do último bloco
+    else:
+        with open(segment, "r+b") as f:
+            f.seek(size - 1)
+            last = f.read(1)[0]
+            f.seek(size - 1)
+            f.write(bytes([last ^ 0xFF]))  # crc32 do último bloco não bate
+    chain = open_chain(str(tmp_path))
+    assert len(chain) == 3 and os.path.getsize(tmp_path / "index.dat") == 3 * INDEX_RECORD.size
+    chain.append(make_block(3, chain[-1].hash))
+    chain.close()
+    assert [b.index for b in open_chain(str(tmp_path))] == [0, 1, 2, 3]
+
+
+def test_crc_mismatch_in_middle_raises(tmp_path):
+    fill(tmp_path, 3).close()
+    store = BlockStore(str(tmp_path))
+    _, offset, _, _ = store._record(1)
+    store.close()
+    with open(tmp_path / "blk00000.dat", "r+b") as f:
+        f.seek(offset + 1)
+        f.write(b"\xff")
+    chain = open_chain(str(tmp_path))
+    assert len(chain) == 3  # Só a cauda é reparada na abertura
+    with pytest.raises(IOError):
+        chain[1]
+
+
+def test_reads_legacy_json_records(tmp_path):
+    store = BlockStore(str(tmp_path))
+    legacy = make_block(0)
+    store.append(json.dumps(legacy.to_dict()).encode())
+    chain = PersistentChain(store)
+    chain.append(make_block(1, legacy.hash))
+    chain._cache.clear()
+    assert chain[0].to_dict() == legacy.to_dict() and chain[0].calculate_hash() == legacy.hash
+    assert chain[1].previous_hash == legacy.hash
+
+
+@pytest.mark.parametrize("clean", [True, False])
+def test_balances_after_reopen(tmp_path, clean):
+    data_dir = str(tmp_path / "chain")
+    chain = BitcoinBlockchain(difficulty=1, data_dir=data_dir)
+    chain.mine_pending_transactions("alice")
+    chain.add_transaction(Transaction("alice", "bob", 20, timestamp=5))
+    chain.mine_pending_transactions("bob")
+    expected = {a: chain.get_balance(a) for a in ("alice", "bob", "SYSTEM")}
+    if clean:
+        chain.close()  # Com snapshot do índice; sem close() o índice é reconstruído
+    reopened = BitcoinBlockchain(difficulty=1, data_dir=data_dir)
+    assert len(reopened.chain) == 3 and reopened.is_chain_valid()
+    assert {a: reopened.get_balance(a) for a in expected} == expected
+    assert reopened.ledger.rebuilds == (0 if clean else 1)
+    reopened.close()
@@ -0,0 +1,154 @@
+"""ChainValidator: paralelo == serial, cada código de falha, checkpoint e trechos lidos da BlockStore."""
+import pytest
+
+import chain_validator
+from bitcoin_blockchain import BitcoinBlockchain, Block, Transaction
+from block_store import BlockStore, decode_block, open_chain
+from chain_validator import FAIL_HASH, FAIL_LINK, FAIL_MERKLE, FAIL_POW, ChainValidator
+from mining_engine import MiningEngine
+
+DIFFICULTY = 1
+ENGINE = MiningEngine(workers=1)
+
+
+def mine(block):
+    block.nonce = 0
+    block.mine_block(DIFFICULTY, engine=ENGINE)
+    return block
+
+
+def build_chain(n):
+    chain = [mine(Block(0, [Transaction("GENESIS", "SYSTEM", 0, timestamp=1)], "0" * 64, timestamp=1))]
+    for i in range(1, n):
+        txs = [Transaction(f"sender_{i}", f"recipient_{i}", float(i), timestamp=10 + i)]
+        chain.append(mine(Block(i, txs, chain[-1].hash, timestamp=100 + i)))
+    return chain
+
+
+@pytest.fixture(scope="module")
+def blocks():
+    return build_chain(600)
+
+
+def break_hash(chain, h):
+    chain[h].hash = "ab" * 32
+
+
+def break_pow(chain, h):
+    # Hash coerente com o cabeçalho, mas fora do alvo
+    block = chain[h]
+    while True:
+        block.nonce += 1
+        block.hash = block.calculate_hash()
+        if not block.hash.startswith("0"):
+            return
+
+
+def break_link(chain, h):
+    chain[h].previous_hash = "cd" * 32
+    mine(chain[h])
+
+
+def break_merkle(chain, h):
+    chain[h].transactions[0].tx_hash = "ef" * 32
+
+
+@pytest.mark.parametrize("tamper, code", [
+    (break_hash, FAIL_HASH), (break_pow, FAIL_POW), (break_link, FAIL_LINK), (break_merkle, FAIL_MERKLE),
+])
+def test_each_failure_code(tamper, code):
+    chain = build_chain(8)
+    assert ChainValidator(workers=1).validate(chain, DIFFICULTY) is None
+    tamper(chain, 5)
+    # Blocos seguintes também quebram (ligação), mas a primeira falha é a do bloco adulterado
+    assert ChainValidator(workers=1).validate(chain, DIFFICULTY, full=True) == (5, code)
+
+
+def test_parallel_matches_serial(blocks):
+    chain = list(blocks)
+    serial = ChainValidator(workers=1)
+    parallel = ChainValidator(workers=2, min_parallel_blocks=1)
+    try:
+        assert serial.validate(chain, DIFFICULTY) is None
+        assert parallel.validate(chain, DIFFICULTY) is None
+        assert parallel._pool is not None  # 600 blocos em trechos de 256: passou pelo pool
+        assert parallel.checkpoint_height == serial.checkpoint_height == len(chain)
+        # Falhas em trechos diferentes: os dois relatam a menor altura
+        chain[450] = Block.from_dict(chain[450].to_dict())
+        chain[450].transactions[0].tx_hash = "ef" * 32
+        chain[300] = Block.from_dict(chain[300].to_dict())
+        chain[300].hash = "ab" * 32
+        expected = (300, FAIL_HASH)
+        assert serial.validate(chain, DIFFICULTY, full=True) == expected
+        assert parallel.validate(chain, DIFFICULTY, full=True) == expected
+    finally:
+        parallel.close()
+
+
+def test_checkpoint_skips_validated_blocks(monkeypatch):
+    chain = build_chain(6)
+    checked = []
+    original = chain_validator.check_blocks
+
+    def spy(blocks, first_height, *args):
+        checked.append((first_height, len(blocks)))
+        return original(blocks, first_height, *args)
+
+    monkeypatch.setattr(chain_validator, "check_blocks", spy)
+    validator = ChainValidator(workers=1)
+    assert validator.validate(chain, DIFFICULTY) is None
+    chain.append(mine(Block(6, [Transaction("a", "b", 1.0, timestamp=7)], chain[-1].hash, timestamp=200)))
+    assert validator.validate(chain, DIFFICULTY) is None
+    assert validator.validate(chain, DIFFICULTY) is None  # Nada novo: nenhuma checagem
+    assert checked == [(1, 5), (6, 1)]
+
+    # Adulteração in-place abaixo do checkpoint só aparece com full=True
+    chain[2].transactions[0].tx_hash = "ef" * 32
+    assert validator.validate(chain, DIFFICULTY) is None
+    assert validator.validate(chain, DIFFICULTY, full=True) == (2, FAIL_MERKLE)
+
+    # Cadeia substituída (topo do checkpoint mudou) ou outra dificuldade: recomeça do bloco 1
+    checked.clear()
+    other = build_chain(7)
+    other[6] = mine(Block(6, [Transaction("x", "y", 2.0, timestamp=8)], other[5].hash, timestamp=300))
+    assert validator.validate(other, DIFFICULTY) is None
+    assert validator.validate(other, 0) is None
+    assert checked == [(1, 6), (1, 6)]
+
+
+def test_persistent_chain_is_checked_from_the_store(tmp_path):
+    chain = open_chain(str(tmp_path))
+    for block in build_chain(600):
+        chain.append(block)
+    reader = BlockStore(str(tmp_path), readonly=True)
+    assert reader.height == 600
+    with pytest.raises(IOError):
+        reader.append(b"x")
+    bad = Block.from_dict(chain[-1].to_dict())
+    bad.index, bad.previous_hash = 600, chain[-1].hash
+    bad.transactions[0].tx_hash = "ef" * 32
+    chain.append(mine(bad))
+    reader.refresh()
+    assert reader.height == 601 and decode_block(reader.read(600)).hash == bad.hash
+    reader.close()
+
+    serial = ChainValidator(workers=1)
+    parallel = ChainValidator(workers=2, min_parallel_blocks=1)
+    try:
+        # Workers recebem só (caminho, início, fim) e leem os blocos da BlockStore
+        assert serial.validate(chain, DIFFICULTY) == (600, FAIL_MERKLE)
+        assert parallel.validate(chain, DIFFICULTY) == (600, FAIL_MERKLE)
+        assert parallel.validate(chain[:600], DIFFICULTY) is None  # Lista em memória: trechos fatiados
+    finally:
+        parallel.close()
+        chain.close()
+
+
+def test_is_chain_valid_is_full_unless_incremental():
+    chain = BitcoinBlockchain(difficulty=DIFFICULTY)
+    chain.mine_pending_transactions("alice")
+    chain.mine_pending_transactions("bob")
+    assert chain.is_chain_valid()
+    chain.chain[1].transactions[0].tx_hash = "ef" * 32
+    assert chain.is_chain_valid(incremental=True)  # Abaixo do checkpoint: não revalidado
+    assert not chain.is_chain_valid()
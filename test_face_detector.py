@@ -0,0 +1,72 @@
+"""FaceDetector: prioridade dos passes, escala da pirâmide e cascades por thread (cascades roteirizadas)."""
+import threading
+
+import cv2
+import numpy as np
+
+from face_detector import FACE_SIZE, FaceDetector
+
+
+class ScriptedCascade:
+    """Devolve retângulos (na imagem recebida) conforme o roteiro do teste."""
+
+    def __init__(self, name, script, calls):
+        self.name, self.script, self.calls = name, script, calls
+
+    def detectMultiScale(self, image, **kwargs):
+        flipped = image[:, -1].mean() > image[:, 0].mean()  # Na imagem original a borda esquerda é a clara
+        self.calls.append((self.name, flipped, kwargs, threading.current_thread().name))
+        return self.script.get((self.name, flipped, kwargs['minNeighbors']), ())
+
+
+def make_detector(script, **kwargs):
+    calls = []
+    detector = FaceDetector(cascade_paths={'frontal': 'frontal', 'profile': 'profile'},
+                            loader=lambda path: ScriptedCascade(path, script, calls), **kwargs)
+    return detector, calls
+
+
+def frame(h=720, w=960):
+    # Rampa horizontal: borda esquerda clara, e recortes diferentes em cada posição
+    return np.tile(np.linspace(250, 10, w).astype(np.uint8), (h, 1))
+
+
+def test_frontal_hit_is_scaled_back_to_full_resolution():
+    detector, calls = make_detector({('frontal', False, 5): [(10, 20, 40, 40), (100, 100, 60, 50)]}, max_side=480)
+    detection = detector.detect(frame(), robust=False)
+    assert detection.stage == 'frontal' and not detection.flipped
+    assert detection.rect == (200, 200, 120, 100)  # Maior retângulo, escala 0.5 desfeita
+    assert detection.face.shape == FACE_SIZE[::-1]
+    assert calls[0][2]['minSize'] == (15, 15)
+    assert set(detection.timings) >= {'downscale', 'frontal', 'crop'}
+
+
+def test_robust_passes_keep_priority_and_stop_early():
+    script = {
+        ('profile', True, 3): [(30, 30, 50, 50)],        # Perfil espelhado acerta
+        ('frontal', False, 2): [(0, 0, 200, 200)],       # Ultra-sensível acertaria maior, mas tem prioridade menor
+    }
+    detector, calls = make_detector(script, max_side=None, workers=3)
+    detection = detector.detect(frame(240, 320), robust=True)
+    assert detection.stage == 'profile_flip' and detection.flipped
+    assert detection.rect == (30, 30, 50, 50)
+    # A ROI vem da imagem espelhada
+    expected = cv2.resize(np.ascontiguousarray(frame(240, 320)[:, ::-1][30:80, 30:80]), FACE_SIZE)
+    np.testing.assert_array_equal(detection.face, expected)
+    stats = detector.stats()
+    assert stats['hits'] == {'profile_flip': 1}
+    assert 'frontal_sensitive' not in detection.timings
+    detector.close()
+
+
+def test_cascades_load_once_per_thread_and_central_crop():
+    detector, calls = make_detector({}, max_side=480, workers=2)
+    assert detector.detect(frame(), robust=False) is None
+    for _ in range(10):
+        detection = detector.detect(frame(), robust=True)
+        assert detection.stage == 'central_crop'
+        assert detection.rect == (228, 108, 503, 503)
+    threads = {thread for *_, thread in calls}
+    assert detector.loads <= 2 * len(threads) <= 2 * 3  # Thread principal + 2 workers, no máximo
+    assert detector.stats()['calls'] == 11
+    detector.close()
@@ -0,0 +1,97 @@
+"""Índice de templates faciais: mesma decisão do laço original, refresh incremental."""
+import os
+
+import numpy as np
+import pytest
+
+from face_index import FaceTemplateIndex, membrane_hash
+from topological_kernel import TopologicalKernel
+
+kernel = TopologicalKernel()
+
+
+def smooth_face(rng):
+    coarse = rng.integers(0, 256, (5, 5)).astype(np.float64)
+    face = np.kron(coarse, np.ones((20, 20)))
+    return np.clip(face + rng.normal(0, 6, face.shape), 0, 255).astype(np.uint8)
+
+
+def reference_identify(db_dir, face, sig, enzyme=1.0):
+    """O laço por usuário/ângulo que authenticate_from_image_bytes fazia antes do índice."""
+    best_user, best = None, -1.0
+    for name in sorted(os.listdir(db_dir)):
+        data = np.load(os.path.join(db_dir, name), allow_pickle=True)
+        if 'membrane_hash' in data:
+            arrays = ({'manifold': data['manifold']} if 'manifold' in data
+                      else {'mean': data['mean'], 'top_sig': data['top_sig']})
+            if membrane_hash(**arrays) != str(data['membrane_hash']):
+                continue
+        angles = data['manifold'] if 'manifold' in data else [
+            {'mean': data['mean'], 'top_sig': data['top_sig'] if 'top_sig' in data else None}]
+        threshold = 0.5 if 'manifold' in data else 0.8
+        for angle in angles:
+            p_sim = max(0, 1.0 - float(np.mean(np.abs(angle['mean'].astype(np.int16) - face.astype(np.int16)))) / 100.0)
+            t_score = 0.0
+            if angle['top_sig'] is not None:
+                t_score = 1.0 - min(1.0, kernel.compute_geodesic_distance(angle['top_sig'], sig) * 2.0)
+            conf = (p_sim * 0.4 + t_score * 0.6) * enzyme
+            if conf > threshold and conf > best:
+                best_user, best = name[:-4], conf
+    return best_user, (best if best_user else None)
+
+
+@pytest.fixture
+def face_db(tmp_path):
+    rng = np.random.default_rng(21)
+    faces = {}
+    for u in range(12):
+        base = smooth_face(rng)
+        manifold = []
+        for _ in range(5):
+            angle = np.clip(base + rng.normal(0, 5, base.shape), 0, 255).astype(np.uint8)
+            manifold.append({'mean': angle, 'top_sig': kernel.extract_signature(angle)})
+        np.savez_compressed(str(tmp_path / f'user{u:02d}.npz'), manifold=manifold,
+                            membrane_hash=membrane_hash(manifold=manifold), version="1.1.0_manifold")
+        faces[f'user{u:02d}'] = base
+    legacy = smooth_face(rng)
+    np.savez(str(tmp_path / 'legacy.npz'), mean=legacy, top_sig=kernel.extract_signature(legacy))
+    np.savez(str(tmp_path / 'legacy_nosig.npz'), mean=smooth_face(rng))
+    faces['legacy'] = legacy
+    return tmp_path, faces, rng
+
+
+def test_identify_matches_reference_loop(face_db):
+    db_dir, faces, rng = face_db
+    index = FaceTemplateIndex(str(db_dir))
+    probes = list(faces.values()) + [smooth_face(rng) for _ in range(4)]
+    for enzyme in (1.0, 0.85):
+        for probe in probes:
+            sig = kernel.extract_signature(probe)
+            expected = reference_identify(str(db_dir), probe, sig, enzyme)
+            user, conf = index.identify(probe, sig, enzyme)
+            assert user == expected[0]
+            if user:
+                assert conf == pytest.approx(expected[1], abs=1e-9)
+    assert index.identify(faces['user03'], kernel.extract_signature(faces['user03']))[0] == 'user03'
+    assert index.loads == 14  # Cada arquivo lido uma única vez
+
+
+def test_refresh_tracks_enrollments_and_tampering(face_db):
+    db_dir, faces, rng = face_db
+    index = FaceTemplateIndex(str(db_dir))
+    probe = faces['user05']
+    sig = kernel.extract_signature(probe)
+    assert index.identify(probe, sig)[0] == 'user05'
+
+    # Template adulterado: hash de membrana não confere -> usuário some do índice
+    path = str(db_dir / 'user05.npz')
+    data = dict(np.load(path, allow_pickle=True))
+    data['manifold'][0]['mean'] = probe
+    np.savez_compressed(path, **data)
+    os.utime(path, ns=(1, 1))
+    index.invalidate()
+    assert index.identify(probe, sig)[0] != 'user05'
+
+    os.remove(path)
+    index.invalidate()
+    assert 'user05' not in index.users() and len(index.users()) == 13
@@ -0,0 +1,88 @@
+"""FrameBus: cursores independentes, sem reenvio, seqlock, anexação e concessão do produtor."""
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from frame_bus import FrameBus
+
+
+@pytest.fixture
+def bus():
+    bus = FrameBus(f"test_bus_{uuid.uuid4().hex[:12]}", slots=3, slot_bytes=64, create=True)
+    yield bus
+    bus.close()
+
+
+def test_cursors_advance_independently_without_resends(bus):
+    fast, slow = bus.cursor(), bus.cursor()
+    assert fast.poll() is None  # Nada publicado ainda
+    bus.publish(b'frame-1')
+    assert fast.poll().data == b'frame-1'
+    assert fast.poll() is None  # Mesmo seq: nada a reenviar
+    for i in range(2, 6):
+        bus.publish(f'frame-{i}'.encode())
+    frame = slow.poll()
+    assert (frame.seq, frame.data) == (5, b'frame-5')  # Espectador atrasado pula para o mais recente
+    assert fast.poll().seq == 5 and fast.poll() is None
+    stats = bus.stats()
+    assert stats['published'] == 5 and stats['delivered'] == 3 and stats['skipped'] == 3
+    assert stats['viewers'] == 2 and stats['latency_p50_ms'] >= 0
+    with pytest.raises(ValueError):
+        bus.publish(b'x' * 65)
+
+
+def test_torn_slot_is_discarded(bus):
+    bus.publish(b'ok')
+    cursor = bus.cursor()
+    off = bus._slot_offset(1)
+    bus._buf[off:off + 8] = (99).to_bytes(8, 'little')  # Produtor começou a sobrescrever o slot
+    assert cursor.poll() is None and bus.stats()['torn'] == 1
+
+
+def test_producer_in_another_process(bus):
+    code = ("from frame_bus import FrameBus\n"
+            f"bus = FrameBus.attach({bus.name!r})\n"
+            "bus.publish(b'from-child')\n"
+            "bus.close()\n")
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    frame = bus.cursor().wait(timeout=1.0)
+    assert frame.data == b'from-child' and frame.latency_ms >= 0
+    attached = FrameBus.attach(bus.name)
+    assert (attached.slots, attached.slot_bytes, attached.owner) == (3, 64, False)  # Geometria vem do cabeçalho
+    attached.close()
+    with pytest.raises(FileNotFoundError):
+        FrameBus.attach(f"missing_{uuid.uuid4().hex[:12]}")
+
+
+def test_attached_producer_detects_removed_or_recreated_segment():
+    name = f"test_bus_{uuid.uuid4().hex[:12]}"
+    server = FrameBus(name, slots=2, slot_bytes=16, create=True)
+    producer = FrameBus.attach(name)
+    assert producer.generation == server.generation and not producer.is_stale()
+    server.close()  # Servidor encerrado: o mapeamento do produtor continua válido, mas ninguém lê
+    assert producer.is_stale()
+    restarted = FrameBus(name, slots=2, slot_bytes=16, create=True)
+    try:
+        assert restarted.generation != producer.generation
+        assert producer.is_stale()  # Mesmo nome, outra geração
+        producer.close()
+        producer = FrameBus.attach(name)
+        assert not producer.is_stale()
+        producer.publish(b'depois')
+        assert restarted.cursor().poll().data == b'depois'
+    finally:
+        producer.close()
+        restarted.close()
+
+
+def test_attached_producer_holds_the_bus_while_publishing(bus):
+    producer = FrameBus.attach(bus.name)
+    assert not bus.producer_active()  # Anexado mas ainda sem publicar
+    producer.publish(b'hud')
+    assert bus.producer_active() and not producer.producer_active()  # Só os outros veem a concessão
+    assert not bus.producer_active(lease=0.0)  # Concessão vencida: o dono volta a poder publicar
+    producer.close()
+    assert not bus.producer_active()
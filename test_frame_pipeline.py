@@ -0,0 +1,88 @@
+"""FramePipeline: MJPEG contínuo com reconhecimento lento, ROI em cinza e latest-frame-wins."""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_pipeline import FramePipeline, LatestSlot
+
+
+class FakeCamera:
+    def __init__(self):
+        self.reads = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reads += 1
+        frame = np.full((240, 320, 3), 30, dtype=np.uint8)
+        frame[60:160, 100:200] = 220  # "Face" clara
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class BoxDetector:
+    def faces(self, gray):
+        return np.array([[100, 60, 100, 100], [0, 0, 10, 10]])
+
+
+def test_latest_slot_overwrites_and_counts_drops():
+    slot = LatestSlot()
+    for i in range(5):
+        slot.put(i)
+    seq, item = slot.get(0, timeout=0)
+    assert (seq, item) == (5, 4) and slot.dropped == 4
+    assert slot.get(seq, timeout=0.01) == (seq, None)  # Nada novo para este espectador
+    slot.put('roi')
+    assert slot.take(timeout=0) == 'roi' and slot.take(timeout=0.01) is None
+
+
+def test_slow_recognition_never_stalls_stream():
+    rois, release = [], threading.Event()
+
+    def slow_recognize(roi):
+        rois.append(roi)
+        release.wait(2.0)  # Reconhecimento travado bem além do intervalo entre frames
+        return 'alice', 0.9
+
+    recognized = []
+    pipeline = FramePipeline(FakeCamera, detector=BoxDetector(), recognize=slow_recognize,
+                             on_recognized=recognized.append, recognition_workers=1,
+                             recognize_interval=0.0, target_fps=100)
+    chunks, t0 = [], time.monotonic()
+    try:
+        for chunk in pipeline.mjpeg():
+            chunks.append(chunk)
+            if len(chunks) >= 20 or time.monotonic() - t0 > 5:
+                break
+        assert len(chunks) >= 20 and not recognized  # 20 frames enquanto o worker segue preso
+        assert chunks[0].startswith(b'--frame\r\nContent-Type: image/jpeg\r\n\r\n')
+        jpeg = chunks[0].split(b'\r\n\r\n', 1)[1][:-2]
+        assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape == (240, 320, 3)
+        release.set()
+        deadline = time.monotonic() + 5
+        while not recognized and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = pipeline.stats()
+    finally:
+        release.set()
+        pipeline.stop()
+    # ROI em cinza da maior face, recortada e redimensionada (sem PNG no caminho)
+    assert rois[0].shape == (100, 100) and rois[0].dtype == np.uint8 and rois[0].min() == 220
+    assert recognized[0].user == 'alice' and pipeline.current_user == 'alice'
+    assert stats['dropped']['recognize'] > 0  # ROIs sobrescritas enquanto o worker estava ocupado
+    assert stats['stages']['encode']['fps'] > 0 and stats['stages']['encode']['latency_p50_ms'] is not None
+
+
+def test_offline_camera_streams_placeholder():
+    pipeline = FramePipeline(lambda: None, detector=BoxDetector(), offline_fps=50)
+    try:
+        chunk = next(pipeline.mjpeg())
+    finally:
+        pipeline.stop()
+    assert chunk.startswith(b'--frame\r\n')
+    assert pipeline.stats()['stages']['detect']['count'] >= 1
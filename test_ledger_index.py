@@ -0,0 +1,94 @@
+"""BalanceIndex: saldos incrementais iguais à varredura completa, reorgs e overlay de pendentes."""
+from bitcoin_blockchain import BitcoinBlockchain, Transaction
+from ledger_index import BalanceIndex
+from mempool import Mempool
+
+
+class FakeBlock:
+    def __init__(self, tag, transactions):
+        self.hash = tag
+        self.transactions = transactions
+
+
+def full_scan(chain, address):
+    """get_balance antigo: percorre todos os blocos."""
+    balance = 0.0
+    for block in chain:
+        for tx in block.transactions:
+            if tx.sender == address:
+                balance -= tx.amount
+            if tx.recipient == address:
+                balance += tx.amount
+    return balance
+
+
+def tx(sender, recipient, amount, ts=1.0):
+    return Transaction(sender, recipient, amount, timestamp=ts)
+
+
+def test_matches_full_scan_and_rebuilds_once():
+    chain = BitcoinBlockchain(difficulty=1)
+    assert chain.ledger.rebuilds == 0 and chain.ledger.height == 1  # Gênesis aplicado uma vez
+    chain.mine_pending_transactions("alice")
+    chain.add_transaction(tx("alice", "bob", 12.5))
+    chain.add_transaction(tx("bob", "carol", 2.0, ts=2.0))
+    chain.mine_pending_transactions("bob")
+    for address in ("alice", "bob", "carol", "SYSTEM", "nobody"):
+        assert chain.get_balance(address) == full_scan(chain.chain, address)
+    assert chain.ledger.rebuilds == 0
+
+
+def test_reorg_and_replaced_chain_trigger_rebuild():
+    index = BalanceIndex()
+    chain = [FakeBlock("g", [tx("SYSTEM", "alice", 50)]), FakeBlock("a1", [tx("alice", "bob", 10)])]
+    assert index.balance("bob", chain) == 10
+    chain[-1] = FakeBlock("b1", [tx("alice", "carol", 7)])  # Troca no lugar, mesmo tamanho
+    assert index.balance("bob", chain) == 0 and index.balance("carol", chain) == 7
+    fork = [chain[0], FakeBlock("c1", [tx("alice", "dave", 1)]), FakeBlock("c2", [tx("dave", "erin", 1)])]
+    assert index.balance("erin", fork) == 1 and index.balance("carol", fork) == 0  # Outra sequência
+    del fork[1:]
+    assert index.balance("alice", fork) == 50  # Cadeia encurtada
+    assert index.rebuilds == 3
+    fork.append(FakeBlock("d1", [tx("alice", "bob", 5)]))
+    assert index.balance("alice", fork) == 45 and index.rebuilds == 3  # Só anexou: incremental
+
+
+def test_snapshot_reload(tmp_path):
+    chain = [FakeBlock("g", [tx("SYSTEM", "alice", 50)]), FakeBlock("a1", [tx("alice", "bob", 10)])]
+    index = BalanceIndex()
+    index.rebuild(chain)
+    index.save(str(tmp_path / "ledger.json"))
+    chain.append(FakeBlock("a2", [tx("bob", "carol", 4)]))
+    reloaded = BalanceIndex()
+    assert reloaded.load(str(tmp_path / "ledger.json"), chain) and reloaded.rebuilds == 0
+    assert [reloaded.balance(a, chain) for a in ("alice", "bob", "carol")] == [40, 6, 4]
+
+
+def test_pending_overlay_follows_mempool_and_lists():
+    chain = [FakeBlock("g", [tx("SYSTEM", "alice", 50)])]
+    index = BalanceIndex()
+    pool = Mempool()
+    first, second = tx("alice", "bob", 5), tx("alice", "carol", 3, ts=2.0)
+    pool.add(first)
+    pool.add(second)
+    assert index.balance("alice", chain, pool) == 42 and index.balance("bob", chain, pool) == 5
+    pool.remove(first.tx_hash)
+    assert index.balance("alice", chain, pool) == 47 and index.balance("bob", chain, pool) == 0
+    pending = [first]
+    assert index.balance("bob", chain, pending) == 5
+    pending[0] = second  # Troca no lugar com o mesmo tamanho
+    assert index.balance("bob", chain, pending) == 0 and index.balance("carol", chain, pending) == 3
+
+
+def test_checkpoint_survives_crash_without_close(tmp_path):
+    data_dir = str(tmp_path / "chain")
+    chain = BitcoinBlockchain(difficulty=1, data_dir=data_dir, checkpoint_every=2)
+    for i in range(5):
+        chain.mine_pending_transactions(f"miner_{i}")
+    assert chain.ledger.saved_height == 6  # Gênesis + 5: gravou nas alturas 2, 4 e 6
+    assert not (tmp_path / "chain" / "ledger.json.tmp").exists()
+    chain.chain.close()  # Crash: a loja de blocos fecha, close() da blockchain nunca roda
+    reopened = BitcoinBlockchain(difficulty=1, data_dir=data_dir, checkpoint_every=2)
+    assert reopened.ledger.rebuilds == 0 and reopened.ledger.height == 6
+    assert reopened.get_balance("miner_4") == 50.0
+    reopened.close()
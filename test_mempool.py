@@ -0,0 +1,110 @@
+"""Mempool: dedup, prioridade por fee rate, ordem por remetente, teto de bytes e contabilidade da taxa."""
+import math
+
+import pytest
+
+from bitcoin_blockchain import BitcoinBlockchain, Transaction
+from mempool import Mempool
+
+
+def tx(sender, recipient="bob", amount=1.0, ts=1.0):
+    return Transaction(sender, recipient, amount, timestamp=ts)
+
+
+def fixed_size(_tx, _fee):
+    return 100
+
+
+def test_dedup_by_tx_hash():
+    pool = Mempool()
+    first = tx("alice")
+    assert pool.add(first, 1.0)
+    assert not pool.add(tx("alice"), 5.0)  # Mesmo tx_hash, mesmo que com outra taxa
+    assert len(pool) == 1 and pool.fee_of(first.tx_hash) == 1.0
+    assert pool.remove(first.tx_hash) is first and pool.remove(first.tx_hash) is None
+    assert pool.add(first)  # Depois de sair do pool pode voltar
+
+
+@pytest.mark.parametrize("fee", [-0.01, math.nan, math.inf, -math.inf, "1.0", None])
+def test_invalid_fees_are_rejected(fee):
+    pool = Mempool()
+    assert not pool.add(tx("alice"), fee)
+    assert len(pool) == 0 and pool.total_bytes == 0 and pool.overlay.delta("alice") == 0.0
+
+
+def test_template_orders_by_fee_rate():
+    pool = Mempool(sizer=lambda t, _fee: 200 if t.sender == "big" else 100)
+    low, high, big = tx("low"), tx("high"), tx("big")
+    pool.add(low, 1.0)     # 0.01 / byte
+    pool.add(big, 3.0)     # 0.015 / byte
+    pool.add(high, 2.0)    # 0.02 / byte
+    assert pool.block_template() == [high, big, low]
+    assert pool.block_template(max_bytes=300) == [high, big]
+    assert pool.block_template(max_bytes=250) == [high, low]  # big não cabe: passa para a próxima
+
+
+def test_sender_order_is_fifo():
+    pool = Mempool(sizer=fixed_size)
+    first, second, third = tx("alice", ts=1), tx("alice", ts=2), tx("alice", ts=3)
+    other = tx("carol")
+    pool.add(first, 0.0)
+    pool.add(second, 9.0)   # Taxa alta não fura a fila do próprio remetente
+    pool.add(third, 1.0)
+    pool.add(other, 0.5)
+    template = pool.block_template()
+    assert [t for t in template if t.sender == "alice"] == [first, second, third]
+    assert template.index(other) < template.index(first)  # Entre remetentes vale o fee rate
+    assert pool.block_template(max_bytes=150) == [other]
+
+
+def test_byte_cap_evicts_lowest_fee_rate_and_its_successors():
+    pool = Mempool(max_bytes=300, sizer=fixed_size)
+    cheap_1, cheap_2 = tx("cheap", ts=1), tx("cheap", ts=2)
+    rich = tx("rich")
+    pool.add(cheap_1, 0.1)
+    pool.add(cheap_2, 5.0)
+    pool.add(rich, 1.0)
+    assert pool.total_bytes == 300 and pool.evicted == 0
+    newcomer = tx("newcomer")
+    assert pool.add(newcomer, 2.0)
+    # cheap_1 tem a menor taxa; cheap_2 ficaria órfã sem ela e sai junto
+    assert set(pool) == {rich, newcomer}
+    assert pool.evicted == 2 and pool.total_bytes == 200
+    assert pool.overlay.delta("cheap") == pytest.approx(0.0)
+    assert pool.add(tx("filler"), 3.0)
+    assert not pool.add(tx("broke"), 0.0)  # Pool cheio: a própria recém-chegada é a despejada
+    assert len(pool) == 3 and pool.total_bytes == 300 and pool.overlay.delta("broke") == 0.0
+
+
+def test_fee_is_set_only_on_admission():
+    pool = Mempool(max_bytes=200, sizer=fixed_size)
+    admitted = tx("alice")
+    assert pool.add(admitted, 2.0) and admitted.fee == 2.0
+    duplicate = tx("alice")
+    duplicate.fee = 0.25
+    assert not pool.add(duplicate, 9.0) and duplicate.fee == 0.25
+    assert pool.add(tx("carol"), 1.0)
+    evicted = tx("broke")
+    assert not pool.add(evicted, 0.5)  # Menor fee rate: despejada na própria chegada
+    assert getattr(evicted, 'fee', 0.0) == 0.0 and pool.overlay.delta("broke") == 0.0
+
+
+def test_fee_is_debited_from_sender_and_paid_to_miner(tmp_path):
+    chain = BitcoinBlockchain(difficulty=1, data_dir=str(tmp_path))
+    chain.mine_pending_transactions("alice")
+    reward = chain.get_mining_reward()
+    assert chain.add_transaction(tx("alice", "bob", 10.0, ts=5.0), fee=0.5)
+    assert chain.ledger.balance("alice", chain.chain, chain.pending_transactions) == reward - 10.5
+    chain.mine_pending_transactions("miner")
+    assert chain.get_balance("alice") == reward - 10.5
+    assert chain.get_balance("bob") == 10.0
+    assert chain.get_balance("miner") == reward + 0.5
+    assert chain.chain[-1].transactions[0].fee == 0.5
+    chain.close()
+
+    # A taxa é persistida no bloco: a reconstrução a partir do disco chega aos mesmos saldos
+    reopened = BitcoinBlockchain(difficulty=1, data_dir=str(tmp_path))
+    reopened.ledger.rebuild(reopened.chain)
+    assert reopened.get_balance("alice") == reward - 10.5 and reopened.get_balance("miner") == reward + 0.5
+    assert reopened.is_chain_valid()
+    reopened.close()
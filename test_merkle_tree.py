@@ -0,0 +1,81 @@
+"""MerkleTree: raiz igual à do calculate_merkle_root antigo, provas de inclusão e provas adulteradas."""
+import hashlib
+
+import pytest
+
+from bitcoin_blockchain import Block, Transaction
+from merkle_tree import MerkleTree, proof_from_hex, proof_to_hex, verify_proof, verify_proof_hex
+
+
+def baseline_root(tx_hashes):
+    """Block.calculate_merkle_root antigo (hex, duplicando o último de níveis ímpares)."""
+    if not tx_hashes:
+        return hashlib.sha256(b'').hexdigest()
+    tx_hashes = list(tx_hashes)
+    while len(tx_hashes) > 1:
+        if len(tx_hashes) % 2 != 0:
+            tx_hashes.append(tx_hashes[-1])
+        tx_hashes = [hashlib.sha256((tx_hashes[i] + tx_hashes[i + 1]).encode()).hexdigest()
+                     for i in range(0, len(tx_hashes), 2)]
+    return tx_hashes[0]
+
+
+def leaves(n):
+    return [hashlib.sha256(f"tx_{i}".encode()).hexdigest() for i in range(n)]
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 4, 5, 7, 8, 13])
+def test_root_matches_baseline(n):
+    hashes = leaves(n)
+    assert MerkleTree.from_hex(hashes).root_hex == baseline_root(hashes)
+    # Construída folha a folha (append) chega à mesma raiz
+    tree = MerkleTree()
+    for h in hashes:
+        tree.append(bytes.fromhex(h))
+        assert tree.root_hex == baseline_root(hashes[:len(tree)])
+
+
+def test_update_and_block_cache_match_baseline():
+    hashes = leaves(6)
+    tree = MerkleTree.from_hex(hashes)
+    hashes[3] = hashlib.sha256(b"outra").hexdigest()
+    tree.update(3, bytes.fromhex(hashes[3]))
+    assert tree.root_hex == baseline_root(hashes)
+
+    block = Block(1, [Transaction("a", f"b_{i}", float(i), timestamp=1) for i in range(3)], "0" * 64)
+    block.transactions.append(Transaction("c", "d", 9.0, timestamp=2))  # Só append: estende o cache
+    assert block.calculate_merkle_root() == baseline_root([tx.tx_hash for tx in block.transactions])
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 8])
+def test_every_proof_round_trips(n):
+    hashes = leaves(n)
+    tree = MerkleTree.from_hex(hashes)
+    for i, h in enumerate(hashes):
+        proof = tree.proof(i)
+        assert verify_proof(bytes.fromhex(h), proof, tree.root)
+        assert verify_proof_hex(h, proof_to_hex(proof), tree.root_hex)
+        assert proof_from_hex(proof_to_hex(proof)) == proof
+    with pytest.raises(IndexError):
+        tree.proof(n)
+
+
+def test_tampered_proofs_are_rejected():
+    hashes = leaves(5)
+    tree = MerkleTree.from_hex(hashes)
+    leaf, proof, root = bytes.fromhex(hashes[2]), tree.proof(2), tree.root
+    sibling, is_right = proof[0]
+    forged = bytes([sibling[0] ^ 1]) + sibling[1:]
+    assert not verify_proof(leaf, [(forged, is_right)] + proof[1:], root)   # Irmão alterado
+    assert not verify_proof(leaf, [(sibling, not is_right)] + proof[1:], root)  # Lado trocado
+    assert not verify_proof(leaf, proof[:-1], root)                          # Passo faltando
+    assert not verify_proof(bytes.fromhex(hashes[3]), proof, root)           # Outra folha
+    assert not verify_proof(leaf, proof, hashlib.sha256(b"x").digest())     # Outra raiz
+
+
+def test_block_merkle_proof():
+    txs = [Transaction("a", f"b_{i}", float(i), timestamp=1) for i in range(3)]
+    block = Block(1, txs, "0" * 64)
+    proof = block.merkle_proof(txs[1].tx_hash)
+    assert verify_proof_hex(txs[1].tx_hash, proof, block.merkle_root)
+    assert block.merkle_proof("ff" * 32) is None
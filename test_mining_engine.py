@@ -0,0 +1,101 @@
+"""MiningEngine: serial x paralelo, start_nonce, cancelamento e progresso."""
+import hashlib
+import threading
+
+import pytest
+
+from mining_engine import (PROGRESS_INTERVAL, HeaderHasher, MiningCancelled, MiningEngine, difficulty_target,
+                           meets_target)
+
+PREFIX, SUFFIX = "1" + "0" * 64 + "1700000000.0", "merkle"
+
+
+def first_valid_nonce(difficulty, start_nonce=0):
+    nonce = start_nonce + 1
+    while not hashlib.sha256(f"{PREFIX}{nonce}{SUFFIX}".encode()).hexdigest().startswith('0' * difficulty):
+        nonce += 1
+    return nonce
+
+
+def test_serial_finds_first_nonce_after_start():
+    engine = MiningEngine(workers=1)
+    expected = first_valid_nonce(3)
+    assert engine.mine(PREFIX, SUFFIX, 3) == (expected, HeaderHasher(PREFIX, SUFFIX).hexdigest(expected))
+    nonce, digest = engine.mine(PREFIX, SUFFIX, 3, start_nonce=expected)
+    assert nonce == first_valid_nonce(3, expected) and digest.startswith('000')
+    assert engine.last_hash_count == nonce - expected
+
+
+def test_parallel_result_is_valid_and_not_before_serial():
+    serial = MiningEngine(workers=1).mine(PREFIX, SUFFIX, 4, start_nonce=1000)
+    parallel = MiningEngine(workers=2, min_parallel_difficulty=1)
+    nonce, digest = parallel.mine(PREFIX, SUFFIX, 4, start_nonce=1000)
+    # Qualquer worker pode vencer; o serial acha o menor nonce válido
+    assert nonce >= serial[0] > 1000
+    assert digest == HeaderHasher(PREFIX, SUFFIX).hexdigest(nonce) and digest.startswith('0000')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cancel_event_stops_search(workers):
+    cancel = threading.Event()
+    cancel.set()
+    engine = MiningEngine(workers=workers, min_parallel_difficulty=1)
+    with pytest.raises(MiningCancelled):
+        engine.mine(PREFIX, SUFFIX, 64, cancel_event=cancel)
+
+
+def test_parallel_reports_progress():
+    cancel, reports = threading.Event(), []
+
+    def on_progress(nonce, digest):
+        reports.append((nonce, digest))
+        cancel.set()
+
+    engine = MiningEngine(workers=2, min_parallel_difficulty=1)
+    with pytest.raises(MiningCancelled):
+        engine.mine(PREFIX, SUFFIX, 64, on_progress=on_progress, cancel_event=cancel)
+    nonce, digest = reports[0]
+    assert nonce >= PROGRESS_INTERVAL and digest == HeaderHasher(PREFIX, SUFFIX).hexdigest(nonce)
+
+
+def old_hash(block):
+    """calculate_hash antes do midstate (f-string completa + hexdigest), por tipo de bloco."""
+    from singularity_coin import SingularityBlock
+    if isinstance(block, SingularityBlock):
+        proof = str(block.manifold_proof) if block.manifold_proof is not None else ""
+        lattice = str(block.lattice_witness) if block.lattice_witness is not None else ""
+        data = f"{block.index}{block.previous_hash}{block.timestamp}{block.merkle_root}{block.nonce}{proof}{lattice}"
+    elif hasattr(block, 'merkle_root'):
+        data = f"{block.index}{block.previous_hash}{block.timestamp}{block.merkle_root}{block.nonce}"
+    else:
+        data = f"{block.index}{block.timestamp}{len(block.transactions)}{block.previous_hash}{block.nonce}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def test_midstate_hash_matches_old_calculate_hash():
+    from bitcoin_blockchain import Block, Transaction
+    from simple_app import SimpleBlock
+    from singularity_coin import SingularityBlock
+    txs = [Transaction("alice", "bob", 1.5), Transaction("bob", "carol", 0.25)]
+    singular = SingularityBlock(3, txs, "ab" * 32)
+    singular.manifold_proof, singular.lattice_witness = "THE_VOID_GEOMETRY", [1, 2, 3]
+    bare = SingularityBlock(4, txs, "cd" * 32)  # Sem prova nem testemunha: sufixo vazio
+    for block in (Block(1, txs, "0" * 64), SimpleBlock(2, [{'amount': 1}], "ff" * 32), singular, bare):
+        for nonce in (0, 7, 10 ** 12):
+            block.nonce = nonce
+            assert block.calculate_hash() == old_hash(block)
+        block.nonce = 0
+        block.mine_block(2, engine=MiningEngine(workers=1))
+        assert block.hash == old_hash(block) and block.hash.startswith('00')
+
+
+@pytest.mark.parametrize('difficulty', [1, 2, 5, 63, 64, 65])
+def test_target_boundary_matches_zero_prefix(difficulty):
+    target = difficulty_target(difficulty)
+    limit = 16 ** max(64 - difficulty, 0)
+    for value in (0, 1, limit - 1, limit, limit + 1, 2 ** 256 - 1):
+        if not 0 <= value < 2 ** 256:
+            continue
+        digest = value.to_bytes(32, 'big')
+        assert meets_target(digest, target) == digest.hex().startswith('0' * difficulty), (difficulty, value)
+    assert meets_target(b'\xff' * 32, difficulty_target(0))
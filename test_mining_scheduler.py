@@ -0,0 +1,148 @@
+"""Fila de mineração: worker único, fila limitada, cancelamento por novo topo."""
+import threading
+import time
+
+import pytest
+
+from bitcoin_blockchain import BitcoinBlockchain, Block, Transaction
+from mining_engine import MiningEngine
+from mining_scheduler import (JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_MINING, MiningJob, MiningScheduler,
+                              QueueFull)
+
+
+@pytest.fixture
+def chain():
+    return BitcoinBlockchain(difficulty=1)
+
+
+def test_jobs_are_mined_one_at_a_time(chain):
+    events = []
+    scheduler = MiningScheduler(chain, max_queue=8, emit=lambda event, data: events.append((event, data)))
+    jobs = [scheduler.submit(f"miner_{i}") for i in range(4)]
+    for job in jobs:
+        assert job.wait(30)
+    scheduler.stop()
+    assert [job.status for job in jobs] == [JOB_DONE] * 4
+    assert sorted(job.block_index for job in jobs) == [1, 2, 3, 4]
+    assert len(chain.chain) == 5 and chain.is_chain_valid()
+    mined = [data for event, data in events if event == 'block_mined']
+    assert [data['job_id'] for data in mined] == [job.job_id for job in jobs]
+
+
+def test_burst_is_bounded_by_queue(chain):
+    chain.difficulty = 64  # Inalcançável: o worker fica preso no primeiro job
+    scheduler = MiningScheduler(chain, engine=MiningEngine(workers=1), max_queue=2)
+    first = scheduler.submit("a")
+    accepted, rejected = [first], 0
+    for _ in range(10):
+        try:
+            accepted.append(scheduler.submit("b"))
+        except QueueFull:
+            rejected += 1
+    assert len(accepted) <= 4 and rejected >= 7
+    for job in accepted:
+        scheduler.cancel(job.job_id)
+    assert all(job.wait(10) for job in accepted)
+    scheduler.stop()
+    assert {job.status for job in accepted} == {JOB_CANCELLED}
+    assert len(chain.chain) == 1
+
+
+def test_competing_block_restarts_attempt(chain):
+    chain.difficulty = 64
+    scheduler = MiningScheduler(chain, engine=MiningEngine(workers=1))
+    mining = threading.Event()
+    scheduler.emit = lambda event, data: event == 'mining_progress' and mining.set()
+    job = scheduler.submit("slow_miner")
+    assert mining.wait(30)
+
+    # Outro minerador publica um bloco válido no mesmo topo
+    competitor = Block(len(chain.chain), [], chain.get_latest_block().hash)
+    competitor.mine_block(1)
+    assert chain.commit_block(competitor, [])
+
+    mining.clear()
+    assert mining.wait(30)  # Voltou a minerar, agora em cima do novo topo
+    assert job.restarts >= 1
+    scheduler.cancel(job.job_id)
+    assert job.wait(10) and job.status == JOB_CANCELLED
+    scheduler.stop()
+    assert chain.get_latest_block() is competitor
+
+
+def test_cancelled_queued_jobs_free_their_slots(chain):
+    chain.difficulty = 64
+    scheduler = MiningScheduler(chain, engine=MiningEngine(workers=1), max_queue=2)
+    running = scheduler.submit("a")
+    for _ in range(100):
+        if running.status == JOB_MINING:
+            break
+        time.sleep(0.05)
+    queued = [scheduler.submit("b"), scheduler.submit("c")]
+    with pytest.raises(QueueFull):
+        scheduler.submit("d")
+    for job in queued:
+        assert scheduler.cancel(job.job_id) and job.status == JOB_CANCELLED
+    assert scheduler.stats()['queued'] == 0
+    later = [scheduler.submit("e"), scheduler.submit("f")]  # Antes: 429 com a fila só de cancelados
+    assert [scheduler.queue_position(job) for job in later] == [0, 1]
+    for job in [running] + later:
+        scheduler.cancel(job.job_id)
+    assert all(job.wait(10) for job in [running] + later)
+    scheduler.stop()
+
+
+def test_finish_is_idempotent(chain):
+    events = []
+    scheduler = MiningScheduler(chain, emit=lambda event, data: events.append(data['status']))
+    job = MiningJob("a")
+    threads = [threading.Thread(target=scheduler._finish, args=(job, status))
+               for status in (JOB_DONE, JOB_CANCELLED) * 4]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert job.status in (JOB_DONE, JOB_CANCELLED) and events == [job.status]
+    assert not scheduler._finish(job, JOB_FAILED, error="tarde demais") and job.error is None
+
+
+def test_block_mined_reports_block_reward(chain):
+    chain.halving_interval = 1  # Já no bloco 1 o subsídio cai pela metade
+    chain.mine_pending_transactions("alice")
+    assert chain.add_transaction(Transaction("alice", "bob", 1.0, timestamp=3.0), fee=0.75)
+    events = []
+    scheduler = MiningScheduler(chain, emit=lambda event, data: events.append((event, data)))
+    job = scheduler.submit("miner")
+    assert job.wait(30) and job.status == JOB_DONE
+    scheduler.stop()
+    mined = [data for event, data in events if event == 'block_mined']
+    assert mined[0]['reward'] == chain.mining_reward / 4 + 0.75
+    assert mined[0]['reward'] == chain.chain[-1].transactions[-1].amount
+
+
+def test_nonces_tried_counts_from_the_attempt_start(chain, monkeypatch):
+    chain.difficulty = 64
+    prepare = chain.prepare_block
+
+    def far_start(miner_address):
+        block, included = prepare(miner_address)
+        block.nonce = 10 ** 9  # Tentativa que não começa do zero
+        return block, included
+
+    monkeypatch.setattr(chain, "prepare_block", far_start)
+    progress = []
+    seen = threading.Event()
+
+    def emit(event, data):
+        if event == 'mining_progress':
+            progress.append(data['nonce'])
+            seen.set()
+
+    scheduler = MiningScheduler(chain, engine=MiningEngine(workers=1), emit=emit)
+    job = scheduler.submit("slow_miner")
+    assert seen.wait(30)
+    scheduler.cancel(job.job_id)
+    assert job.wait(10)
+    scheduler.stop()
+    assert progress[0] > 10 ** 9
+    assert 0 < job.nonces_tried <= progress[-1] - 10 ** 9
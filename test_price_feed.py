@@ -0,0 +1,190 @@
+"""Feed de preços: buffer circular, conflação para assinantes lentos, reconexão com backoff."""
+import base64
+import hashlib
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import pytest
+
+from bitcoin_api import BitcoinAPI
+from price_feed import PriceFeed
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class StubTickerServer(socketserver.ThreadingTCPServer):
+    """Servidor WebSocket mínimo (RFC 6455) que envia tickers no formato da Binance.
+
+    Cada conexão recebe `ticks_per_connection` mensagens; com drop=True o servidor fecha
+    a conexão em seguida (força reconexão), senão a mantém aberta até o cliente sair.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, ticks_per_connection=10, drop=False):
+        super().__init__(('127.0.0.1', 0), StubTickerHandler)
+        self.ticks_per_connection = ticks_per_connection
+        self.drop = drop
+        self.connections = 0
+        self.sent = 0
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.server_address[1]}/ws/btcusdt@ticker"
+
+
+class StubTickerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        conn, server = self.request, self.server
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return
+            request += chunk
+        key = next(line.split(':', 1)[1].strip() for line in request.decode().split('\r\n')
+                   if line.lower().startswith('sec-websocket-key'))
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        conn.sendall(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+        server.connections += 1
+        for _ in range(server.ticks_per_connection):
+            server.sent += 1
+            payload = json.dumps({'e': '24hrTicker', 'E': int(time.time() * 1000),
+                                  'c': f"{50000 + server.sent:.2f}"}).encode()
+            conn.sendall(self.frame(0x1, payload))
+        if server.drop:
+            conn.sendall(self.frame(0x8, b''))
+            return
+        conn.settimeout(0.2)
+        while True:  # Mantém aberta até o cliente fechar
+            try:
+                if not conn.recv(1024):
+                    return
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+
+    @staticmethod
+    def frame(opcode, payload):
+        if len(payload) < 126:
+            header = struct.pack('!BB', 0x80 | opcode, len(payload))
+        else:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, len(payload))
+        return header + payload
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = StubTickerServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_ring_buffer_keeps_latest_ticks(stub):
+    server = stub(ticks_per_connection=50)
+    feed = PriceFeed(server.url, buffer_size=10).start()
+    try:
+        assert wait_until(lambda: feed.ticks_received == 50)
+        assert len(feed.buffer) == 10
+        assert feed.latest().price == 50050.0
+        assert [tick.price for tick in feed.recent(3)] == [50048.0, 50049.0, 50050.0]
+        stats = feed.stats()
+        assert stats['connected'] and stats['reconnects'] == 0
+        assert stats['exchange_latency_p50'] is not None
+    finally:
+        feed.stop()
+
+
+def test_slow_subscriber_gets_conflated_latest_price(stub):
+    server = stub(ticks_per_connection=500)
+    feed = PriceFeed(server.url)
+    seen = []
+
+    def slow(tick):
+        seen.append(tick.price)
+        time.sleep(0.05)
+
+    subscription = feed.subscribe(slow)
+    fast = feed.subscribe()
+    feed.start()
+    try:
+        # A leitora não espera o assinante lento
+        assert wait_until(lambda: feed.ticks_received == 500, timeout=5)
+        assert wait_until(lambda: seen and seen[-1] == 50500.0)
+        assert len(seen) < 500
+        assert subscription.delivered + subscription.conflated == 500
+        assert fast.get(timeout=1).price == 50500.0  # Pull também recebe só o mais recente
+        assert fast.get(timeout=0.05) is None
+    finally:
+        feed.stop()
+
+
+def test_reconnects_on_one_reader_thread(stub):
+    server = stub(ticks_per_connection=3, drop=True)
+    # Leitores de feeds de outros testes ainda encerrando não contam
+    before = {t for t in threading.enumerate() if t.name == 'price-feed-reader'}
+    feed = PriceFeed(server.url, backoff_initial=0.01, backoff_max=0.05).start()
+    try:
+        reader = feed._thread
+        assert wait_until(lambda: feed.connects >= 4)
+        readers = {t for t in threading.enumerate() if t.name == 'price-feed-reader'} - before
+        assert readers == {reader} and feed._thread is reader
+        assert feed.reconnects == feed.connects - 1
+        assert feed.ticks_received >= 9
+    finally:
+        feed.stop()
+    assert not feed.running
+
+
+def test_backoff_limits_attempts_while_upstream_is_down():
+    attempts = []
+
+    def refuse(url):
+        attempts.append(time.time())
+        raise ConnectionRefusedError("upstream fora do ar")
+
+    feed = PriceFeed('ws://invalid', backoff_initial=0.05, backoff_max=0.2, connect=refuse).start()
+    time.sleep(1.0)
+    feed.stop()
+    # 0.05, 0.1, 0.2, 0.2... (com jitter): algumas tentativas, não um laço apertado
+    assert 3 <= len(attempts) <= 25
+    assert feed.stats()['last_error'] == "upstream fora do ar"
+
+
+def test_bitcoin_api_websocket_uses_price_feed(stub):
+    server = stub(ticks_per_connection=20)
+    api = BitcoinAPI()
+    api.ws_url = server.url
+    received = []
+    api.start_websocket(lambda price, data: received.append((price, data['c'])))
+    try:
+        assert wait_until(lambda: received and received[-1][0] == 50020.0)
+        assert wait_until(lambda: api.current_price == 50020.0)
+        assert api.price_feed_stats()['ticks_received'] == 20
+    finally:
+        api.stop_websocket()
+        api.close()
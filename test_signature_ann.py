@@ -0,0 +1,49 @@
+"""LSH das assinaturas topológicas: recall contra a força bruta e shortlist no FaceTemplateIndex."""
+import cv2
+import numpy as np
+
+from face_index import FaceTemplateIndex, membrane_hash
+from signature_ann import SignatureLSH, brute_force, js_divergence, perturb, synthetic_gallery
+from topological_kernel import TopologicalKernel
+
+
+def test_lsh_recall_and_exact_rerank():
+    rng = np.random.default_rng(3)
+    gallery = synthetic_gallery(5000, seed=3)
+    index = SignatureLSH().fit(gallery)
+    targets = rng.choice(len(gallery), 50, replace=False)
+    hits = 0
+    for target, probe in zip(targets, perturb(gallery[targets], 0.1, rng)):
+        ids, js = index.query(probe, k=10)
+        assert np.all(np.diff(js) >= 0)
+        np.testing.assert_allclose(js, js_divergence(gallery[ids], probe))
+        kernel_js = TopologicalKernel().compute_geodesic_distance(gallery[ids[0]], probe) ** 2
+        assert abs(js[0] - kernel_js) < 1e-9
+        hits += ids[0] == brute_force(gallery, probe, 1)[0][0]
+        assert index.last_stats['candidates'] < len(gallery)
+    assert hits >= 48
+
+
+def test_face_index_shortlist(tmp_path):
+    kernel = TopologicalKernel()
+    rng = np.random.default_rng(8)
+    faces = {}
+    for u in range(20):
+        coarse = rng.integers(0, 256, (6, 6)).astype(np.float32)
+        base = np.clip(cv2.resize(coarse, (100, 100), interpolation=cv2.INTER_CUBIC), 0, 255)
+        manifold = []
+        for _ in range(3):
+            angle = np.clip(base + rng.normal(0, 5, base.shape), 0, 255).astype(np.uint8)
+            manifold.append({'mean': angle, 'top_sig': kernel.extract_signature(angle)})
+        np.savez(str(tmp_path / f'user{u:02d}.npz'), manifold=manifold,
+                 membrane_hash=membrane_hash(manifold=manifold), version="1.1.0_manifold")
+        faces[f'user{u:02d}'] = base
+    exact = FaceTemplateIndex(str(tmp_path), verbose=False, ann_min_templates=None)
+    approx = FaceTemplateIndex(str(tmp_path), verbose=False, ann_min_templates=1, shortlist=30)
+    for user, base in faces.items():
+        probe = np.clip(base + rng.normal(0, 5, base.shape), 0, 255).astype(np.uint8)
+        sig = kernel.extract_signature(probe)
+        assert approx.identify(probe, sig) == exact.identify(probe, sig)
+        assert approx.identify(probe, sig)[0] == user
+        assert approx.last_stats['shortlist'] <= 30
+    assert exact._stack.ann is None and approx._stack.ann is not None
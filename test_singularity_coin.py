@@ -0,0 +1,54 @@
+"""SingularityCoin: bloco PoHM paga subsídio + taxas e conserva a oferta total."""
+import numpy as np
+import pytest
+
+from bitcoin_blockchain import Transaction
+from singularity_coin import SingularityBlock, SingularityCoin
+
+
+def test_pohm_block_conserves_supply_with_fees():
+    coin = SingularityCoin(difficulty=1)
+    subsidy = coin.get_mining_reward()
+    coin.mine_pending_transactions("alice")
+    assert coin.add_transaction(Transaction("alice", "bob", 10.0, timestamp=5.0), fee=0.5)
+    assert coin.add_transaction(Transaction("bob", "carol", 0.0, timestamp=6.0), fee=0.0)
+
+    top_sig = np.random.default_rng(7).random(64)
+    block = coin.mine_biometric_block("operador", top_sig, 0.95)
+    assert isinstance(block, SingularityBlock) and block.manifold_proof is not None
+    miner = block.transactions[-1].recipient
+    assert block.transactions[-1].sender == "SINGULARITY_RESERVE"
+    assert block.transactions[-1].amount == pytest.approx(subsidy + 0.5)
+    assert not coin.pending_transactions
+
+    balances = {address: coin.get_balance(address) for address in ("alice", "bob", "carol", miner)}
+    assert balances["alice"] == pytest.approx(subsidy - 10.5)
+    assert balances[miner] == pytest.approx(subsidy + 0.5)
+    # Taxas só trocam de mãos: circula exatamente o que foi cunhado pelos dois subsídios
+    assert sum(balances.values()) == pytest.approx(2 * subsidy)
+    assert coin.is_chain_valid()
+
+
+def test_low_resonance_is_rejected():
+    coin = SingularityCoin(difficulty=1)
+    assert coin.mine_biometric_block("operador", np.zeros(64), 0.5) is None
+    assert len(coin.chain) == 1
+
+
+def test_stale_tip_rebuilds_the_template(monkeypatch):
+    coin = SingularityCoin(difficulty=1)
+    original = coin.commit_block
+    attempts = []
+
+    def racing_commit(block, included):
+        attempts.append(block.previous_hash)
+        if len(attempts) == 1:
+            rival, included = coin.prepare_block("rival")  # Outro bloco chega durante o PoW
+            rival.mine_block(coin.difficulty)
+            assert original(rival, included)
+        return original(block, included)
+
+    monkeypatch.setattr(coin, "commit_block", racing_commit)
+    block = coin.mine_biometric_block("operador", np.ones(64), 0.9)
+    assert block is not None and block.index == 2 and len(attempts) == 2
+    assert coin.chain[-1] is block and block.previous_hash == coin.chain[1].hash
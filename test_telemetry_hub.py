@@ -0,0 +1,99 @@
+"""TelemetryHub: deltas JSON Patch por tópico, flush acumulado, snapshots e clientes lentos."""
+import asyncio
+import json
+
+import pytest
+
+from telemetry_hub import TelemetryHub, apply_patch, diff
+
+
+def state(resonance=0.5, blocks=1, user='alice'):
+    return {
+        "biometric": {"resonance": resonance, "entropy": 0.1, "focus_score": 0.7, "liveness": "SCANNING"},
+        "vocal_sync": {"kinetic_res": 0.7, "vocal_salt": "0x00000000", "status": "SYNCING"},
+        "financial": {"balance_sig": 50.0, "blocks": blocks, "last_hash": "N/A"},
+        "terminal_status": "BRIDGE_LIVE", "user": user, "wallet": "LOCKED",
+    }
+
+
+def test_diff_round_trip():
+    old = {'a': 1, 'b': {'c': [1, 2], 'x/y': 'k'}, 'gone': True}
+    new = {'a': 1, 'b': {'c': [1, 3], 'x/y': 'z', 'n': None}, 'flag': 1.0}
+    ops = diff(old, new)
+    assert {'op': 'remove', 'path': '/gone'} in ops
+    assert {'op': 'replace', 'path': '/b/x~1y', 'value': 'z'} in ops
+    assert apply_patch(json.loads(json.dumps(old)), ops) == new
+    assert diff(new, json.loads(json.dumps(new))) == []
+    assert diff({'v': 1}, {'v': True}) == [{'op': 'replace', 'path': '/v', 'value': True}]
+
+
+def test_flush_sends_one_delta_per_changed_topic_to_subscribers():
+    hub = TelemetryHub(flush_interval=0.1)
+    hub.publish_state(state())
+    hub.flush()
+    bio, fin = hub.subscribe(['biometric']), hub.subscribe(['financial', 'session'])
+    snapshot = json.loads(bio.drain()[0])
+    assert snapshot['type'] == 'snapshot' and set(snapshot['state']) == {'biometric'}
+    fin.drain()
+
+    assert hub.publish_state(state()) == 0 and hub.flush() == 0  # Nada mudou: nada sai
+    hub.publish_state(state(resonance=0.6))
+    hub.publish_state(state(resonance=0.9))  # Acumulado: só o último valor vai no delta
+    hub.publish_state(state(resonance=0.9, user='bob'))
+    assert hub.flush() == 2
+    patch = json.loads(bio.drain()[0])
+    assert patch['ops'] == [{'op': 'replace', 'path': '/biometric/resonance', 'value': 0.9}]
+    assert [json.loads(m)['topic'] for m in fin.drain()] == ['session']
+
+    hub.publish('financial', {"balance_sig": 1.0, "blocks": 9, "last_hash": "0xAB"})
+    hub.flush()
+    patch = json.loads(fin.drain()[0])  # Tópico inteiro mudou: um replace só
+    assert patch['ops'] == [{'op': 'replace', 'path': '/financial', 'value': hub.sent['financial']}]
+    with pytest.raises(ValueError):
+        hub.subscribe(['weather'])
+
+
+def test_slow_clients_conflate_or_drop():
+    for policy in ('conflate', 'drop'):
+        hub = TelemetryHub(flush_interval=0, max_pending=3, slow_policy=policy)
+        hub.publish_state(state())
+        sub = hub.subscribe()
+        sub.drain()
+        for blocks in range(2, 8):
+            hub.publish_state(state(blocks=blocks))
+        if policy == 'conflate':
+            messages = sub.drain()
+            assert len(messages) == 1 and json.loads(messages[0])['state']['financial']['blocks'] == 7
+            assert hub.stats()['conflated'] >= 1
+        else:
+            assert sub.closed and hub.stats()['dropped'] == 1 and hub.clients == 0
+            assert asyncio.run(sub.next_batch()) == []
+
+
+def test_run_delivers_deltas_and_periodic_snapshots():
+    async def scenario():
+        hub = TelemetryHub(flush_interval=0.01, snapshot_interval=0.15)
+        hub.publish_state(state())
+        task = asyncio.ensure_future(hub.run())
+        sub = hub.subscribe(['biometric'])
+        view, kinds = {}, []
+
+        def receive(messages):
+            nonlocal view
+            for message in messages:
+                data = json.loads(message)
+                kinds.append(data['type'])
+                view = data['state'] if data['type'] == 'snapshot' else apply_patch(view, data['ops'])
+
+        for step in range(6):
+            hub.publish_state(state(resonance=step / 10))
+            receive(await asyncio.wait_for(sub.next_batch(), timeout=1))
+            await asyncio.sleep(0.04)
+        await asyncio.sleep(0.03)
+        receive(sub.drain())
+        task.cancel()
+        return hub, view, kinds
+
+    hub, view, kinds = asyncio.run(scenario())
+    assert kinds[0] == 'snapshot' and 'patch' in kinds and kinds.count('snapshot') >= 2
+    assert view == {'biometric': hub.sent['biometric']}
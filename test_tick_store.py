@@ -0,0 +1,109 @@
+"""Loja de ticks: colunas memmap, candles OHLCV incrementais, consultas por intervalo."""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from price_feed import PriceTick
+from tick_store import INTERVALS, TickRecorder, TickStore
+
+START = 1_700_000_000_000
+
+
+def brute_candles(ts, price, volume, step):
+    candles = {}
+    for t, p, v in zip(ts.tolist(), price.tolist(), volume.tolist()):
+        bucket = t - t % step
+        if bucket not in candles:
+            candles[bucket] = [bucket, p, p, p, p, 0.0]
+        c = candles[bucket]
+        c[2], c[3], c[4], c[5] = max(c[2], p), min(c[3], p), p, c[5] + v
+    return np.array(sorted(candles.values()))
+
+
+@pytest.fixture
+def ticks():
+    rng = np.random.default_rng(3)
+    ts = START + np.cumsum(rng.integers(0, 20_000, 20_000))
+    return ts, 40000 + rng.normal(0, 50, len(ts)).cumsum(), rng.random(len(ts))
+
+
+def test_incremental_rollup_matches_brute_force(tmp_path, ticks):
+    ts, price, volume = ticks
+    store = TickStore(str(tmp_path))
+    for lo in range(0, len(ts), 777):  # Lotes que cortam candles no meio
+        store.append_ticks(ts[lo:lo + 777], price[lo:lo + 777], volume[lo:lo + 777])
+    for name, step in INTERVALS.items():
+        expected = brute_candles(ts, price, volume, step)
+        got = np.column_stack(store.get_candles(name))
+        np.testing.assert_allclose(got, expected)
+        assert len(store.get_candles(name, include_open=False).ts) == len(expected) - 1
+    store.close()
+
+
+def test_reopen_recovers_open_candle_and_partial_write(tmp_path, ticks):
+    ts, price, volume = ticks
+    store = TickStore(str(tmp_path))
+    store.append_ticks(ts, price, volume)
+    before = store.get_candles('1h')
+    store.close()
+    # Simula crash: metade de um tick gravada só na coluna de preço
+    with open(os.path.join(str(tmp_path), 'ticks', 'price.f8'), 'ab') as f:
+        f.write(b'\x00' * 4)
+
+    store = TickStore(str(tmp_path))
+    assert store.stats()['ticks'] == len(ts)
+    for before_col, after_col in zip(before, store.get_candles('1h')):
+        np.testing.assert_allclose(after_col, before_col)
+    store.append_tick(int(ts[-1]) + 1, 1.0)
+    assert store.get_candles('1h').low[-1] == 1.0
+    store.close()
+
+
+def test_range_queries_and_out_of_order_ticks(tmp_path, ticks):
+    ts, price, volume = ticks
+    store = TickStore(str(tmp_path))
+    store.append_ticks(ts, price, volume)
+    lo, hi = int(ts[5000]), int(ts[9000])
+    window = store.get_ticks(lo, hi)
+    mask = (ts >= lo) & (ts < hi)
+    np.testing.assert_array_equal(window.ts, ts[mask])
+    np.testing.assert_array_equal(window.price, price[mask])
+    candles = store.get_candles('5m', lo, hi)
+    assert candles.ts.min() >= lo and candles.ts.max() < hi
+
+    assert store.append_ticks([START, int(ts[-1]) + 5], [1.0, 2.0]) == 1
+    assert store.rejected == 1 and store.last_price() == 2.0
+    with pytest.raises(ValueError):
+        store.get_candles('3m')
+    store.close()
+
+
+def test_last_candles_count(tmp_path, ticks):
+    ts, price, volume = ticks
+    store = TickStore(str(tmp_path))
+    store.append_ticks(ts, price, volume)
+    full = store.get_candles('1h')
+    last = store.last_candles('1h', 3)
+    np.testing.assert_array_equal(last.ts, full.ts[-3:])
+    for count in (0, -5):  # column[-0:] devolveria o histórico inteiro
+        assert all(len(column) == 0 for column in store.last_candles('1h', count))
+    assert len(store.last_candles('1h', len(full.ts) + 10).ts) == len(full.ts)
+    store.close()
+
+
+def test_recorder_flushes_feed_ring_buffer(tmp_path):
+    buffer = []
+    feed = SimpleNamespace(recent=lambda: list(buffer))
+    store = TickStore(str(tmp_path))
+    recorder = TickRecorder(store, feed)
+    for i in range(5):
+        buffer.append(PriceTick(100.0 + i, START / 1000 + i, 1000.0 + i, {}))
+    assert recorder.flush() == 5
+    assert recorder.flush() == 0  # Nada novo no buffer
+    buffer.append(PriceTick(200.0, START / 1000 + 90, 1100.0, {}))
+    assert recorder.flush() == 1
+    candles = store.get_candles('1m')
+    assert candles.close.tolist() == [104.0, 200.0] and candles.high[0] == 104.0
+    store.close()
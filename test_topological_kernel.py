@@ -0,0 +1,76 @@
+"""TopologicalKernel: assinaturas em lote iguais ao caminho original e modo SVD randomizado."""
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+
+from topological_kernel import TopologicalKernel, batch_histogram
+
+
+def reference_signature(image, sigma=1.5, n_components=10):
+    """extract_signature original: SVD completa, np.diag, gradientes 2D e np.histogram."""
+    U, S, Vt = np.linalg.svd(image.astype(float), full_matrices=False)
+    S_clean = np.zeros_like(S)
+    S_clean[:n_components] = S[:n_components]
+    im = gaussian_filter(U @ np.diag(S_clean) @ Vt, sigma)
+    Ix, Iy = np.gradient(im, axis=1), np.gradient(im, axis=0)
+    Ixx, Iyy, Ixy = np.gradient(Ix, axis=1), np.gradient(Iy, axis=0), np.gradient(Ix, axis=0)
+    K = (Ixx * Iyy - Ixy ** 2) / ((1 + Ix ** 2 + Iy ** 2) ** 2 + 1e-10)
+    return np.histogram(K, bins=64, range=(-1, 1), density=True)[0]
+
+
+def test_batch_matches_reference():
+    rng = np.random.default_rng(4)
+    kernel = TopologicalKernel()
+    y, x = np.mgrid[:100, :100]
+    bump = 255 * np.exp(-((x - 50) ** 2 + (y - 50) ** 2) / 500)
+    faces = np.clip(bump + rng.normal(0, 10, (20, 100, 100)), 0, 255).astype(np.uint8)
+    batch = kernel.extract_signatures(faces, batch_size=7)
+    expected = np.stack([reference_signature(face) for face in faces])
+    np.testing.assert_allclose(batch, expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(kernel.extract_signature(faces[3]), expected[3], rtol=0, atol=1e-12)
+    wide = rng.integers(0, 256, (3, 40, 70)).astype(np.uint8)  # Mais larga que alta
+    np.testing.assert_allclose(kernel.extract_signatures(wide),
+                               np.stack([reference_signature(face) for face in wide]), rtol=0, atol=1e-12)
+
+
+def test_exact_mode_keeps_small_components_of_ill_conditioned_images():
+    # σ1..σ10 de 1e4 a 1e-4: pela Gram AᵀA (condição ao quadrado) os menores se perdiam
+    rng = np.random.default_rng(7)
+    U, _ = np.linalg.qr(rng.normal(size=(60, 60)))
+    V, _ = np.linalg.qr(rng.normal(size=(60, 60)))
+    S = np.concatenate([np.logspace(4, -4, 10), np.full(50, 1e-9)])
+    image = (U * S) @ V.T
+    small = (U[:, 7:10] * S[7:10]) @ V[:, 7:10].T
+    expected = (U[:, :10] * S[:10]) @ V[:, :10].T
+    cleaned = TopologicalKernel()._apply_svd_cleaning(np.stack([image, image.T]))
+    assert np.linalg.norm(cleaned[0] - expected) < 1e-6 * np.linalg.norm(small)
+    assert np.linalg.norm(cleaned[1] - expected.T) < 1e-6 * np.linalg.norm(small)
+
+
+def test_batch_histogram_edges():
+    rng = np.random.default_rng(5)
+    values = np.concatenate([rng.uniform(-1.5, 1.5, (4, 997)),
+                             np.tile(np.linspace(-1, 1, 65), (4, 1)),   # Bordas exatas dos bins
+                             np.full((4, 3), np.nan)], axis=1)
+    expected = np.stack([np.histogram(row, bins=64, range=(-1, 1), density=True)[0] for row in values])
+    np.testing.assert_array_equal(batch_histogram(values), expected)
+
+
+def test_randomized_svd_mode():
+    rng = np.random.default_rng(6)
+    low_rank = rng.normal(size=(6, 120, 8)) @ rng.normal(size=(6, 8, 90)) * 20  # Posto 8 < n_components
+    exact = TopologicalKernel()._apply_svd_cleaning(low_rank)
+    fast = TopologicalKernel(svd_mode='randomized', power_iterations=1)
+    np.testing.assert_allclose(fast._apply_svd_cleaning(low_rank), exact, atol=1e-8)
+    video = TopologicalKernel(svd_mode='randomized', power_iterations=1, reuse_basis=True)
+    for frame in low_rank:
+        np.testing.assert_allclose(video._apply_svd_cleaning(frame, stream='cam-a'), frame, atol=1e-8)
+    video._apply_svd_cleaning(low_rank[0])  # Sem stream: nada é guardado nem reaproveitado
+    video._apply_svd_cleaning(low_rank[1].T, stream='cam-b')
+    assert sorted(video._basis) == [('cam-a', (120, 90)), ('cam-b', (90, 120))]
+    video.reset_basis('cam-a')
+    assert list(video._basis) == [('cam-b', (90, 120))]
+    video.reset_basis()
+    assert video._basis == {}
+    with pytest.raises(ValueError):
+        TopologicalKernel(svd_mode='lanczos')
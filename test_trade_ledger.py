@@ -0,0 +1,101 @@
+"""Livro de trades: ordens concorrentes sem perda, recuperação por snapshot + replay, janela de recentes."""
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from bitcoin_api import TradingEngine
+from trade_ledger import InsufficientFunds, TradeLedger
+
+
+def test_concurrent_orders_do_not_lose_updates(tmp_path):
+    ledger = TradeLedger(str(tmp_path), initial_usd=1000.0, snapshot_every=50)
+    rejected = []
+
+    def trader():
+        for _ in range(200):
+            try:
+                ledger.buy(1.0, 100.0)
+            except InsufficientFunds:
+                rejected.append(1)
+
+    threads = [threading.Thread(target=trader) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 1600 tentativas contra 1000 USD: exatamente 1000 passam, saldo nunca fica negativo
+    assert ledger.seq == 1000 and len(rejected) == 600
+    assert ledger.balance_usd == pytest.approx(0.0)
+    assert ledger.balance_btc == pytest.approx(10.0)
+    ledger.close()
+
+
+def test_restart_recovers_from_snapshot_and_log_tail(tmp_path):
+    ledger = TradeLedger(str(tmp_path), snapshot_every=3)
+    for price in (100.0, 110.0, 120.0, 130.0):
+        ledger.buy(100.0, price)
+    ledger.sell(0.5, 150.0)
+    expected = ledger.balances()
+    ledger._log.close()  # "Crash": sem snapshot final
+    with open(os.path.join(str(tmp_path), 'trades.jsonl'), 'ab') as f:
+        f.write(b'{"type":"BUY","amount_u')  # Linha parcial
+
+    recovered = TradeLedger(str(tmp_path))
+    assert recovered.balances() == pytest.approx(expected)
+    assert [e['seq'] for e in recovered.history()] == [1, 2, 3, 4, 5]
+    recovered.buy(10.0, 100.0)
+    assert recovered.history(1)[0]['seq'] == 6
+    recovered.close()
+
+
+def test_cached_valuation_follows_price_marks():
+    ledger = TradeLedger(initial_usd=1000.0)
+    assert ledger.portfolio_value() is None
+    ledger.buy(500.0, 100.0)
+    assert ledger.portfolio_value() == pytest.approx(1000.0)
+    ledger.mark(200.0)
+    assert ledger.portfolio_value() == pytest.approx(1500.0)
+    with pytest.raises(InsufficientFunds):
+        ledger.sell(6.0, 200.0)
+
+
+def test_engine_trades_against_marked_price_without_network():
+    calls = []
+    api = SimpleNamespace(get_current_price=lambda: calls.append(1) or 50000.0)
+    engine = TradingEngine(api)
+    engine.ledger.mark(40000.0)  # Como faria o PriceFeed
+    assert engine.buy_bitcoin(4000.0)
+    assert not engine.sell_bitcoin(1.0)
+    assert engine.balance_btc == pytest.approx(0.1)
+    assert engine.get_portfolio_value() == pytest.approx(10000.0)
+    assert engine.trade_history[0]['type'] == 'BUY' and not calls
+    engine.ledger.marked_at -= 60  # Preço velho: volta a consultar a API
+    assert engine.get_portfolio_value() == pytest.approx(6000.0 + 0.1 * 50000.0)
+    assert calls == [1]
+
+
+def test_history_is_a_capped_window_rebuilt_at_recovery(tmp_path):
+    ledger = TradeLedger(str(tmp_path), snapshot_every=2, recent_limit=3)
+    for price in (100.0, 110.0, 120.0, 130.0, 140.0):
+        ledger.buy(10.0, price)
+    assert [e['seq'] for e in ledger.history()] == [3, 4, 5]
+    ledger._log.close()  # "Crash": seq 5 só está no log, depois do snapshot
+
+    recovered = TradeLedger(str(tmp_path), recent_limit=3)
+    assert [e['seq'] for e in recovered.history()] == [3, 4, 5]
+    recovered.close()
+
+    # Snapshot antigo, sem a janela de recentes: reconstruída a partir do log
+    snapshot_path = os.path.join(str(tmp_path), 'snapshot.json')
+    with open(snapshot_path) as f:
+        snapshot = json.load(f)
+    del snapshot['recent']
+    with open(snapshot_path, 'w') as f:
+        json.dump(snapshot, f)
+    legacy = TradeLedger(str(tmp_path), recent_limit=4)
+    assert [e['seq'] for e in legacy.history()] == [2, 3, 4, 5]
+    assert legacy.history(2) == legacy.history()[-2:]
+    legacy.close()
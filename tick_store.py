@@ -0,0 +1,364 @@
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# --- COLUMNAR TICK STORE ---
+# Histórico local de preços em colunas NumPy, cada coluna um arquivo append-only lido via memmap:
+#   ticks/ts.i8, ticks/price.f8, ticks/volume.f8           ticks brutos (ts em ms, ordem crescente)
+#   1m/ ... 1d/  ts.i8 open.f8 high.f8 low.f8 close.f8 volume.f8   candles OHLCV fechados
+# Candles são agregados incrementalmente a cada lote de ticks (reduceat, sem laço Python por tick);
+# o candle ainda aberto de cada intervalo fica em memória e é refeito a partir dos ticks ao reabrir.
+# Consultas por intervalo de tempo são searchsorted sobre a coluna ts: fatias do memmap, sem cópia.
+
+INTERVALS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+TICK_COLUMNS = (('ts', '<i8'), ('price', '<f8'), ('volume', '<f8'))
+CANDLE_COLUMNS = (('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                  ('close', '<f8'), ('volume', '<f8'))
+
+
+class Ticks(NamedTuple):
+    ts: np.ndarray  # ms desde a época
+    price: np.ndarray
+    volume: np.ndarray
+
+
+class OHLCV(NamedTuple):
+    ts: np.ndarray  # Início do candle, em ms
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def to_dict(self) -> Dict[str, List]:
+        return {name: column.tolist() for name, column in zip(self._fields, self)}
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class _Column:
+    """Arquivo append-only de um dtype fixo, exposto como np.memmap (remapeado quando cresce)."""
+
+    def __init__(self, path: str, dtype: str):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        self.length = os.path.getsize(path) // self.dtype.itemsize
+        self._file = None
+        self._map = None
+
+    def truncate(self, length: int) -> None:
+        with open(self.path, 'r+b') as f:
+            f.truncate(length * self.dtype.itemsize)
+        self.length = length
+        self._map = None
+
+    def append(self, values: np.ndarray, fsync: bool = False) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self.length += len(values)
+
+    def view(self, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=self.dtype)
+        if self._map is None or len(self._map) < length:
+            self._map = np.memmap(self.path, dtype=self.dtype, mode='r', shape=(self.length,))
+        return self._map[:length]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._map = None
+
+
+class _Table:
+    """Grupo de colunas de mesmo comprimento; a coluna ts (ordenada) indexa as consultas."""
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, str]], fsync: bool = False):
+        os.makedirs(path, exist_ok=True)
+        self.fsync = fsync
+        self.columns = {name: _Column(os.path.join(path, f"{name}.{np.dtype(dtype).kind}{np.dtype(dtype).itemsize}"),
+                                      dtype) for name, dtype in columns}
+        # Crash no meio de um append: descarta as linhas que não chegaram a todas as colunas
+        self.length = min(column.length for column in self.columns.values())
+        for column in self.columns.values():
+            if column.length != self.length:
+                column.truncate(self.length)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, values: Sequence[np.ndarray]) -> None:
+        count = len(values[0])
+        if not count:
+            return
+        for column, data in zip(self.columns.values(), values):
+            column.append(data, self.fsync)
+        self.length += count
+
+    def slice(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[np.ndarray]:
+        """Linhas com start_ms <= ts < end_ms (fatias do memmap)."""
+        length = self.length
+        ts = self.columns['ts'].view(length)
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side='left'))
+        hi = length if end_ms is None else int(np.searchsorted(ts, end_ms, side='left'))
+        return [column.view(length)[lo:hi] for column in self.columns.values()]
+
+    def last(self, name: str):
+        return self.columns[name].view(self.length)[-1] if self.length else None
+
+    def close(self) -> None:
+        for column in self.columns.values():
+            column.close()
+
+
+def rollup(ts: np.ndarray, price: np.ndarray, volume: np.ndarray, step_ms: int) -> List[np.ndarray]:
+    """Agrega ticks ordenados em candles de step_ms: [ts, open, high, low, close, volume]."""
+    buckets = ts - ts % step_ms
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], len(ts)) - 1
+    return [buckets[starts], price[starts], np.maximum.reduceat(price, starts),
+            np.minimum.reduceat(price, starts), price[ends], np.add.reduceat(volume, starts)]
+
+
+class TickStore:
+    """Ticks de preço e candles OHLCV (1m/5m/1h/1d) persistidos em colunas memmap."""
+
+    def __init__(self, path: str, intervals: Optional[Dict[str, int]] = None, fsync: bool = False):
+        self.path = path
+        self.intervals = dict(intervals or INTERVALS)
+        self.ticks = _Table(os.path.join(path, 'ticks'), TICK_COLUMNS, fsync)
+        self.candle_tables = {name: _Table(os.path.join(path, name), CANDLE_COLUMNS, fsync)
+                              for name in self.intervals}
+        self._open: Dict[str, Optional[List]] = {name: None for name in self.intervals}
+        self._lock = threading.RLock()
+        self.rejected = 0  # Ticks mais antigos que o último gravado (fora de ordem)
+        for name in self.intervals:
+            self._rebuild_open_candle(name)
+
+    def _rebuild_open_candle(self, name: str) -> None:
+        # Reprocessa os ticks posteriores ao último candle fechado: recupera o candle aberto
+        # e também candles que um crash deixou sem gravar
+        table, step = self.candle_tables[name], self.intervals[name]
+        last = table.last('ts')
+        start = None if last is None else int(last) + step
+        ts, price, volume = self.ticks.slice(start_ms=start)
+        if len(ts):
+            self._roll(name, ts, price, volume)
+
+    # --- Escrita ---
+
+    def append_ticks(self, ts_ms, prices, volumes=None) -> int:
+        """Grava um lote de ticks (ts em ms) e atualiza os candles. Retorna quantos foram aceitos.
+
+        Ticks anteriores ao último já gravado são descartados (o arquivo é append-only e ordenado).
+        """
+        ts = np.asarray(ts_ms, dtype=np.int64).ravel()
+        price = np.asarray(prices, dtype=np.float64).ravel()
+        volume = (np.zeros(len(ts)) if volumes is None
+                  else np.asarray(volumes, dtype=np.float64).ravel())
+        if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind='stable')
+            ts, price, volume = ts[order], price[order], volume[order]
+        with self._lock:
+            last = self.ticks.last('ts')
+            if last is not None:
+                keep = ts >= last
+                if not keep.all():
+                    self.rejected += int(len(ts) - keep.sum())
+                    ts, price, volume = ts[keep], price[keep], volume[keep]
+            if not len(ts):
+                return 0
+            self.ticks.append([ts, price, volume])
+            for name in self.intervals:
+                self._roll(name, ts, price, volume)
+        return len(ts)
+
+    def append_tick(self, ts_ms: int, price: float, volume: float = 0.0) -> bool:
+        return self.append_ticks([ts_ms], [price], [volume]) == 1
+
+    def _roll(self, name: str, ts: np.ndarray, price: np.ndarray, volume: np.ndarray) -> None:
+        candles = rollup(ts, price, volume, self.intervals[name])
+        current = self._open[name]
+        closed = []
+        if current is not None:
+            if current[0] == candles[0][0]:
+                # Mesmo balde do candle aberto: funde open/high/low/volume
+                candles[1][0] = current[1]
+                candles[2][0] = max(candles[2][0], current[2])
+                candles[3][0] = min(candles[3][0], current[3])
+                candles[5][0] += current[5]
+            else:
+                closed.append(current)
+        if closed:
+            self.candle_tables[name].append([np.array([c[i] for c in closed]) for i in range(6)])
+        self.candle_tables[name].append([column[:-1] for column in candles])
+        self._open[name] = [column[-1].item() for column in candles]
+
+    def close(self) -> None:
+        with self._lock:
+            self.ticks.close()
+            for table in self.candle_tables.values():
+                table.close()
+
+    # --- Leitura ---
+
+    def get_ticks(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Ticks:
+        """Ticks com start_ms <= ts < end_ms, como fatias somente-leitura do memmap."""
+        with self._lock:
+            return Ticks(*self.ticks.slice(start_ms, end_ms))
+
+    def get_candles(self, interval: str = '1h', start_ms: Optional[int] = None,
+                    end_ms: Optional[int] = None, include_open: bool = True) -> OHLCV:
+        """Candles cujo início está em [start_ms, end_ms); com include_open, inclui o candle em formação."""
+        if interval not in self.intervals:
+            raise ValueError(f"Intervalo desconhecido: {interval} (use {', '.join(self.intervals)})")
+        with self._lock:
+            columns = self.candle_tables[interval].slice(start_ms, end_ms)
+            current = self._open[interval]
+        if include_open and current is not None and (start_ms is None or current[0] >= start_ms) \
+                and (end_ms is None or current[0] < end_ms):
+            columns = [np.append(column, value) for column, value in zip(columns, current)]
+        return OHLCV(*columns)
+
+    def last_candles(self, interval: str = '1h', count: int = 100) -> OHLCV:
+        """Os `count` candles mais recentes (inclui o aberto); count <= 0 devolve nenhum."""
+        candles = self.get_candles(interval)
+        # column[-0:] seria a série inteira
+        return OHLCV(*(column[max(len(column) - count, 0):] for column in candles))
+
+    def last_price(self) -> Optional[float]:
+        with self._lock:
+            price = self.ticks.last('price')
+        return None if price is None else float(price)
+
+    def stats(self) -> Dict:
+        first = self.ticks.columns['ts'].view(len(self.ticks))[:1]
+        return {
+            'ticks': len(self.ticks),
+            'first_ts': int(first[0]) if len(first) else None,
+            'last_ts': None if not len(self.ticks) else int(self.ticks.last('ts')),
+            'rejected': self.rejected,
+            'candles': {name: len(table) for name, table in self.candle_tables.items()},
+        }
+
+
+# --- Integração com BitcoinAPI / PriceFeed ---
+
+def backfill_from_api(store: TickStore, api, days: int = 365) -> int:
+    """Importa o histórico do CoinGecko (get_historical_data) para a loja. Retorna ticks aceitos.
+
+    Faça antes de gravar ticks ao vivo: só entram pontos posteriores ao último já gravado.
+    """
+    data = api.get_historical_data(days)
+    if not data or not data.get('prices'):
+        return 0
+    pairs = np.asarray(data['prices'], dtype=np.float64)
+    return store.append_ticks(pairs[:, 0].astype(np.int64), pairs[:, 1])
+
+
+class TickRecorder:
+    """Grava em lote os ticks do buffer circular de um PriceFeed.
+
+    Lê feed.recent() a cada `interval` segundos em vez de assinar o feed: assinantes recebem
+    o preço conflacionado, e candles precisam de todos os ticks para high/low corretos.
+    O buffer do feed deve comportar os ticks de um intervalo (o ticker da Binance é ~1/s).
+    """
+
+    def __init__(self, store: TickStore, feed, interval: float = 1.0):
+        self.store = store
+        self.feed = feed
+        self.interval = interval
+        self.recorded = 0
+        self._last_received = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'TickRecorder':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='tick-recorder', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        fresh = [tick for tick in self.feed.recent() if tick.received_at > self._last_received]
+        if not fresh:
+            return 0
+        self._last_received = fresh[-1].received_at
+        ts = [int((tick.exchange_time or tick.received_at) * 1000) for tick in fresh]
+        accepted = self.store.append_ticks(ts, [tick.price for tick in fresh])
+        self.recorded += accepted
+        return accepted
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[⚠️] Erro gravando ticks: {e}")
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    print("--- [TICK STORE BENCHMARK] ---")
+    path = tempfile.mkdtemp(prefix='ticks_')
+    try:
+        # Três anos de ticks a cada 10s (~9,5 milhões), em lotes de um dia
+        rng = np.random.default_rng(7)
+        start = 1_600_000_000_000
+        per_day = 8640
+        days = 3 * 365
+        store = TickStore(path)
+        t0 = time.perf_counter()
+        price = 30000.0
+        for day in range(days):
+            ts = start + day * 86_400_000 + np.arange(per_day, dtype=np.int64) * 10_000
+            steps = price * np.exp(np.cumsum(rng.normal(0, 0.0005, per_day)))
+            price = float(steps[-1])
+            store.append_ticks(ts, steps, rng.random(per_day))
+        ingest = time.perf_counter() - t0
+        print(f"[*] {days * per_day:,} ticks gravados em {ingest:.2f}s "
+              f"({days * per_day / ingest:,.0f} ticks/s) | candles: {store.stats()['candles']}")
+        store.close()
+
+        t0 = time.perf_counter()
+        store = TickStore(path)
+        print(f"[*] Reabertura: {(time.perf_counter() - t0) * 1000:.1f} ms")
+        for interval in ('1d', '1h', '1m'):
+            t0 = time.perf_counter()
+            candles = store.get_candles(interval)
+            closes = np.asarray(candles.close)
+            print(f"[*] {interval}: {len(candles.ts):,} candles lidos em "
+                  f"{(time.perf_counter() - t0) * 1000:.2f} ms (último close {closes[-1]:,.2f})")
+        t0 = time.perf_counter()
+        window = store.get_ticks(start + 400 * 86_400_000, start + 430 * 86_400_000)
+        print(f"[*] 30 dias de ticks ({len(window.ts):,}) em {(time.perf_counter() - t0) * 1000:.2f} ms")
+        store.close()
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
@@ -3,6 +3,29 @@ import numpy as np
 from scipy.ndimage import gaussian_filter, sobel
 import matplotlib.pyplot as plt
 
+SIGNATURE_BINS = 64
+SVD_MODES = ('exact', 'randomized')
+SIGNATURE_RANGE = (-1.0, 1.0)
+
+
+def batch_histogram(values: np.ndarray, bins: int = SIGNATURE_BINS,
+                    value_range=SIGNATURE_RANGE) -> np.ndarray:
+    """np.histogram(linha, bins, range, density=True) para cada linha de values (N, M) de uma vez."""
+    first, last = value_range
+    edges = np.linspace(first, last, bins + 1)
+    rows = np.broadcast_to(np.arange(len(values))[:, None], values.shape)
+    keep = (values >= first) & (values <= last)
+    x, rows = values[keep], rows[keep]
+    # Mesmo cálculo de índice (e correções de arredondamento nas bordas) de np.histogram
+    idx = ((x - first) * (bins / (last - first))).astype(np.intp)
+    idx[idx == bins] -= 1
+    idx[x < edges[idx]] -= 1
+    idx[(x >= edges[idx + 1]) & (idx != bins - 1)] += 1
+    counts = np.bincount(rows * bins + idx, minlength=len(values) * bins).reshape(len(values), bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts / np.diff(edges) / counts.sum(axis=1, keepdims=True)
+
+
 class TopologicalKernel:
     """
     KERNEL DE RECONHECIMENTO TOPOLÓGICO (ROOT ARCHITECT)
@@ -11,9 +34,19 @@ class TopologicalKernel:
     A identidade é extraída através de invariantes geométricos como a Curvatura de Gauss.
     """
     
-    def __init__(self, sigma=1.5, n_components=10):
+    def __init__(self, sigma=1.5, n_components=10, svd_mode='exact', power_iterations=2,
+                 oversample=10, svd_tol=None, reuse_basis=False):
+        if svd_mode not in SVD_MODES:
+            raise ValueError(f"svd_mode deve ser um de {SVD_MODES}")
         self.sigma = sigma 
         self.n_components = n_components 
+        # Limpeza SVD: 'exact' (SVD completa em lote) ou 'randomized' (Halko et al.)
+        self.svd_mode = svd_mode
+        self.power_iterations = power_iterations  # Máximo de iterações de potência (randomized)
+        self.oversample = oversample              # Colunas extras no sketch além de n_components
+        self.svd_tol = svd_tol                    # Para antes se a energia capturada variar < tol
+        self.reuse_basis = reuse_basis            # Frames seguidos de um stream: parte da base do anterior
+        self._basis = {}                          # (stream, (H, W)) -> base direita (W, k + oversample)
         self.temporal_flow_cache = [] 
         self.prev_gray = None # Para Optical Flow
 
@@ -47,39 +80,85 @@ class TopologicalKernel:
         dist = np.sqrt(max(0, js_div))
         return dist
 
-    def _apply_svd_cleaning(self, image_matrix: np.ndarray) -> np.ndarray:
-        """Utiliza SVD para reconstruir a imagem apenas com componentes principais, eliminando ruído."""
-        U, S, Vt = np.linalg.svd(image_matrix.astype(float), full_matrices=False)
-        S_clean = np.zeros_like(S)
-        S_clean[:self.n_components] = S[:self.n_components]
-        im_clean = U @ np.diag(S_clean) @ Vt
-        return im_clean
+    def reset_basis(self, stream=None):
+        """Esquece a base SVD em cache de um stream (troca de sujeito), ou de todos se stream=None."""
+        if stream is None:
+            self._basis = {}
+        else:
+            for key in [key for key in list(self._basis) if key[0] == stream]:
+                self._basis.pop(key, None)
 
-    def _compute_derivatives(self, image_matrix: np.ndarray):
+    def _randomized_svd_cleaning(self, A: np.ndarray, stream=None) -> np.ndarray:
+        """
+        Reconstrução de posto n_components por SVD randomizada (sketch + iterações de potência).
+        Com reuse_basis e um stream (ex.: câmera), uma imagem 2D parte da base do frame anterior
+        desse mesmo stream: em vídeo o subespaço quase não muda e uma iteração basta. Sem stream
+        não há como saber se duas imagens do mesmo tamanho são do mesmo sujeito, então nada é reusado.
+        """
+        k = self.n_components
+        width = min(k + self.oversample, *A.shape[-2:])
+        At = np.swapaxes(A, -1, -2)
+        key = (stream, A.shape) if self.reuse_basis and stream is not None and A.ndim == 2 else None
+        basis = self._basis.get(key) if key else None
+        if basis is None:
+            rng = np.random.default_rng(0)
+            basis = rng.standard_normal((A.shape[-1], width))
+        Q, _ = np.linalg.qr(A @ basis)
+        energy = None
+        for _ in range(self.power_iterations):
+            Z, _ = np.linalg.qr(At @ Q)  # Re-ortogonaliza a cada meia-iteração (estabilidade)
+            Q, _ = np.linalg.qr(A @ Z)
+            if self.svd_tol is not None:
+                captured = np.sum((np.swapaxes(Q, -1, -2) @ A) ** 2)
+                if energy is not None and abs(captured - energy) <= self.svd_tol * captured:
+                    break
+                energy = captured
+        B = np.swapaxes(Q, -1, -2) @ A  # (.., width, W): pequeno
+        Ub, S, Vt = np.linalg.svd(B, full_matrices=False)
+        if key:
+            self._basis[key] = np.swapaxes(Vt, -1, -2)
+        return ((Q @ Ub[..., :k]) * S[..., None, :k]) @ Vt[..., :k, :]
+
+    def _apply_svd_cleaning(self, image_matrix: np.ndarray, stream=None) -> np.ndarray:
+        """Utiliza SVD para reconstruir a imagem apenas com componentes principais, eliminando ruído.
+
+        Aceita (H, W) ou uma pilha (N, H, W). O modo exato faz a SVD da pilha numa chamada e
+        reconstrói U_k S_k V_kᵀ sem np.diag denso. Não passa pela Gram AᵀA: ela eleva o número
+        de condição ao quadrado e perde os componentes pequenos de imagens mal condicionadas.
+        """
+        A = image_matrix.astype(float)
+        if self.svd_mode == 'randomized':
+            return self._randomized_svd_cleaning(A, stream)
+        k = self.n_components
+        U, S, Vt = np.linalg.svd(A, full_matrices=False)
+        return (U[..., :k] * S[..., None, :k]) @ Vt[..., :k, :]
+
+    def _compute_derivatives(self, image_matrix: np.ndarray, stream=None):
         """Calcula derivadas parciais de primeira e segunda ordem com SVD Pre-processing."""
         # Pre-processamento via SVD para reduzir ruído de hardware
-        im_svd = self._apply_svd_cleaning(image_matrix)
+        im_svd = self._apply_svd_cleaning(image_matrix, stream)
         
-        # Suavização Gaussiana para estabilizar o Tensor Métrico
-        im = gaussian_filter(im_svd, self.sigma)
+        # Suavização Gaussiana para estabilizar o Tensor Métrico (só nos eixos da imagem numa pilha)
+        sigma = (0,) * (im_svd.ndim - 2) + (self.sigma, self.sigma)
+        im = gaussian_filter(im_svd, sigma)
         
         # Derivadas de primeira ordem
-        Ix = np.gradient(im, axis=1)
-        Iy = np.gradient(im, axis=0)
+        Ix = np.gradient(im, axis=-1)
+        Iy = np.gradient(im, axis=-2)
         
         # Derivadas de segunda ordem
-        Ixx = np.gradient(Ix, axis=1)
-        Iyy = np.gradient(Iy, axis=0)
-        Ixy = np.gradient(Ix, axis=0)
+        Ixx = np.gradient(Ix, axis=-1)
+        Iyy = np.gradient(Iy, axis=-2)
+        Ixy = np.gradient(Ix, axis=-2)
         
         return Ix, Iy, Ixx, Iyy, Ixy
 
-    def compute_gaussian_curvature(self, image_matrix: np.ndarray) -> np.ndarray:
+    def compute_gaussian_curvature(self, image_matrix: np.ndarray, stream=None) -> np.ndarray:
         """
         Calcula a Curvatura de Gauss (K) para a superfície Z = I(x,y).
         Fórmula: K = (fxx*fyy - fxy^2) / (1 + fx^2 + fy^2)^2
         """
-        Ix, Iy, Ixx, Iyy, Ixy = self._compute_derivatives(image_matrix)
+        Ix, Iy, Ixx, Iyy, Ixy = self._compute_derivatives(image_matrix, stream)
         
         numerator = (Ixx * Iyy - Ixy**2)
         denominator = (1 + Ix**2 + Iy**2)**2
@@ -88,17 +167,34 @@ class TopologicalKernel:
         K = numerator / (denominator + 1e-10)
         return K
 
-    def extract_signature(self, image_matrix: np.ndarray) -> np.ndarray:
+    def extract_signature(self, image_matrix: np.ndarray, stream=None) -> np.ndarray:
         """
         Gera uma assinatura geométrica baseada na Curvatura Gaussiana.
         Reduz a dimensionalidade via pooling ou histograma de curvatura.
+        stream identifica a fonte de vídeo (ver reuse_basis).
         """
-        K = self.compute_gaussian_curvature(image_matrix)
+        K = self.compute_gaussian_curvature(image_matrix, stream)
         # Assinatura: Histograma da curvatura (invariante a translação)
         # Focamos em pontos de sela e picos ósseos.
-        hist, _ = np.histogram(K, bins=64, range=(-1, 1), density=True)
+        hist, _ = np.histogram(K, bins=SIGNATURE_BINS, range=SIGNATURE_RANGE, density=True)
         return hist
 
+    def extract_signatures(self, images: np.ndarray, batch_size: int = 16) -> np.ndarray:
+        """
+        Versão em lote de extract_signature: pilha (N, H, W) -> (N, 64), mesmos valores.
+        SVD, filtro e gradientes rodam sobre a pilha em blocos de batch_size (16 faces 100x100
+        cabem no cache; blocos maiores ficam limitados pela memória) e os histogramas de cada
+        bloco saem de um único np.bincount.
+        """
+        images = np.asarray(images)
+        if images.ndim != 3:
+            raise ValueError("esperado um array (N, H, W)")
+        signatures = np.empty((len(images), SIGNATURE_BINS))
+        for start in range(0, len(images), batch_size):
+            K = self.compute_gaussian_curvature(images[start:start + batch_size])
+            signatures[start:start + len(K)] = batch_histogram(K.reshape(len(K), -1))
+        return signatures
+
     def compute_similarity(self, sig1: np.ndarray, sig2: np.ndarray) -> float:
         """
         Compara duas assinaturas usando Distância de Mahalanobis ou Correlação.
@@ -284,4 +380,58 @@ if __name__ == "__main__":
     
     sig = kernel.extract_signature(dummy_face)
     print(f"[+] Assinatura gerada (size {len(sig)}): {sig[:5]}...")
+
+    # Lote: 5 ângulos x N usuários numa chamada vs. uma face por vez
+    import time
+    rng = np.random.default_rng(0)
+    stack = np.clip(dummy_face + rng.normal(0, 8, (512, 100, 100)), 0, 255).astype(np.uint8)
+    t0 = time.perf_counter()
+    for face in stack[:128]:
+        # Limpeza antiga: SVD completa + np.diag denso
+        U, S, Vt = np.linalg.svd(face.astype(float), full_matrices=False)
+        S[kernel.n_components:] = 0
+        U @ np.diag(S) @ Vt
+    full_svd = (time.perf_counter() - t0) / 128
+    t0 = time.perf_counter()
+    kernel._apply_svd_cleaning(stack)
+    truncated = (time.perf_counter() - t0) / len(stack)
+    print(f"[+] Limpeza SVD: completa {full_svd * 1000:.2f} ms/face | truncada em lote {truncated * 1000:.2f} ms/face")
+    t0 = time.perf_counter()
+    single = np.stack([kernel.extract_signature(face) for face in stack[:128]])
+    per_face = (time.perf_counter() - t0) / 128
+    t0 = time.perf_counter()
+    batch = kernel.extract_signatures(stack)
+    per_batch = (time.perf_counter() - t0) / len(stack)
+    print(f"[+] extract_signature: {per_face * 1000:.2f} ms/face | extract_signatures: "
+          f"{per_batch * 1000:.2f} ms/face | diferença máx {np.abs(single - batch[:128]).max():.1e}")
+
+    # SVD randomizada: precisão x velocidade (erro relativo à reconstrução exata de posto k)
+    def drifting_frames(shape, count):
+        base = cv2.resize(dummy_face, shape[::-1])
+        for t in range(count):
+            frame = np.roll(base, t % 4, axis=1) + rng.normal(0, 8, shape)  # Sujeito parado, sensor ruidoso
+            yield np.clip(frame, 0, 255)
+
+    for shape, count in (((100, 100), 64), ((480, 640), 8)):
+        frames = list(drifting_frames(shape, count))
+        exact_kernel = TopologicalKernel()
+        t0 = time.perf_counter()
+        reference = [exact_kernel._apply_svd_cleaning(frame) for frame in frames]
+        exact_ms = (time.perf_counter() - t0) / count * 1000
+        ref_sigs = [exact_kernel.extract_signature(frame) for frame in frames[:8]]
+        print(f"[+] {shape[0]}x{shape[1]} exata: {exact_ms:.2f} ms")
+        variants = [('q=0', {'power_iterations': 0}), ('q=1', {'power_iterations': 1}),
+                    ('q=2', {'power_iterations': 2}), ('q=4 tol=1e-3', {'power_iterations': 4, 'svd_tol': 1e-3}),
+                    ('q=1 + base do frame anterior', {'power_iterations': 1, 'reuse_basis': True})]
+        for label, options in variants:
+            fast = TopologicalKernel(svd_mode='randomized', **options)
+            t0 = time.perf_counter()
+            cleaned = [fast._apply_svd_cleaning(frame, stream='camera') for frame in frames]
+            ms = (time.perf_counter() - t0) / count * 1000
+            error = np.mean([np.linalg.norm(c - r) / np.linalg.norm(r) for c, r in zip(cleaned, reference)])
+            fast.reset_basis()
+            geodesic = np.mean([fast.compute_geodesic_distance(fast.extract_signature(frame, stream='camera'), ref)
+                                for frame, ref in zip(frames[:8], ref_sigs)])
+            print(f"    randomizada {label:<30} {ms:7.2f} ms ({exact_ms / ms:4.1f}x) | erro relativo {error:.4f} | "
+                  f"distância geodésica da assinatura exata {geodesic:.4f}")
     kernel.visualize_manifold(dummy_face, "Synthetic_Test")
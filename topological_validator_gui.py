@@ -1,5 +1,6 @@
 import requests
 # ... (imports stay same, adding requests)
+from frame_bus import FrameBus
 
 # ... (Nexus, etc stay same)
 
@@ -11,6 +12,24 @@ class TelemetryTransmissionThread(threading.Thread):
         self.daemon = True
         self.running = True
         self.server_url = "http://127.0.0.1:8000"
+        self.frame_bus = None
+        self.last_bus_check = 0.0
+
+    def _attach_frame_bus(self):
+        # Servidor na mesma máquina: frames pela memória compartilhada; senão, POST /update_frame.
+        # A cada 5 s confere o segmento pelo nome: servidor reiniciado (nova geração) -> reanexa;
+        # servidor encerrado (segmento removido) -> volta ao HTTP até ele subir de novo
+        if time.time() - self.last_bus_check > 5:
+            self.last_bus_check = time.time()
+            if self.frame_bus is not None and self.frame_bus.is_stale():
+                self.frame_bus.close()
+                self.frame_bus = None
+            if self.frame_bus is None:
+                try:
+                    self.frame_bus = FrameBus.attach()
+                except (FileNotFoundError, ValueError):
+                    self.frame_bus = None
+        return self.frame_bus
 
     def run(self):
         while self.running:
@@ -34,7 +53,11 @@ class TelemetryTransmissionThread(threading.Thread):
                     # 2. Enviar Frame (Downsampled para performance)
                     small_frame = cv2.resize(frame, (320, 240))
                     _, buffer = cv2.imencode('.jpg', small_frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
-                    requests.post(f"{self.server_url}/update_frame", data=buffer.tobytes(), timeout=0.1)
+                    bus = self._attach_frame_bus()
+                    if bus is not None:
+                        bus.publish(buffer.tobytes())
+                    else:
+                        requests.post(f"{self.server_url}/update_frame", data=buffer.tobytes(), timeout=0.1)
                 except Exception:
                     pass
             
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from config import INITIAL_BALANCE_USD
+
+# --- TRADE LEDGER ---
+# Livro de trades event-sourced para o TradingEngine:
+#   trades.jsonl   um evento por linha (append-only, gravado ANTES de alterar o estado em memória)
+#   snapshot.json  saldos + seq + offset no log + trades recentes, regravado a cada `snapshot_every` eventos
+# Boot = snapshot + replay só dos eventos posteriores ao offset (linha parcial de crash é descartada).
+# history() lê só a janela em memória dos `recent_limit` trades mais recentes, nunca o log inteiro.
+# Um lock cobre checagem de saldo + gravação + aplicação: threads concorrentes não perdem updates.
+# Valuation em cache: mark(preço) a cada tick recalcula usd + btc * preço em O(1).
+
+
+class InsufficientFunds(Exception):
+    """Saldo insuficiente para a ordem."""
+
+
+class TradeLedger:
+    """Saldos USD/BTC derivados de um log append-only de trades, com snapshots."""
+
+    def __init__(self, path: Optional[str] = None, initial_usd: float = INITIAL_BALANCE_USD,
+                 snapshot_every: int = 1000, fsync: bool = False, recent_limit: int = 1000):
+        self.path = path
+        self.initial_usd = initial_usd
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.balance_usd = initial_usd
+        self.balance_btc = 0.0
+        self.seq = 0  # Número de eventos aplicados
+        self.mark_price: Optional[float] = None
+        self.marked_at: Optional[float] = None
+        self._value: Optional[float] = None
+        self._recent: deque = deque(maxlen=recent_limit)  # Trades mais recentes (history)
+        self._offset = 0
+        self._since_snapshot = 0
+        self._lock = threading.RLock()
+        self._log = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.log_path = os.path.join(path, 'trades.jsonl')
+            self.snapshot_path = os.path.join(path, 'snapshot.json')
+            self._recover()
+            self._log = open(self.log_path, 'ab')
+
+    # --- Recuperação ---
+
+    def _recover(self) -> None:
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self.balance_usd = snapshot['balance_usd']
+            self.balance_btc = snapshot['balance_btc']
+            self.seq = snapshot['seq']
+            self.initial_usd = snapshot.get('initial_usd', self.initial_usd)
+            self._offset = snapshot['offset']
+            recent = snapshot.get('recent')
+        except (OSError, ValueError, KeyError):
+            self._offset, recent = 0, []
+        if not os.path.exists(self.log_path):
+            open(self.log_path, 'wb').close()
+        if self._offset > os.path.getsize(self.log_path):
+            # Snapshot à frente do log (log trocado/truncado): replay completo
+            self.balance_usd, self.balance_btc, self.seq, self._offset = self.initial_usd, 0.0, 0, 0
+            recent = []
+        with open(self.log_path, 'r+b') as f:
+            if recent is None:
+                # Snapshot antigo, sem a janela de recentes: reconstrói a partir do trecho já aplicado
+                recent = [json.loads(line) for line in f.read(self._offset).splitlines(keepends=True)
+                          if line.endswith(b'\n')]
+            self._recent.extend(recent)
+            f.seek(self._offset)
+            good_end = self._offset
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Linha parcial: crash no meio da escrita
+                self._apply(json.loads(line))
+                good_end += len(line)
+            if good_end < os.path.getsize(self.log_path):
+                f.truncate(good_end)
+        self._offset = good_end
+
+    # --- Escrita ---
+
+    def _apply(self, event: Dict) -> None:
+        if event['type'] == 'BUY':
+            self.balance_usd -= event['amount_usd']
+            self.balance_btc += event['amount_btc']
+        else:
+            self.balance_btc -= event['amount_btc']
+            self.balance_usd += event['amount_usd']
+        self.seq = event['seq']
+        self._since_snapshot += 1
+        self._recent.append(event)
+
+    def _record(self, event: Dict) -> Dict:
+        event['seq'] = self.seq + 1
+        if self._log is not None:
+            line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+            self._log.write(line)
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._offset += len(line)
+        self._apply(event)
+        self._remark(event['price'])
+        if self._log is not None and self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return event
+
+    def buy(self, amount_usd: float, price: float) -> Dict:
+        """Compra BTC com amount_usd ao preço informado. Levanta InsufficientFunds."""
+        if amount_usd <= 0 or price <= 0:
+            raise ValueError("valor e preço devem ser positivos")
+        with self._lock:
+            if self.balance_usd < amount_usd:
+                raise InsufficientFunds(f"saldo USD {self.balance_usd:.2f} < {amount_usd:.2f}")
+            return self._record({'type': 'BUY', 'amount_usd': amount_usd, 'amount_btc': amount_usd / price,
+                                 'price': price, 'timestamp': time.time()})
+
+    def sell(self, btc_amount: float, price: float) -> Dict:
+        """Vende btc_amount ao preço informado. Levanta InsufficientFunds."""
+        if btc_amount <= 0 or price <= 0:
+            raise ValueError("quantidade e preço devem ser positivos")
+        with self._lock:
+            if self.balance_btc < btc_amount:
+                raise InsufficientFunds(f"saldo BTC {self.balance_btc:.8f} < {btc_amount:.8f}")
+            return self._record({'type': 'SELL', 'amount_btc': btc_amount, 'amount_usd': btc_amount * price,
+                                 'price': price, 'timestamp': time.time()})
+
+    def snapshot(self) -> None:
+        """Grava saldos + offset no log (atômico via os.replace)."""
+        if self._log is None:
+            return
+        with self._lock:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'seq': self.seq, 'offset': self._offset, 'balance_usd': self.balance_usd,
+                           'balance_btc': self.balance_btc, 'initial_usd': self.initial_usd,
+                           'recent': list(self._recent)}, f)
+            os.replace(tmp_path, self.snapshot_path)
+            self._since_snapshot = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self.snapshot()
+                self._log.close()
+                self._log = None
+
+    # --- Valuation ---
+
+    def _remark(self, price: float) -> None:
+        self.mark_price = price
+        self.marked_at = time.time()
+        self._value = self.balance_usd + self.balance_btc * price
+
+    def mark(self, price: float) -> None:
+        """Atualiza o preço de referência (chamado a cada tick) e o valor em cache."""
+        if price and price > 0:
+            with self._lock:
+                self._remark(price)
+
+    def portfolio_value(self) -> Optional[float]:
+        """Valor total ao último preço marcado (O(1)); None se nenhum preço foi marcado."""
+        return self._value
+
+    # --- Leitura ---
+
+    def balances(self) -> Dict[str, float]:
+        with self._lock:
+            return {'usd': self.balance_usd, 'btc': self.balance_btc, 'seq': self.seq}
+
+    def history(self, limit: Optional[int] = None) -> List[Dict]:
+        """Trades recentes em ordem (no máximo recent_limit; os `limit` últimos, se informado)."""
+        with self._lock:
+            events = list(self._recent)
+        return events if limit is None else events[-limit:]
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    print("--- [TRADE LEDGER BENCHMARK] ---")
+    path = tempfile.mkdtemp(prefix='ledger_')
+    try:
+        ledger = TradeLedger(path, initial_usd=1e9)
+        threads, per_thread = 8, 5000
+
+        def trader():
+            for i in range(per_thread):
+                ledger.buy(10.0, 50000.0 + i)
+                ledger.mark(50000.0 + i)
+
+        t0 = time.perf_counter()
+        workers = [threading.Thread(target=trader) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - t0
+        total = threads * per_thread
+        print(f"[*] {total:,} ordens de {threads} threads em {elapsed:.2f}s ({total / elapsed:,.0f}/s) | "
+              f"USD {ledger.balance_usd:,.2f} (esperado {1e9 - 10.0 * total:,.2f})")
+        t0 = time.perf_counter()
+        for _ in range(100000):
+            ledger.portfolio_value()
+        print(f"[*] portfolio_value(): {(time.perf_counter() - t0) * 10:.3f} µs/leitura")
+        ledger.close()
+        t0 = time.perf_counter()
+        reopened = TradeLedger(path)
+        print(f"[*] Reabertura com snapshot: {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"(seq {reopened.seq:,}, BTC {reopened.balance_btc:.8f})")
+        reopened.close()
+        os.remove(os.path.join(path, 'snapshot.json'))
+        t0 = time.perf_counter()
+        replayed = TradeLedger(path)
+        print(f"[*] Reabertura com replay completo: {(time.perf_counter() - t0) * 1000:.1f} ms")
+        replayed.close()
+    finally:
+        shutil.rmtree(path, ignore_errors=True)